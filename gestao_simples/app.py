@@ -14,8 +14,8 @@ from views.estoque.auditoria.list import AuditoriaListView
 from views.fornecedor.list import FornecedorListView
 from views.configuracoes.backup_view import BackupView
 from views.configuracoes.database_view import DatabaseConfigView
-from config.database import engine
-from models.base import Base
+from config.database import unit_of_work
+from migrations.migrator import aplicar_migracoes
 from utils.logger import logger
 from utils.backup_scheduler import BackupScheduler
 from services.auth_service import AuthService
@@ -39,8 +39,8 @@ if 'db_connection_failed' not in st.session_state:
 
 # Initialize database
 try:
-    # Cria todas as tabelas
-    Base.metadata.create_all(bind=engine)
+    # Aplica migrações pendentes (verifica o banco apenas uma vez por processo)
+    aplicar_migracoes()
 except (OperationalError, DatabaseError) as e:
     st.session_state.db_connection_failed = True
     logger.error(f"Erro de conexão com o banco de dados: {str(e)}")
@@ -131,7 +131,10 @@ else:
                         st.rerun()
 
             pg = st.navigation(pages)
-            pg.run()
+
+            # Uma única sessão (e um checkout de conexão) para todas as consultas da página
+            with unit_of_work():
+                pg.run()
 
         except jwt.ExpiredSignatureError:
             st.write("")
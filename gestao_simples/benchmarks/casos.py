@@ -0,0 +1,120 @@
+# benchmarks/casos.py
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import text
+from config.database import obter_sessao
+from models.nota_entrada import NotaEntrada
+from repositories.auditoria_repository import AuditoriaRepository
+from services.auditoria_service import AuditoriaService
+from services.camada_peps_service import CamadaPepsService
+from services.nota_entrada_service import NotaEntradaService
+from services.produto_fornecedor_associacao_service import ProdutoFornecedorAssociacaoService
+from services.produto_service import ProdutoService
+from services.fornecedor_service import FornecedorService
+from services.inventario_estoque_service import InventarioEstoqueService
+
+# Itens da nota gravada em cada repetição de criar_nota_entrada_atomica
+ITENS_NOTA_BENCHMARK = 50
+
+
+@dataclass
+class Caso:
+    nome: str
+    executar: Callable
+    # Casos que alteram o banco rodam sem aquecimento
+    aquecer: bool = True
+    # Repetições próprias (None = as da linha de comando)
+    repeticoes: int = None
+
+
+def _fornecedor_com_mais_itens():
+    query = text("""
+        SELECT ne.fornecedor_id
+        FROM notas_entrada ne
+        JOIN itens_nota_entrada ine ON ine.nota_entrada_id = ne.id
+        GROUP BY ne.fornecedor_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """)
+    with obter_sessao() as session:
+        return session.execute(query).scalar()
+
+
+def _produto_com_mais_entradas():
+    query = text("""
+        SELECT ine.produto_id
+        FROM itens_nota_entrada ine
+        WHERE ine.produto_id IS NOT NULL
+        GROUP BY ine.produto_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """)
+    with obter_sessao() as session:
+        return session.execute(query).scalar()
+
+
+def _criar_nota(nota_entrada_service, fornecedor_id, itens_catalogo):
+    """Grava uma nota com os primeiros itens já conhecidos do fornecedor (fluxo das telas)"""
+    itens_data = [
+        {
+            'codigo_produto_fornecedor': item['codigo'],
+            'descricao': item['descricao'],
+            'quantidade': 1.0,
+            'unidade_medida': item['unidade'],
+            'valor': 10.0,
+        }
+        for item in itens_catalogo[:ITENS_NOTA_BENCHMARK]
+    ]
+    nota = NotaEntrada(
+        modelo=55,
+        fornecedor_id=fornecedor_id,
+        data_emissao=datetime.now(),
+        total_nota_entrada=sum(item['quantidade'] * item['valor'] for item in itens_data),
+    )
+    nota_entrada_service.criar_nota_entrada_atomica(nota, itens_data)
+    return itens_data
+
+
+def montar_casos():
+    """
+    Chamadas medidas, na ordem de execução. As leituras vêm primeiro; a gravação de
+    notas fica por último para não alterar a massa medida pelas demais.
+    """
+    auditoria_repository = AuditoriaRepository()
+    auditoria_service = AuditoriaService()
+    camada_peps_service = CamadaPepsService()
+    nota_entrada_service = NotaEntradaService()
+    associacao_service = ProdutoFornecedorAssociacaoService()
+
+    inventario = auditoria_repository.obter_inventario()
+    if inventario is None:
+        raise RuntimeError("Nenhum inventário encerrado no banco. Gere os dados com --gerar.")
+
+    fornecedor_id = _fornecedor_com_mais_itens()
+    produto_id = _produto_com_mais_entradas()
+    itens_catalogo = nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor_id)
+
+    return [
+        # Auditoria PEPS
+        Caso('reconstruir_camadas', camada_peps_service.reconstruir, aquecer=False, repeticoes=1),
+        Caso('obter_dados_peps', auditoria_repository.obter_dados_peps),
+        Caso('obter_dados_peps_produto', lambda: auditoria_repository.obter_dados_peps(produto_id=produto_id)),
+        Caso('camadas_numpy', lambda: camada_peps_service.calcular_camadas(
+            inventario.id, inventario.data_fim_contagem, motor='numpy')),
+        Caso('auditoria_camadas_gravadas', auditoria_service.obter_dados_auditoria),
+        Caso('auditoria_comparativo', auditoria_service.obter_comparativo),
+        # Associação de itens
+        Caso('listar_itens_unicos_por_fornecedor',
+             lambda: nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor_id)),
+        Caso('listar_todos_itens_nao_associados', associacao_service.listar_todos_itens_nao_associados),
+        # Carga das telas de listagem
+        Caso('listar_notas_entrada', nota_entrada_service.listar_notas_entrada),
+        Caso('listar_produtos', ProdutoService().listar_produtos),
+        Caso('listar_fornecedores', FornecedorService().listar_fornecedores),
+        Caso('listar_associacoes', associacao_service.listar_associacoes),
+        Caso('listar_inventarios', InventarioEstoqueService().listar_inventarios),
+        # Gravação
+        Caso('criar_nota_entrada_atomica',
+             lambda: _criar_nota(nota_entrada_service, fornecedor_id, itens_catalogo), aquecer=False),
+    ]
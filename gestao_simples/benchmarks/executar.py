@@ -0,0 +1,192 @@
+# benchmarks/executar.py
+"""
+Mede as chamadas mais pesadas de repositórios e serviços sobre uma massa sintética.
+
+Uso (a partir do diretório gestao_simples):
+    python -m benchmarks.executar --sqlite ./tmp/.benchmarks/bench.db --gerar --volume pequeno
+    python -m benchmarks.executar --sqlite ./tmp/.benchmarks/bench.db
+    python -m benchmarks.executar --gerar --volume grande   # banco do .env (DB_NAME com 'bench')
+
+Cada execução grava um JSON em BENCHMARK_DIR e compara as medianas com a
+execução anterior no mesmo dialeto, marcando as regressões.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark dos repositórios e serviços do Gestão Simples")
+    parser.add_argument('--sqlite', metavar='ARQUIVO',
+                        help="Usa um banco SQLite local em vez do banco configurado no .env")
+    parser.add_argument('--gerar', action='store_true',
+                        help="Recria o schema e gera a massa de dados antes de medir")
+    parser.add_argument('--volume', default='pequeno',
+                        help="Volume pré-definido da massa: pequeno, medio ou grande")
+    parser.add_argument('--fornecedores', type=int)
+    parser.add_argument('--produtos', type=int)
+    parser.add_argument('--itens-nota', type=int, dest='itens_nota')
+    parser.add_argument('--itens-por-nota', type=int, dest='itens_por_nota')
+    parser.add_argument('--inventarios', type=int)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--casos', nargs='*', help="Mede só os casos informados (nomes de benchmarks/casos.py)")
+    parser.add_argument('--limite-regressao', type=float, default=20.0, dest='limite_regressao',
+                        help="Aumento percentual da mediana marcado como regressão")
+    parser.add_argument('--forcar', action='store_true',
+                        help="Permite recriar um banco sem 'bench' no nome")
+    return parser.parse_args()
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _contar_linhas(resultado):
+    if isinstance(resultado, int):
+        return resultado
+    try:
+        return len(resultado)
+    except TypeError:
+        return None
+
+
+def medir(caso, repeticoes, engine):
+    """Tempo (mediana/mín./máx.), linhas retornadas e instruções SQL por chamada"""
+    from sqlalchemy import event
+
+    contador = {'instrucoes': 0}
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        contador['instrucoes'] += 1
+
+    if caso.aquecer:
+        caso.executar()
+
+    repeticoes = caso.repeticoes or repeticoes
+    tempos, linhas = [], None
+    event.listen(engine, "before_cursor_execute", _contar)
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = caso.executar()
+            tempos.append(time.perf_counter() - inicio)
+            linhas = _contar_linhas(resultado)
+    finally:
+        event.remove(engine, "before_cursor_execute", _contar)
+
+    return {
+        'caso': caso.nome,
+        'repeticoes': repeticoes,
+        'mediana_s': statistics.median(tempos),
+        'min_s': min(tempos),
+        'max_s': max(tempos),
+        'linhas': linhas,
+        'instrucoes': contador['instrucoes'] // repeticoes,
+    }
+
+
+def _resultado_anterior(diretorio, dialeto):
+    arquivos = sorted(glob.glob(os.path.join(diretorio, f"benchmark_{dialeto}_*.json")))
+    if not arquivos:
+        return None, {}
+    with open(arquivos[-1], encoding='utf-8') as arquivo:
+        anterior = json.load(arquivo)
+    return arquivos[-1], {r['caso']: r for r in anterior.get('resultados', [])}
+
+
+def _contar_tabelas(engine):
+    from sqlalchemy import text
+    from benchmarks.gerador_dados import TABELAS_GERADAS
+
+    with engine.connect() as conn:
+        return {tabela: conn.execute(text(f"SELECT COUNT(*) FROM {tabela}")).scalar() for tabela in TABELAS_GERADAS}
+
+
+def main():
+    args = _argumentos()
+
+    # Antes de importar config: load_dotenv não sobrescreve variáveis já definidas
+    if args.sqlite:
+        os.makedirs(os.path.dirname(os.path.abspath(args.sqlite)), exist_ok=True)
+        os.environ['DB_TYPE'] = 'sqlite'
+        os.environ['DB_NAME'] = args.sqlite
+
+    from config.database import engine
+    from config.settings import BENCHMARK_DIR
+    from migrations.migrator import aplicar_migracoes
+    from benchmarks import gerador_dados
+    from benchmarks.casos import montar_casos
+
+    if args.gerar:
+        if args.volume not in gerador_dados.VOLUMES:
+            sys.exit(f"Volume inválido: {args.volume}. Use um de {', '.join(gerador_dados.VOLUMES)}.")
+        if not gerador_dados.banco_de_benchmark() and not args.forcar:
+            sys.exit("O banco configurado não parece ser de benchmark (sem 'bench' no nome). Use --forcar para recriá-lo.")
+
+        volume = dict(gerador_dados.VOLUMES[args.volume])
+        for chave in volume:
+            if getattr(args, chave, None) is not None:
+                volume[chave] = getattr(args, chave)
+
+        print(f"Gerando massa '{args.volume}': {volume}")
+        gerador_dados.recriar_schema()
+        print(f"Linhas gravadas: {gerador_dados.gerar_dados(volume, args.semente)}")
+    else:
+        aplicar_migracoes()
+
+    casos = montar_casos()
+    if args.casos:
+        casos = [caso for caso in casos if caso.nome in args.casos]
+
+    dialeto = engine.dialect.name
+    arquivo_anterior, anteriores = _resultado_anterior(BENCHMARK_DIR, dialeto)
+
+    resultados = []
+    print(f"\n{'caso':<38}{'mediana (s)':>12}{'linhas':>10}{'SQL':>6}{'vs anterior':>14}")
+    for caso in casos:
+        resultado = medir(caso, args.repeticoes, engine)
+        resultados.append(resultado)
+
+        comparacao = ''
+        anterior = anteriores.get(caso.nome)
+        if anterior and anterior['mediana_s'] > 0:
+            variacao = (resultado['mediana_s'] / anterior['mediana_s'] - 1) * 100
+            resultado['variacao_percentual'] = variacao
+            comparacao = f"{variacao:+.1f}%"
+            if variacao > args.limite_regressao:
+                comparacao += " REGRESSÃO"
+        linhas = '' if resultado['linhas'] is None else resultado['linhas']
+        print(f"{caso.nome:<38}{resultado['mediana_s']:>12.4f}{linhas:>10}{resultado['instrucoes']:>6}{comparacao:>14}")
+
+    relatorio = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'dialeto': dialeto,
+        'commit': _versao_codigo(),
+        'python': platform.python_version(),
+        'repeticoes': args.repeticoes,
+        'tabelas': _contar_tabelas(engine),
+        'comparado_com': arquivo_anterior,
+        'resultados': resultados,
+    }
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    destino = os.path.join(BENCHMARK_DIR, f"benchmark_{dialeto}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(destino, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2, default=str)
+    print(f"\nResultados gravados em {destino}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# benchmarks/gerador_dados.py
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, insert, text
+from config.database import engine
+from config.settings import DB_CONFIG
+from migrations.migrator import aplicar_migracoes
+from models.fornecedor import Fornecedor
+from models.produto import Produto
+from models.nota_entrada import NotaEntrada
+from models.item_nota_entrada import ItemNotaEntrada
+from models.item_fornecedor import ItemFornecedor
+from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
+from models.inventario_estoque import InventarioEstoque
+from models.item_inventario import ItemInventario
+from repositories.auditoria_visao_repository import NOME_VISAO
+from repositories.fila_associacao_repository import FilaAssociacaoRepository
+from utils.logger import logger
+
+# Volumes pré-definidos; qualquer valor pode ser sobrescrito pela linha de comando
+VOLUMES = {
+    'pequeno': {
+        'fornecedores': 10,
+        'produtos': 500,
+        'itens_nota': 20_000,
+        'itens_por_nota': 25,
+        'inventarios': 6,
+    },
+    'medio': {
+        'fornecedores': 40,
+        'produtos': 2_000,
+        'itens_nota': 200_000,
+        'itens_por_nota': 30,
+        'inventarios': 12,
+    },
+    'grande': {
+        'fornecedores': 100,
+        'produtos': 5_000,
+        'itens_nota': 1_000_000,
+        'itens_por_nota': 40,
+        'inventarios': 24,
+    },
+}
+
+# Fornecedores que vendem cada produto e fração do catálogo sem associação a produto
+FORNECEDORES_POR_PRODUTO = 2
+PERCENTUAL_NAO_ASSOCIADO = 0.05
+# Fração dos produtos associados contados em cada inventário
+PERCENTUAL_CONTADO = 0.8
+GRADES = (1, 6, 12, 24)
+
+TAMANHO_LOTE_INSERCAO = 10_000
+
+# Tabelas com id explícito na geração (sequências ajustadas no PostgreSQL)
+TABELAS_GERADAS = [
+    Fornecedor.__tablename__,
+    Produto.__tablename__,
+    ProdutoFornecedorAssociacao.__tablename__,
+    ItemFornecedor.__tablename__,
+    InventarioEstoque.__tablename__,
+    ItemInventario.__tablename__,
+    NotaEntrada.__tablename__,
+    ItemNotaEntrada.__tablename__,
+]
+
+
+def banco_de_benchmark():
+    """Só bancos com 'bench' no nome (ou caminho do arquivo SQLite) podem ser recriados"""
+    return 'bench' in (DB_CONFIG.get('database') or '').lower()
+
+
+def recriar_schema():
+    """Apaga todas as tabelas do banco configurado e aplica as migrações do zero"""
+    with engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {NOME_VISAO}"))
+        # Tabelas lidas do banco: inclui as criadas por migrações cujos models não foram importados
+        existentes = MetaData()
+        existentes.reflect(bind=conn)
+        existentes.drop_all(bind=conn)
+    aplicar_migracoes()
+
+
+def _inserir(conn, tabela, linhas):
+    for inicio in range(0, len(linhas), TAMANHO_LOTE_INSERCAO):
+        conn.execute(insert(tabela), linhas[inicio:inicio + TAMANHO_LOTE_INSERCAO])
+
+
+def _fim_do_mes(ano, mes):
+    proximo = datetime(ano + mes // 12, mes % 12 + 1, 1)
+    return proximo - timedelta(seconds=1)
+
+
+def _meses_inventario(total, referencia):
+    """Os últimos `total` meses encerrados antes de `referencia`, do mais antigo ao mais recente"""
+    meses = []
+    ano, mes = referencia.year, referencia.month
+    for _ in range(total):
+        mes -= 1
+        if mes == 0:
+            ano, mes = ano - 1, 12
+        meses.append((ano, mes))
+    return list(reversed(meses))
+
+
+def _ajustar_sequencias(conn):
+    # Com id explícito o PostgreSQL não avança as sequências (MySQL e SQLite avançam sozinhos)
+    if conn.dialect.name != 'postgresql':
+        return
+    for tabela in TABELAS_GERADAS:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {tabela}), 1))"
+        ))
+
+
+def gerar_dados(volume: dict, semente: int = 42):
+    """
+    Preenche um banco vazio com fornecedores, produtos, associações, notas de entrada,
+    itens e inventários encerrados (com contagens) nas quantidades de `volume`.
+
+    As notas são distribuídas entre o início do primeiro e o fim do último inventário.
+    Uma fração do catálogo de cada fornecedor fica sem associação, para que a
+    listagem de itens não associados tenha o que encontrar.
+
+    Returns:
+        dict com a quantidade de linhas gravadas por tabela.
+    """
+    aleatorio = random.Random(semente)
+    inicio = time.perf_counter()
+    totais = {}
+
+    total_fornecedores = volume['fornecedores']
+    total_produtos = volume['produtos']
+
+    fornecedores = [
+        {
+            'id': fornecedor_id,
+            'nome': f"Fornecedor {fornecedor_id:04d}",
+            'cnpj': f"{fornecedor_id:014d}",
+            'email': f"fornecedor{fornecedor_id}@exemplo.com",
+            'telefone': None,
+        }
+        for fornecedor_id in range(1, total_fornecedores + 1)
+    ]
+    produtos = [
+        {
+            'id': produto_id,
+            'nome': f"Produto {produto_id:05d}",
+            'descricao': None,
+            'unidade_medida': 'UN',
+        }
+        for produto_id in range(1, total_produtos + 1)
+    ]
+
+    # Catálogo de cada fornecedor: (item_fornecedor_id, código, descrição, unidade, produto, grade);
+    # associados viram associações
+    catalogo = {fornecedor['id']: [] for fornecedor in fornecedores}
+    associacoes = []
+    itens_fornecedor = []
+
+    def _registrar_item(fornecedor_id, codigo, descricao, unidade, associacao=None):
+        itens_fornecedor.append({
+            'id': len(itens_fornecedor) + 1,
+            'fornecedor_id': fornecedor_id,
+            'codigo_produto_fornecedor': codigo,
+            'descricao': descricao,
+            'unidade_medida': unidade,
+            'associacao_id': associacao['id'] if associacao else None,
+        })
+        catalogo[fornecedor_id].append((
+            len(itens_fornecedor), codigo, descricao, unidade,
+            associacao['produto_id'] if associacao else None,
+            associacao['quantidade_por_grade'] if associacao else None,
+        ))
+
+    for produto in produtos:
+        vendedores = aleatorio.sample(range(1, total_fornecedores + 1), min(FORNECEDORES_POR_PRODUTO, total_fornecedores))
+        for fornecedor_id in vendedores:
+            grade = aleatorio.choice(GRADES)
+            codigo = f"F{fornecedor_id:03d}P{produto['id']:06d}"
+            descricao = f"PRODUTO {produto['id']} CX{grade}"
+            associacoes.append({
+                'id': len(associacoes) + 1,
+                'produto_id': produto['id'],
+                'fornecedor_id': fornecedor_id,
+                'quantidade_por_grade': grade,
+                'codigo_produto_fornecedor': codigo,
+                'descricao_produto_fornecedor': descricao,
+            })
+            _registrar_item(fornecedor_id, codigo, descricao, 'CX' if grade > 1 else 'UN', associacoes[-1])
+
+    total_nao_associados = max(1, int(len(associacoes) * PERCENTUAL_NAO_ASSOCIADO))
+    for sequencia in range(1, total_nao_associados + 1):
+        fornecedor_id = aleatorio.randint(1, total_fornecedores)
+        _registrar_item(fornecedor_id, f"F{fornecedor_id:03d}N{sequencia:06d}", f"ITEM SEM CADASTRO {sequencia}", 'UN')
+
+    # Inventários mensais encerrados; as notas cobrem todo o período
+    meses = _meses_inventario(volume['inventarios'], datetime.now())
+    inventarios = []
+    for inventario_id, (ano, mes) in enumerate(meses, start=1):
+        fim = _fim_do_mes(ano, mes)
+        inventarios.append({
+            'id': inventario_id,
+            'referencia': f"{mes:02d}/{ano}",
+            'data_inicio_contagem': fim - timedelta(hours=8),
+            'data_fim_contagem': fim,
+            'observacoes': "Gerado para benchmark",
+        })
+    inicio_periodo = datetime(meses[0][0], meses[0][1], 1)
+    segundos_periodo = int((inventarios[-1]['data_fim_contagem'] - inicio_periodo).total_seconds())
+
+    itens_inventario = []
+    produtos_associados = sorted({associacao['produto_id'] for associacao in associacoes})
+    for inventario in inventarios:
+        for produto_id in produtos_associados:
+            if aleatorio.random() < PERCENTUAL_CONTADO:
+                itens_inventario.append({
+                    'id': len(itens_inventario) + 1,
+                    'inventario_id': inventario['id'],
+                    'produto_id': produto_id,
+                    'quantidade_contada': float(aleatorio.randint(0, 50)),
+                })
+
+    with engine.begin() as conn:
+        _inserir(conn, Fornecedor.__table__, fornecedores)
+        _inserir(conn, Produto.__table__, produtos)
+        _inserir(conn, ProdutoFornecedorAssociacao.__table__, associacoes)
+        _inserir(conn, ItemFornecedor.__table__, itens_fornecedor)
+        _inserir(conn, InventarioEstoque.__table__, inventarios)
+        _inserir(conn, ItemInventario.__table__, itens_inventario)
+    totais.update({
+        'fornecedores': len(fornecedores),
+        'produtos': len(produtos),
+        'produto_fornecedor_associacao': len(associacoes),
+        'itens_fornecedor': len(itens_fornecedor),
+        'inventario_estoque': len(inventarios),
+        'itens_inventario': len(itens_inventario),
+    })
+
+    # Notas e itens gerados e gravados em blocos (o volume de itens pode passar de 1 milhão)
+    total_notas = math.ceil(volume['itens_nota'] / volume['itens_por_nota'])
+    fornecedores_com_catalogo = [fornecedor_id for fornecedor_id, itens in catalogo.items() if itens]
+    notas, itens = [], []
+    item_id = 0
+    restantes = volume['itens_nota']
+    for nota_id in range(1, total_notas + 1):
+        fornecedor_id = aleatorio.choice(fornecedores_com_catalogo)
+        quantidade_itens = min(volume['itens_por_nota'], restantes)
+        restantes -= quantidade_itens
+
+        total_nota = 0.0
+        for item_fornecedor_id, codigo, descricao, unidade, produto_id, grade in aleatorio.choices(catalogo[fornecedor_id], k=quantidade_itens):
+            item_id += 1
+            quantidade = float(aleatorio.randint(1, 20))
+            valor = round(aleatorio.uniform(1, 200), 2)
+            total_nota += quantidade * valor
+            itens.append({
+                'id': item_id,
+                'nota_entrada_id': nota_id,
+                'codigo_produto_fornecedor': codigo,
+                'descricao': descricao,
+                'quantidade': quantidade,
+                'unidade_medida': unidade,
+                'valor': valor,
+                # Já resolvidos, como a gravação da nota faz pelo serviço
+                'item_fornecedor_id': item_fornecedor_id,
+                'produto_id': produto_id,
+                'quantidade_por_grade': grade,
+            })
+
+        notas.append({
+            'id': nota_id,
+            'modelo': 55,
+            'chave_acesso': None,
+            'fornecedor_id': fornecedor_id,
+            'data_emissao': inicio_periodo + timedelta(seconds=aleatorio.randint(0, segundos_periodo)),
+            'url': None,
+            'numero_nota_entrada': nota_id,
+            'serie_nota_entrada': 1,
+            'total_nota_entrada': round(total_nota, 2),
+        })
+
+        if len(itens) >= TAMANHO_LOTE_INSERCAO or nota_id == total_notas:
+            with engine.begin() as conn:
+                _inserir(conn, NotaEntrada.__table__, notas)
+                _inserir(conn, ItemNotaEntrada.__table__, itens)
+            logger.info(f"Benchmark: {nota_id}/{total_notas} notas geradas")
+            notas, itens = [], []
+
+    totais.update({'notas_entrada': total_notas, 'itens_nota_entrada': item_id})
+
+    with engine.begin() as conn:
+        _ajustar_sequencias(conn)
+
+    # Dados gravados direto nas tabelas: a fila de associação é calculada no fim
+    FilaAssociacaoRepository().sincronizar_fornecedores()
+
+    logger.info(f"Benchmark: dados gerados em {time.perf_counter() - inicio:.1f}s - {totais}")
+    return totais
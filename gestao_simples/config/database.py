@@ -1,5 +1,7 @@
 # config/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import streamlit as st
@@ -9,10 +11,15 @@ import time
 from datetime import datetime
 import subprocess
 import platform
-import winreg
+import threading
 from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
 from config.settings import DB_CONFIG, BACKUP_DIR
 
+if platform.system() == 'Windows':
+    import winreg
+
 # Adicionar no arquivo que cria a sessão de banco de dados
 import numpy as np
 from psycopg2.extensions import register_adapter, AsIs
@@ -34,23 +41,293 @@ def get_database_url():
         # PostgreSQL connection
         port = DB_CONFIG.get('port', '5432')  # Default PostgreSQL port
         return f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{port}/{DB_CONFIG['database']}"
+    elif db_type == 'sqlite':
+        # SQLite local (DB_NAME é o caminho do arquivo); usado pelos benchmarks
+        return f"sqlite:///{DB_CONFIG['database'] or './tmp/gestao_simples.db'}"
     else:
         raise ValueError(f"Tipo de banco de dados não suportado: {db_type}")
 
+# Presets do pool por dialeto. Valores definidos no .env (DB_POOL_SIZE, DB_MAX_OVERFLOW,
+# DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_CONNECT_TIMEOUT) têm prioridade sobre estes.
+POOL_PRESETS = {
+    'mysql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 3600,  # Abaixo do wait_timeout padrão do MySQL
+        'connect_timeout': 10,
+    },
+    'postgres': {
+        'pool_size': 10,
+        'max_overflow': 10,  # Cada conexão é um processo no servidor, overflow mais contido
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'connect_timeout': 10,
+    },
+    'sqlite': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': -1,  # Arquivo local, sem timeout de conexão ociosa
+        'connect_timeout': 30,  # Vira o timeout de espera por lock do sqlite3
+    },
+}
+
+
+def get_pool_config():
+    """Combina o preset do dialeto configurado com os valores definidos no .env"""
+    config = dict(POOL_PRESETS.get(DB_CONFIG['type'], POOL_PRESETS['mysql']))
+    for chave in config:
+        valor = DB_CONFIG.get(chave)
+        if valor not in (None, ''):
+            config[chave] = int(valor)
+    return config
+
+
+def get_connect_args():
+    """Argumentos de conexão do driver (o sqlite3 não aceita connect_timeout)"""
+    if DB_CONFIG['type'] == 'sqlite':
+        # As conexões do pool são usadas por threads diferentes (Streamlit, timers)
+        return {'timeout': POOL_CONFIG['connect_timeout'], 'check_same_thread': False}
+    return {'connect_timeout': POOL_CONFIG['connect_timeout']}  # Aceito por pymysql e psycopg2
+
+
+class EstatisticasPool:
+    """Contadores acumulados do pool de conexões desde o início do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.checkouts = 0
+            self.conexoes_abertas = 0
+            self.invalidacoes = 0
+            self.timeouts = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def incrementar(self, contador):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+
+estatisticas_pool = EstatisticasPool()
+
+
+class QueuePoolMonitorado(QueuePool):
+    """QueuePool que mede o tempo gasto aguardando uma conexão livre"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            estatisticas_pool.incrementar('timeouts')
+            raise
+        finally:
+            estatisticas_pool.registrar_espera(time.perf_counter() - inicio)
+
+
 # Create database connection URL
 DATABASE_URL = get_database_url()
+POOL_CONFIG = get_pool_config()
 
 # Create engine with logging
 engine = create_engine(
     DATABASE_URL,
     echo=False,  # Enable SQL logging
+    poolclass=QueuePoolMonitorado,
     pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=3600  # Recycle connections after 1 hour
+    pool_size=POOL_CONFIG['pool_size'],
+    max_overflow=POOL_CONFIG['max_overflow'],
+    pool_timeout=POOL_CONFIG['pool_timeout'],
+    pool_recycle=POOL_CONFIG['pool_recycle'],
+    connect_args=get_connect_args(),
 )
 
+
+@event.listens_for(engine, "checkout")
+def _registrar_checkout(dbapi_connection, connection_record, connection_proxy):
+    estatisticas_pool.incrementar('checkouts')
+
+
+@event.listens_for(engine, "connect")
+def _registrar_conexao(dbapi_connection, connection_record):
+    estatisticas_pool.incrementar('conexoes_abertas')
+
+
+@event.listens_for(engine, "invalidate")
+def _registrar_invalidacao(dbapi_connection, connection_record, exception):
+    estatisticas_pool.incrementar('invalidacoes')
+
+
+def obter_estatisticas_pool():
+    """Retorna a situação atual do pool e os contadores acumulados"""
+    pool = engine.pool
+    checkouts = estatisticas_pool.checkouts
+    return {
+        'tamanho': pool.size(),
+        'max_overflow': POOL_CONFIG['max_overflow'],
+        'em_uso': pool.checkedout(),
+        'livres': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'checkouts': checkouts,
+        'conexoes_abertas': estatisticas_pool.conexoes_abertas,
+        'invalidacoes': estatisticas_pool.invalidacoes,
+        'timeouts': estatisticas_pool.timeouts,
+        'espera_media_ms': (estatisticas_pool.espera_total / checkouts * 1000) if checkouts else 0.0,
+        'espera_maxima_ms': estatisticas_pool.espera_maxima * 1000,
+    }
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Sessão compartilhada pela unidade de trabalho (uma por rerun/operação).
+# expire_on_commit=False mantém os objetos legíveis depois do commit de uma
+# escrita e depois que a sessão é fechada no fim da unidade de trabalho.
+UnitOfWorkSession = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# ContextVar isola a sessão por thread (cada sessão do Streamlit roda em sua própria thread)
+_sessao_atual = ContextVar("sessao_atual", default=None)
+
+
+@contextmanager
+def unit_of_work(ativo=None):
+    """
+    Abre uma unidade de trabalho: todas as chamadas de repositório dentro do bloco
+    compartilham a mesma sessão, ligada a uma única conexão retirada do pool na
+    entrada e devolvida só na saída do bloco (um checkout por rerun).
+
+    As escritas continuam confirmando (commit) imediatamente dentro dos repositórios,
+    então um st.rerun() disparado depois delas não descarta dados. Cada chamada de
+    repositório encerra a própria transação ao terminar (ver obter_sessao): a conexão
+    continua reservada, mas sem transação aberta entre as consultas. Ao sair do bloco
+    a sessão é desfeita (rollback) e fechada e a conexão volta ao pool: alterações
+    pendentes que não passaram por um repositório são descartadas.
+
+    Args:
+        ativo: força ligar/desligar a unidade de trabalho. Quando None, usa
+            DB_CONFIG['unit_of_work'] (variável DB_UNIT_OF_WORK do .env).
+    """
+    if ativo is None:
+        ativo = DB_CONFIG.get('unit_of_work', True)
+
+    # Desligada ou já existe uma unidade de trabalho aberta: reutiliza o contexto atual
+    if not ativo or _sessao_atual.get() is not None:
+        yield _sessao_atual.get()
+        return
+
+    # A sessão ligada a uma Connection abre e confirma transações nela sem devolvê-la ao pool
+    conexao = engine.connect()
+    session = UnitOfWorkSession(bind=conexao)
+    token = _sessao_atual.set(session)
+    try:
+        yield session
+    finally:
+        _sessao_atual.reset(token)
+        try:
+            session.rollback()
+        finally:
+            session.close()
+            conexao.close()
+
+
+@contextmanager
+def sessao_isolada():
+    """
+    Suspende a unidade de trabalho atual dentro do bloco, voltando ao comportamento
+    de uma SessionLocal por chamada de repositório.
+    """
+    token = _sessao_atual.set(None)
+    try:
+        yield
+    finally:
+        _sessao_atual.reset(token)
+
+
+@contextmanager
+def contar_instrucoes(session):
+    """
+    Conta as instruções SQL enviadas pela conexão da sessão dentro do bloco.
+
+    Um executemany conta como uma instrução por lote enviado ao driver.
+    Uso: with contar_instrucoes(session) as contador: ...; contador['instrucoes']
+    """
+    conexao = session.connection()
+    contador = {'instrucoes': 0}
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        contador['instrucoes'] += 1
+
+    event.listen(conexao, "before_cursor_execute", _contar)
+    try:
+        yield contador
+    finally:
+        event.remove(conexao, "before_cursor_execute", _contar)
+
+
+@contextmanager
+def _uso_da_unidade_de_trabalho(session):
+    """
+    Uso da sessão da unidade de trabalho por uma chamada de repositório.
+
+    Ao terminar a chamada mais externa: com erro, desfaz a transação (um commit com
+    falha não contamina as chamadas seguintes do rerun); sem erro, encerra a transação
+    de leitura (a conexão da unidade fica ociosa e enxerga o que outras sessões gravarem) e
+    desanexa os objetos lidos, para que alterações feitas neles pelas telas só sejam
+    gravadas quando passadas explicitamente a um repositório.
+    """
+    profundidade = session.info.get('profundidade_uow', 0)
+    session.info['profundidade_uow'] = profundidade + 1
+    try:
+        yield
+    except Exception:
+        if profundidade == 0:
+            session.rollback()
+            session.expunge_all()
+        raise
+    else:
+        if profundidade == 0:
+            if session.new or session.dirty or session.deleted:
+                # Alterações deixadas pela chamada sem commit não são gravadas por outra
+                session.rollback()
+            else:
+                session.commit()  # expire_on_commit=False: os objetos continuam legíveis
+            session.expunge_all()
+    finally:
+        session.info['profundidade_uow'] = profundidade
+
+
+@contextmanager
+def obter_sessao(session=None):
+    """
+    Fornece a sessão a ser usada por um repositório.
+
+    Prioridade: sessão recebida explicitamente, sessão da unidade de trabalho ativa e,
+    por fim, uma nova SessionLocal que é fechada ao sair do bloco. Apenas a sessão
+    criada aqui é fechada; as demais pertencem a quem as abriu.
+    A transação da unidade de trabalho termina junto com cada chamada de repositório.
+    """
+    if session is not None:
+        yield session
+        return
+
+    session = _sessao_atual.get()
+    if session is not None:
+        with _uso_da_unidade_de_trabalho(session):
+            yield session
+        return
+
+    with SessionLocal() as session:
+        yield session
+
 
 def get_mysql_path():
     """
@@ -15,14 +15,35 @@ DEFAULT_PASSWORD = os.getenv("DEFAULT_PASSWORD")
 
 # conexão com o banco de dados
 DB_CONFIG = {
-    'type': os.getenv('DB_TYPE', 'mysql'),  # 'mysql' ou 'postgres'
+    'type': os.getenv('DB_TYPE', 'mysql'),  # 'mysql', 'postgres' ou 'sqlite' (DB_NAME = caminho do arquivo)
     'user': os.getenv('DB_USER'),
     'password': os.getenv('DB_PASSWORD'),
     'host': os.getenv('DB_HOST'),
     'database': os.getenv('DB_NAME'),
     'port': os.getenv('DB_PORT'),  # Porta opcional, útil para PostgreSQL
+    # Uma sessão por rerun/operação (false volta a abrir uma sessão por chamada de repositório)
+    'unit_of_work': os.getenv('DB_UNIT_OF_WORK', 'true').lower() in ('true', '1', 'sim'),
+    # Pool de conexões (opcionais; quando vazios valem os presets por dialeto de config/database.py)
+    'pool_size': os.getenv('DB_POOL_SIZE'),
+    'max_overflow': os.getenv('DB_MAX_OVERFLOW'),
+    'pool_timeout': os.getenv('DB_POOL_TIMEOUT'),  # segundos aguardando uma conexão livre
+    'pool_recycle': os.getenv('DB_POOL_RECYCLE'),  # segundos até reciclar uma conexão
+    'connect_timeout': os.getenv('DB_CONNECT_TIMEOUT'),  # segundos para abrir uma conexão nova
 }
 
+# Motor de cálculo das camadas PEPS: 'sql' (CTE com funções de janela no banco)
+# ou 'numpy' (lotes lidos uma vez e consumo vetorizado em Python)
+AUDITORIA_MOTOR = os.getenv('AUDITORIA_MOTOR', 'sql')
+
+# Parte das camadas gravadas do inventário anterior e lê do banco só as notas emitidas depois dele
+AUDITORIA_INCREMENTAL = os.getenv('AUDITORIA_INCREMENTAL', 'true').lower() in ('true', '1', 'sim')
+
+# Onde ficam as camadas lidas pela auditoria: 'auto' (visão materializada no PostgreSQL,
+# tabela de resumo no MySQL), 'visao' ou 'tabela'
+AUDITORIA_ESTRATEGIA = os.getenv('AUDITORIA_ESTRATEGIA', 'auto')
+# Segundos agrupando alterações antes do REFRESH da visão materializada
+AUDITORIA_ATRASO_ATUALIZACAO = float(os.getenv('AUDITORIA_ATRASO_ATUALIZACAO', '5'))
+
 # Criar diretório de logs se não existir
 LOG_DIR = "./tmp/.logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -40,6 +61,28 @@ os.makedirs(BACKUP_DIR, exist_ok=True)
 CAPTURE_DIR = "./tmp/.capturas"
 os.makedirs(CAPTURE_DIR, exist_ok=True)
 
+# Arquivos gerados para download (ex.: exportação da auditoria)
+EXPORT_DIR = "./tmp/.exportacoes"
+os.makedirs(EXPORT_DIR, exist_ok=True)
+
+# Documentos fiscais já obtidos (HTML da SEFAZ e leituras de cupons), comprimidos
+DOCUMENTOS_DIR = "./tmp/.documentos"
+os.makedirs(DOCUMENTOS_DIR, exist_ok=True)
+
+# Resultados dos benchmarks (python -m benchmarks.executar)
+BENCHMARK_DIR = "./tmp/.benchmarks"
+
+# Linhas lidas por vez nas consultas em streaming (cursor no servidor)
+TAMANHO_LOTE_STREAMING = int(os.getenv('TAMANHO_LOTE_STREAMING', '2000'))
+
+# Navegadores Chrome mantidos abertos entre as consultas com CAPTCHA (por processo)
+NAVEGADOR_POOL_TAMANHO = int(os.getenv('NAVEGADOR_POOL_TAMANHO', '2'))
+# Segundos sem uso até um navegador ocioso ser fechado
+NAVEGADOR_TEMPO_OCIOSO = float(os.getenv('NAVEGADOR_TEMPO_OCIOSO', '600'))
+
+# Conexões keep-alive mantidas com a SEFAZ pela sessão HTTP compartilhada (consultas sem navegador)
+SEFAZ_CONEXOES = int(os.getenv('SEFAZ_CONEXOES', '10'))
+
 # Configuração do cache
 CACHE_DIR = "./tmp/.cache"
 CHROME_DRIVER_CACHE_PATH = os.path.join(CACHE_DIR, "chromedriver_path.txt")
@@ -0,0 +1,92 @@
+# migrations/migrator.py
+import threading
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, insert, func
+from config.database import engine
+from utils.logger import logger
+from migrations import (
+    v001_schema_inicial,
+    v002_indices,
+    v003_camadas_peps,
+    v004_saldos_fechamento,
+    v005_visao_auditoria,
+    v006_fila_associacao,
+    v007_produto_itens_nota,
+    v008_itens_fornecedor,
+    v009_versao_dados,
+)
+
+# Migrações em ordem de versão. Cada módulo expõe VERSAO, DESCRICAO e aplicar(conn).
+# O DDL de cada versão é congelado no próprio módulo (sem importar models): mudanças
+# nos models entram em uma nova versão. As migrações são idempotentes (checkfirst /
+# inspeção antes de alterar), pois bancos antigos já tinham parte do schema.
+MIGRACOES = [
+    v001_schema_inicial,
+    v002_indices,
+    v003_camadas_peps,
+    v004_saldos_fechamento,
+    v005_visao_auditoria,
+    v006_fila_associacao,
+    v007_produto_itens_nota,
+    v008_itens_fornecedor,
+    v009_versao_dados,
+]
+
+_metadata = MetaData()
+
+schema_versao = Table(
+    'schema_versao',
+    _metadata,
+    Column('versao', Integer, primary_key=True, autoincrement=False),
+    Column('descricao', String(255), nullable=False),
+    Column('aplicada_em', DateTime, nullable=False),
+)
+
+_lock = threading.Lock()
+_schema_atualizado = False
+
+
+def versao_mais_recente():
+    return MIGRACOES[-1].VERSAO
+
+
+def obter_versao_aplicada(conn):
+    """Retorna a última versão registrada no banco (0 se nenhuma)"""
+    schema_versao.create(conn, checkfirst=True)
+    return conn.execute(select(func.max(schema_versao.c.versao))).scalar() or 0
+
+
+def aplicar_migracoes(bind=None):
+    """
+    Aplica as migrações pendentes uma única vez por processo.
+
+    O Streamlit reexecuta o app.py a cada interação; depois da primeira verificação
+    bem-sucedida as chamadas seguintes retornam sem tocar no banco.
+    """
+    global _schema_atualizado
+    if _schema_atualizado:
+        return
+
+    bind = bind or engine
+    with _lock:
+        if _schema_atualizado:
+            return
+
+        with bind.begin() as conn:
+            versao_aplicada = obter_versao_aplicada(conn)
+
+        pendentes = [m for m in MIGRACOES if m.VERSAO > versao_aplicada]
+        for migracao in pendentes:
+            logger.info(f"Aplicando migração {migracao.VERSAO:03d}: {migracao.DESCRICAO}")
+            with bind.begin() as conn:
+                migracao.aplicar(conn)
+                conn.execute(insert(schema_versao).values(
+                    versao=migracao.VERSAO,
+                    descricao=migracao.DESCRICAO,
+                    aplicada_em=datetime.now()
+                ))
+
+        if pendentes:
+            logger.info(f"Schema atualizado para a versão {versao_mais_recente()}")
+
+        _schema_atualizado = True
@@ -0,0 +1,110 @@
+# migrations/v001_schema_inicial.py
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+VERSAO = 1
+DESCRICAO = "Schema inicial"
+
+# Schema congelado como era criado pelo antigo create_all dos models. Migrações já
+# distribuídas não importam models: alterações de schema entram em novas versões.
+metadata = MetaData()
+
+
+def _auditoria():
+    """Colunas de BaseModel"""
+    return [
+        Column('created_at', DateTime(timezone=True), server_default=func.now()),
+        Column('updated_at', DateTime(timezone=True)),
+    ]
+
+
+Table(
+    'usuarios', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('nome', String(100), nullable=False),
+    Column('email', String(100), unique=True, nullable=False),
+    Column('senha_hash', String(255), nullable=False),
+    Column('is_admin', Boolean),
+    Column('ativo', Boolean),
+    *_auditoria(),
+)
+
+Table(
+    'fornecedores', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('nome', String(100), nullable=False),
+    Column('cnpj', String(14), unique=True, nullable=False),
+    Column('email', String(100)),
+    Column('telefone', String(20)),
+    *_auditoria(),
+)
+
+Table(
+    'produtos', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('nome', String(100), nullable=False),
+    Column('descricao', String(255)),
+    Column('unidade_medida', String(2), nullable=False),
+    *_auditoria(),
+)
+
+Table(
+    'notas_entrada', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('modelo', Integer, nullable=True),
+    Column('chave_acesso', String(44), unique=True, nullable=True),
+    Column('fornecedor_id', Integer, ForeignKey('fornecedores.id')),
+    Column('data_emissao', DateTime, nullable=False),
+    Column('url', String(255), nullable=True),
+    Column('numero_nota_entrada', Integer, nullable=True),
+    Column('serie_nota_entrada', Integer, nullable=True),
+    Column('total_nota_entrada', Float, nullable=False),
+    *_auditoria(),
+)
+
+Table(
+    'itens_nota_entrada', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('nota_entrada_id', Integer, ForeignKey('notas_entrada.id')),
+    Column('codigo_produto_fornecedor', String(255), nullable=True),
+    Column('descricao', String(255), nullable=False),
+    Column('quantidade', Float, nullable=False),
+    Column('unidade_medida', String(50), nullable=False),
+    Column('valor', Float, nullable=False),
+    *_auditoria(),
+)
+
+Table(
+    'produto_fornecedor_associacao', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('produto_id', Integer, ForeignKey('produtos.id'), nullable=False),
+    Column('fornecedor_id', Integer, ForeignKey('fornecedores.id'), nullable=False),
+    Column('quantidade_por_grade', Float, nullable=False),
+    Column('codigo_produto_fornecedor', String(255), nullable=False),
+    Column('descricao_produto_fornecedor', String(255), nullable=False),
+    *_auditoria(),
+)
+
+Table(
+    'inventario_estoque', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('referencia', String(7), nullable=False, unique=True),
+    Column('data_inicio_contagem', DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column('data_fim_contagem', DateTime(timezone=True), nullable=True),
+    Column('observacoes', String(255)),
+    *_auditoria(),
+)
+
+Table(
+    'itens_inventario', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('inventario_id', Integer, ForeignKey('inventario_estoque.id'), nullable=False),
+    Column('produto_id', Integer, ForeignKey('produtos.id'), nullable=False),
+    Column('quantidade_contada', Float, nullable=False),
+    *_auditoria(),
+)
+
+
+def aplicar(conn):
+    # checkfirst: bancos existentes (criados pelo antigo create_all) não são alterados
+    metadata.create_all(bind=conn, checkfirst=True)
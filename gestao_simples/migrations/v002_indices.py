@@ -0,0 +1,118 @@
+# migrations/v002_indices.py
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, Index
+from utils.plano_consulta import explicar_consulta
+from utils.logger import logger
+
+VERSAO = 2
+DESCRICAO = "Índices das junções e filtros da auditoria PEPS e das notas"
+
+# Índices congelados nesta versão, sobre tabelas reduzidas às colunas indexadas
+# (as tabelas já existem; só os índices são criados)
+_metadata = MetaData()
+
+Table(
+    'itens_nota_entrada', _metadata,
+    Column('nota_entrada_id', Integer),
+    Column('codigo_produto_fornecedor', String(255)),
+    Column('quantidade', Float),
+    Column('valor', Float),
+    # Junção nota -> itens da auditoria PEPS (cobre quantidade/valor no PostgreSQL)
+    Index(
+        'ix_itens_nota_entrada_nota_codigo', 'nota_entrada_id', 'codigo_produto_fornecedor',
+        postgresql_include=['quantidade', 'valor']
+    ),
+    Index('ix_itens_nota_entrada_codigo', 'codigo_produto_fornecedor'),
+)
+
+Table(
+    'notas_entrada', _metadata,
+    Column('fornecedor_id', Integer),
+    Column('data_emissao', DateTime),
+    Index('ix_notas_entrada_fornecedor_emissao', 'fornecedor_id', 'data_emissao'),
+    # Corte por data do inventário na auditoria PEPS
+    Index('ix_notas_entrada_emissao', 'data_emissao'),
+)
+
+Table(
+    'produto_fornecedor_associacao', _metadata,
+    Column('produto_id', Integer),
+    Column('fornecedor_id', Integer),
+    Column('codigo_produto_fornecedor', String(255)),
+    Column('quantidade_por_grade', Float),
+    # Junção item da nota -> produto (cobre produto/grade no PostgreSQL)
+    Index(
+        'ix_pfa_fornecedor_codigo', 'fornecedor_id', 'codigo_produto_fornecedor',
+        postgresql_include=['produto_id', 'quantidade_por_grade']
+    ),
+    Index('ix_pfa_produto', 'produto_id'),
+)
+
+Table(
+    'itens_inventario', _metadata,
+    Column('inventario_id', Integer),
+    Column('produto_id', Integer),
+    Column('quantidade_contada', Float),
+    Index(
+        'ix_itens_inventario_inventario_produto', 'inventario_id', 'produto_id',
+        postgresql_include=['quantidade_contada']
+    ),
+)
+
+Table(
+    'inventario_estoque', _metadata,
+    Column('data_fim_contagem', DateTime),
+    # "Último inventário" da auditoria (ORDER BY data_fim_contagem DESC LIMIT 1)
+    Index('ix_inventario_estoque_fim_contagem', 'data_fim_contagem'),
+)
+
+INDICES = sorted(
+    (indice for tabela in _metadata.sorted_tables for indice in tabela.indexes),
+    key=lambda indice: indice.name,
+)
+
+# Caminhos de acesso que motivaram os índices; o plano é registrado no log antes e depois
+CONSULTAS_QUENTES = {
+    'entradas_peps': """
+        SELECT pfa.produto_id, ne.data_emissao, ine.quantidade, ine.valor, pfa.quantidade_por_grade
+        FROM itens_nota_entrada ine
+        JOIN notas_entrada ne ON ine.nota_entrada_id = ne.id
+        JOIN produto_fornecedor_associacao pfa
+            ON ine.codigo_produto_fornecedor = pfa.codigo_produto_fornecedor
+            AND ne.fornecedor_id = pfa.fornecedor_id
+        WHERE ne.data_emissao <= :data_corte
+    """,
+    'itens_unicos_fornecedor': """
+        SELECT ine.codigo_produto_fornecedor, ine.unidade_medida, ine.descricao,
+               MAX(ine.valor), MAX(ne.data_emissao)
+        FROM itens_nota_entrada ine
+        JOIN notas_entrada ne ON ine.nota_entrada_id = ne.id
+        WHERE ne.fornecedor_id = :fornecedor_id
+        GROUP BY ine.codigo_produto_fornecedor, ine.unidade_medida, ine.descricao
+    """,
+    'contagem_inventario': """
+        SELECT produto_id, SUM(quantidade_contada)
+        FROM itens_inventario
+        WHERE inventario_id = :inventario_id
+        GROUP BY produto_id
+    """,
+}
+
+
+def _registrar_planos(conn, momento):
+    params = {'data_corte': datetime.now(), 'fornecedor_id': 0, 'inventario_id': 0}
+    for nome, sql in CONSULTAS_QUENTES.items():
+        try:
+            plano = explicar_consulta(conn, sql, params)
+            logger.info(f"Plano de '{nome}' {momento} dos índices:\n{plano}")
+        except Exception as e:
+            # O plano é apenas diagnóstico; não deve impedir a migração
+            logger.warning(f"Não foi possível obter o plano de '{nome}': {e}")
+
+
+def aplicar(conn):
+    _registrar_planos(conn, "antes")
+    for indice in INDICES:
+        # checkfirst: bancos que já receberam os índices não são alterados
+        indice.create(conn, checkfirst=True)
+    _registrar_planos(conn, "depois")
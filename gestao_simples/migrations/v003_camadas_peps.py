@@ -0,0 +1,48 @@
+# migrations/v003_camadas_peps.py
+from sqlalchemy import MetaData, Table, Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+VERSAO = 3
+DESCRICAO = "Camadas PEPS gravadas por inventário"
+
+_metadata = MetaData()
+
+# Referenciadas pelas chaves estrangeiras (já existem, não são criadas aqui)
+Table('inventario_estoque', _metadata, Column('id', Integer, primary_key=True))
+Table('produtos', _metadata, Column('id', Integer, primary_key=True))
+
+camadas = Table(
+    'auditoria_camadas_peps', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('inventario_id', Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), nullable=False),
+    Column('produto_id', Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False),
+    Column('item_nota_entrada_id', Integer, nullable=False),
+    Column('data_emissao', DateTime, nullable=False),
+    Column('quantidade_unidades', Float, nullable=False),
+    Column('valor_unitario', Float, nullable=False),
+    Column('valor_total_lote', Float, nullable=False),
+    Column('quantidade_acumulada', Float, nullable=False),
+    Column('quantidade_saida', Float, nullable=False),
+    Column('quantidade_consumida', Float, nullable=False),
+    Column('saldo_remanescente', Float, nullable=False),
+    Column('valor_consumido', Float, nullable=False),
+    Column('valor_saldo_remanescente', Float, nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+    Index('ix_camadas_peps_inventario_produto', 'inventario_id', 'produto_id', 'data_emissao'),
+)
+
+estado = Table(
+    'auditoria_camadas_estado', _metadata,
+    Column('inventario_id', Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), primary_key=True),
+    Column('data_corte', DateTime(timezone=True), nullable=False),
+    Column('atualizado_em', DateTime(timezone=True), nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+)
+
+
+def aplicar(conn):
+    # As camadas são preenchidas sob demanda na primeira leitura de cada inventário
+    camadas.create(conn, checkfirst=True)
+    estado.create(conn, checkfirst=True)
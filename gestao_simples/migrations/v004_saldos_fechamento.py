@@ -0,0 +1,33 @@
+# migrations/v004_saldos_fechamento.py
+from sqlalchemy import MetaData, Table, Column, Integer, Float, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+
+VERSAO = 4
+DESCRICAO = "Saldos PEPS no encerramento dos inventários"
+
+_metadata = MetaData()
+
+# Referenciadas pelas chaves estrangeiras (já existem, não são criadas aqui)
+Table('inventario_estoque', _metadata, Column('id', Integer, primary_key=True))
+Table('produtos', _metadata, Column('id', Integer, primary_key=True))
+
+saldos = Table(
+    'auditoria_saldos_fechamento', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('inventario_id', Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), nullable=False),
+    Column('produto_id', Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False),
+    Column('item_nota_entrada_id', Integer, nullable=False),
+    Column('data_emissao', DateTime, nullable=False),
+    Column('quantidade_unidades', Float, nullable=False),
+    Column('valor_unitario', Float, nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+    Index('ix_saldos_fechamento_inventario_produto', 'inventario_id', 'produto_id'),
+)
+
+
+def aplicar(conn):
+    # Preenchidos quando as camadas de cada inventário são (re)calculadas
+    saldos.create(conn, checkfirst=True)
+    # Camadas calculadas antes desta versão não têm saldo gravado: recalcula na próxima leitura
+    conn.execute(text("DELETE FROM auditoria_camadas_estado"))
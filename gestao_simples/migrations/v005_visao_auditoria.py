@@ -0,0 +1,16 @@
+# migrations/v005_visao_auditoria.py
+from sqlalchemy import text
+from repositories.auditoria_visao_repository import SQL_CRIAR_VISAO, SQL_INDICES_VISAO
+
+VERSAO = 5
+DESCRICAO = "Visão materializada das camadas PEPS (PostgreSQL)"
+
+
+def aplicar(conn):
+    # No MySQL as camadas ficam na tabela de resumo auditoria_camadas_peps (v003)
+    if conn.dialect.name != 'postgresql':
+        return
+
+    conn.execute(text(SQL_CRIAR_VISAO))
+    for sql in SQL_INDICES_VISAO:
+        conn.execute(text(sql))
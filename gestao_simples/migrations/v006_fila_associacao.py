@@ -0,0 +1,41 @@
+# migrations/v006_fila_associacao.py
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, ForeignKey, Index, delete, insert, inspect
+from sqlalchemy.sql import func
+from repositories.produto_fornecedor_associacao_repository import consulta_itens_nao_associados
+
+VERSAO = 6
+DESCRICAO = "Fila persistida de itens aguardando associação"
+
+_metadata = MetaData()
+
+# Referenciada pela chave estrangeira (já existe, não é criada aqui)
+Table('fornecedores', _metadata, Column('id', Integer, primary_key=True))
+
+fila = Table(
+    'fila_associacao', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('fornecedor_id', Integer, ForeignKey('fornecedores.id', ondelete='CASCADE'), nullable=False),
+    Column('codigo_produto_fornecedor', String(255), nullable=False),
+    Column('descricao', String(255), nullable=False),
+    Column('unidade_medida', String(50), nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+    Index('ix_fila_associacao_fornecedor_codigo', 'fornecedor_id', 'codigo_produto_fornecedor'),
+)
+
+
+def aplicar(conn):
+    fila.create(conn, checkfirst=True)
+
+    # A carga inicial lê o catálogo de itens de fornecedor; bancos anteriores a ele
+    # recebem a carga na v008
+    colunas = {coluna['name'] for coluna in inspect(conn).get_columns('itens_nota_entrada')}
+    if 'item_fornecedor_id' not in colunas:
+        return
+
+    # Carga inicial com os itens das notas já gravadas que não têm associação
+    conn.execute(delete(fila))
+    conn.execute(insert(fila).from_select(
+        ['fornecedor_id', 'codigo_produto_fornecedor', 'descricao', 'unidade_medida'],
+        consulta_itens_nao_associados()
+    ))
@@ -0,0 +1,159 @@
+# migrations/v007_produto_itens_nota.py
+from sqlalchemy import MetaData, Table, Column, Integer, Index, text, inspect
+from repositories.item_nota_entrada_repository import atualizacao_produtos_resolvidos
+from repositories.auditoria_visao_repository import NOME_VISAO
+
+VERSAO = 7
+DESCRICAO = "Produto e grade resolvidos nos itens das notas de entrada"
+
+_metadata = MetaData()
+
+# Só a coluna indexada (a coluna é adicionada por ALTER TABLE em aplicar)
+Table('itens_nota_entrada', _metadata, Column('produto_id', Integer))
+INDICE_PRODUTO = Index('ix_itens_nota_entrada_produto', _metadata.tables['itens_nota_entrada'].c.produto_id)
+
+# Visão com o produto e a grade resolvidos nos itens (substitui a junção por código da v005).
+# Mesma lógica da CTE de AuditoriaRepository, particionada por inventário e produto.
+SQL_CRIAR_VISAO = f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {NOME_VISAO} AS
+    WITH dados_inventario AS (
+        SELECT id, data_fim_contagem
+        FROM inventario_estoque
+        WHERE data_fim_contagem IS NOT NULL
+    ),
+
+    entradas_ordenadas AS (
+        SELECT
+            di.id AS inventario_id,
+            ine.id AS item_nota_entrada_id,
+            ine.produto_id,
+            ne.data_emissao,
+            (ine.quantidade * ine.quantidade_por_grade) AS quantidade_unidades,
+            ine.valor AS valor_unitario,
+            (ine.quantidade * ine.quantidade_por_grade) * ine.valor AS valor_total_lote
+        FROM
+            itens_nota_entrada ine
+        JOIN notas_entrada ne ON
+            ine.nota_entrada_id = ne.id
+        JOIN dados_inventario di ON
+            ne.data_emissao <= di.data_fim_contagem
+        WHERE
+            ine.produto_id IS NOT NULL
+    ),
+
+    camadas_peps AS (
+        SELECT
+            e.*,
+            SUM(quantidade_unidades) OVER (
+                PARTITION BY inventario_id, produto_id
+                ORDER BY data_emissao ASC, item_nota_entrada_id ASC
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ) AS quantidade_acumulada
+        FROM
+            entradas_ordenadas e
+    ),
+
+    contagens AS (
+        SELECT
+            ii.inventario_id,
+            ii.produto_id,
+            SUM(ii.quantidade_contada) AS quantidade_inventario
+        FROM
+            itens_inventario ii
+        GROUP BY
+            ii.inventario_id,
+            ii.produto_id
+    ),
+
+    total_entradas_saidas AS (
+        SELECT
+            c.inventario_id,
+            c.produto_id,
+            SUM(c.quantidade_unidades) - COALESCE(MAX(ct.quantidade_inventario), 0) AS quantidade_saida
+        FROM
+            camadas_peps c
+        LEFT JOIN contagens ct ON
+            ct.inventario_id = c.inventario_id
+            AND ct.produto_id = c.produto_id
+        GROUP BY
+            c.inventario_id,
+            c.produto_id
+    ),
+
+    consumo_por_camada AS (
+        SELECT
+            c.inventario_id,
+            c.item_nota_entrada_id,
+            c.produto_id,
+            c.data_emissao,
+            c.quantidade_unidades,
+            c.valor_unitario,
+            c.valor_total_lote,
+            c.quantidade_acumulada,
+            ts.quantidade_saida,
+            CASE
+                WHEN ts.quantidade_saida >= c.quantidade_acumulada THEN c.quantidade_unidades
+                WHEN ts.quantidade_saida > COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
+                    PARTITION BY c.inventario_id, c.produto_id
+                    ORDER BY c.data_emissao, c.item_nota_entrada_id
+                ), 0)
+                THEN ts.quantidade_saida - COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
+                    PARTITION BY c.inventario_id, c.produto_id
+                    ORDER BY c.data_emissao, c.item_nota_entrada_id
+                ), 0)
+                ELSE 0
+            END AS quantidade_consumida
+        FROM
+            camadas_peps c
+        JOIN total_entradas_saidas ts ON
+            ts.inventario_id = c.inventario_id
+            AND ts.produto_id = c.produto_id
+    )
+
+    SELECT
+        cc.*,
+        (cc.quantidade_unidades - cc.quantidade_consumida) AS saldo_remanescente,
+        (cc.quantidade_consumida * cc.valor_unitario) AS valor_consumido,
+        ((cc.quantidade_unidades - cc.quantidade_consumida) * cc.valor_unitario) AS valor_saldo_remanescente
+    FROM
+        consumo_por_camada cc
+"""
+
+# O índice único é exigido pelo REFRESH ... CONCURRENTLY
+SQL_INDICES_VISAO = [
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{NOME_VISAO} "
+    f"ON {NOME_VISAO} (inventario_id, item_nota_entrada_id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{NOME_VISAO}_inventario_produto "
+    f"ON {NOME_VISAO} (inventario_id, produto_id, data_emissao)",
+]
+
+
+def aplicar(conn):
+    colunas = {coluna['name'] for coluna in inspect(conn).get_columns('itens_nota_entrada')}
+
+    if 'produto_id' not in colunas:
+        if conn.dialect.name == 'mysql':
+            # O MySQL ignora REFERENCES na definição da coluna
+            conn.execute(text("ALTER TABLE itens_nota_entrada ADD COLUMN produto_id INTEGER NULL"))
+            conn.execute(text(
+                "ALTER TABLE itens_nota_entrada ADD CONSTRAINT fk_itens_nota_entrada_produto "
+                "FOREIGN KEY (produto_id) REFERENCES produtos (id)"
+            ))
+        else:
+            conn.execute(text("ALTER TABLE itens_nota_entrada ADD COLUMN produto_id INTEGER NULL REFERENCES produtos (id)"))
+    if 'quantidade_por_grade' not in colunas:
+        conn.execute(text("ALTER TABLE itens_nota_entrada ADD COLUMN quantidade_por_grade FLOAT NULL"))
+
+    INDICE_PRODUTO.create(conn, checkfirst=True)
+
+    # Carga inicial: resolve todos os itens já gravados pela associação do fornecedor
+    # (pelo catálogo de itens; bancos anteriores a ele recebem a carga na v008)
+    if 'item_fornecedor_id' in colunas:
+        conn.execute(atualizacao_produtos_resolvidos())
+
+    # A visão materializada passa a ler o produto dos itens (em vez da junção por código)
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {NOME_VISAO}"))
+        conn.execute(text(SQL_CRIAR_VISAO))
+        for sql in SQL_INDICES_VISAO:
+            conn.execute(text(sql))
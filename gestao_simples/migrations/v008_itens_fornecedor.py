@@ -0,0 +1,83 @@
+# migrations/v008_itens_fornecedor.py
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint,
+    text, inspect, delete, insert,
+)
+from sqlalchemy.sql import func
+from repositories.item_fornecedor_repository import insercao_itens_fornecedor, atualizacao_associacoes_itens
+from repositories.item_nota_entrada_repository import atualizacao_itens_fornecedor, atualizacao_produtos_resolvidos
+from repositories.produto_fornecedor_associacao_repository import consulta_itens_nao_associados
+
+VERSAO = 8
+DESCRICAO = "Catálogo de itens de fornecedor com chave inteira"
+
+_metadata = MetaData()
+
+# Referenciadas pelas chaves estrangeiras (já existem, não são criadas aqui)
+Table('fornecedores', _metadata, Column('id', Integer, primary_key=True))
+Table('produto_fornecedor_associacao', _metadata, Column('id', Integer, primary_key=True))
+
+itens_fornecedor = Table(
+    'itens_fornecedor', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('fornecedor_id', Integer, ForeignKey('fornecedores.id', ondelete='CASCADE'), nullable=False),
+    Column('codigo_produto_fornecedor', String(255), nullable=False),
+    Column('descricao', String(255), nullable=False),
+    Column('unidade_medida', String(50), nullable=False),
+    Column('associacao_id', Integer, ForeignKey('produto_fornecedor_associacao.id', ondelete='SET NULL'), nullable=True),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+    UniqueConstraint(
+        'fornecedor_id', 'codigo_produto_fornecedor', 'descricao', 'unidade_medida',
+        name='uq_itens_fornecedor_item'
+    ),
+    Index('ix_itens_fornecedor_associacao', 'associacao_id'),
+)
+
+# Só a coluna indexada (a coluna é adicionada por ALTER TABLE em aplicar)
+Table('itens_nota_entrada', _metadata, Column('item_fornecedor_id', Integer))
+INDICE_ITEM_FORNECEDOR = Index(
+    'ix_itens_nota_entrada_item_fornecedor', _metadata.tables['itens_nota_entrada'].c.item_fornecedor_id
+)
+
+# Fila da v006 (só as colunas preenchidas aqui)
+fila = Table(
+    'fila_associacao', _metadata,
+    Column('fornecedor_id', Integer),
+    Column('codigo_produto_fornecedor', String(255)),
+    Column('descricao', String(255)),
+    Column('unidade_medida', String(50)),
+)
+
+
+def aplicar(conn):
+    itens_fornecedor.create(conn, checkfirst=True)
+
+    colunas = {coluna['name'] for coluna in inspect(conn).get_columns('itens_nota_entrada')}
+    if 'item_fornecedor_id' not in colunas:
+        if conn.dialect.name == 'mysql':
+            # O MySQL ignora REFERENCES na definição da coluna
+            conn.execute(text("ALTER TABLE itens_nota_entrada ADD COLUMN item_fornecedor_id INTEGER NULL"))
+            conn.execute(text(
+                "ALTER TABLE itens_nota_entrada ADD CONSTRAINT fk_itens_nota_entrada_item_fornecedor "
+                "FOREIGN KEY (item_fornecedor_id) REFERENCES itens_fornecedor (id)"
+            ))
+        else:
+            conn.execute(text(
+                "ALTER TABLE itens_nota_entrada ADD COLUMN item_fornecedor_id INTEGER NULL REFERENCES itens_fornecedor (id)"
+            ))
+
+    INDICE_ITEM_FORNECEDOR.create(conn, checkfirst=True)
+
+    # Carga inicial: catálogo a partir das notas gravadas, ligação dos itens e associações
+    conn.execute(insercao_itens_fornecedor())
+    conn.execute(atualizacao_itens_fornecedor())
+    conn.execute(atualizacao_associacoes_itens())
+    conn.execute(atualizacao_produtos_resolvidos())
+
+    # Fila de associação recalculada pelo catálogo (a v006 a deixa vazia em bancos antigos)
+    conn.execute(delete(fila))
+    conn.execute(insert(fila).from_select(
+        ['fornecedor_id', 'codigo_produto_fornecedor', 'descricao', 'unidade_medida'],
+        consulta_itens_nao_associados()
+    ))
@@ -0,0 +1,26 @@
+# migrations/v009_versao_dados.py
+import uuid
+from sqlalchemy import MetaData, Table, Column, String, DateTime, select, insert
+from sqlalchemy.sql import func
+from repositories.versao_dados_repository import VERSAO_AUDITORIA
+
+VERSAO = 9
+DESCRICAO = "Marca de versão dos dados da auditoria"
+
+_metadata = MetaData()
+
+tabela = Table(
+    'versao_dados', _metadata,
+    Column('nome', String(50), primary_key=True),
+    Column('versao', String(32), nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('updated_at', DateTime(timezone=True)),
+)
+
+
+def aplicar(conn):
+    tabela.create(conn, checkfirst=True)
+
+    existente = conn.execute(select(tabela.c.nome).where(tabela.c.nome == VERSAO_AUDITORIA)).first()
+    if existente is None:
+        conn.execute(insert(tabela).values(nome=VERSAO_AUDITORIA, versao=uuid.uuid4().hex))
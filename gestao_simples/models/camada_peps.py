@@ -0,0 +1,25 @@
+# models/camada_peps.py
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from models.base import BaseModel
+
+class CamadaPeps(BaseModel):
+    """Camada de custo PEPS (um lote de entrada) calculada para um inventário encerrado"""
+    __tablename__ = 'auditoria_camadas_peps'
+    __table_args__ = (
+        Index('ix_camadas_peps_inventario_produto', 'inventario_id', 'produto_id', 'data_emissao'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    inventario_id = Column(Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), nullable=False)
+    produto_id = Column(Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False)
+    item_nota_entrada_id = Column(Integer, nullable=False)  # Lote de origem (sem FK: a camada é recalculada)
+    data_emissao = Column(DateTime, nullable=False)
+    quantidade_unidades = Column(Float, nullable=False)
+    valor_unitario = Column(Float, nullable=False)
+    valor_total_lote = Column(Float, nullable=False)
+    quantidade_acumulada = Column(Float, nullable=False)
+    quantidade_saida = Column(Float, nullable=False)
+    quantidade_consumida = Column(Float, nullable=False)
+    saldo_remanescente = Column(Float, nullable=False)
+    valor_consumido = Column(Float, nullable=False)
+    valor_saldo_remanescente = Column(Float, nullable=False)
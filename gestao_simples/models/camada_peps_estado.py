@@ -0,0 +1,14 @@
+# models/camada_peps_estado.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from models.base import BaseModel
+
+class CamadaPepsEstado(BaseModel):
+    """
+    Marca os inventários cujas camadas PEPS estão completas e atualizadas.
+    Sem registro, as camadas do inventário são recalculadas na próxima leitura.
+    """
+    __tablename__ = 'auditoria_camadas_estado'
+
+    inventario_id = Column(Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), primary_key=True)
+    data_corte = Column(DateTime(timezone=True), nullable=False)  # data_fim_contagem usada no cálculo
+    atualizado_em = Column(DateTime(timezone=True), nullable=False)
@@ -1,11 +1,15 @@
 # models/inventario_estoque.py
-from sqlalchemy import Column, String, DateTime, Integer
+from sqlalchemy import Column, String, DateTime, Integer, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 
 class InventarioEstoque(BaseModel):
     __tablename__ = 'inventario_estoque'
+    __table_args__ = (
+        # "Último inventário" da auditoria (ORDER BY data_fim_contagem DESC LIMIT 1)
+        Index('ix_inventario_estoque_fim_contagem', 'data_fim_contagem'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     referencia = Column(String(7), nullable=False, unique=True)  # Ex: "04/2025"
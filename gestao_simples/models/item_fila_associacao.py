@@ -0,0 +1,16 @@
+# models/item_fila_associacao.py
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from models.base import BaseModel
+
+class ItemFilaAssociacao(BaseModel):
+    """Item de fornecedor presente em notas e ainda sem associação a um produto"""
+    __tablename__ = 'fila_associacao'
+    __table_args__ = (
+        Index('ix_fila_associacao_fornecedor_codigo', 'fornecedor_id', 'codigo_produto_fornecedor'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id', ondelete='CASCADE'), nullable=False)
+    codigo_produto_fornecedor = Column(String(255), nullable=False)
+    descricao = Column(String(255), nullable=False)
+    unidade_medida = Column(String(50), nullable=False)
@@ -0,0 +1,25 @@
+# models/item_fornecedor.py
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, UniqueConstraint
+from models.base import BaseModel
+
+class ItemFornecedor(BaseModel):
+    """
+    Item distinto do catálogo de um fornecedor (código, descrição e unidade), registrado
+    ao gravar as notas. Itens das notas apontam para ele pelo id; associacao_id é a
+    associação que resolve o item (nula enquanto não associado).
+    """
+    __tablename__ = 'itens_fornecedor'
+    __table_args__ = (
+        UniqueConstraint(
+            'fornecedor_id', 'codigo_produto_fornecedor', 'descricao', 'unidade_medida',
+            name='uq_itens_fornecedor_item'
+        ),
+        Index('ix_itens_fornecedor_associacao', 'associacao_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id', ondelete='CASCADE'), nullable=False)
+    codigo_produto_fornecedor = Column(String(255), nullable=False)
+    descricao = Column(String(255), nullable=False)
+    unidade_medida = Column(String(50), nullable=False)
+    associacao_id = Column(Integer, ForeignKey('produto_fornecedor_associacao.id', ondelete='SET NULL'), nullable=True)
@@ -1,11 +1,17 @@
 # models/inventario_item.py
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import Column, Integer, Float, ForeignKey, Index
 from models.base import BaseModel
 from sqlalchemy.orm import relationship
 
 
 class ItemInventario(BaseModel):
     __tablename__ = 'itens_inventario'
+    __table_args__ = (
+        Index(
+            'ix_itens_inventario_inventario_produto', 'inventario_id', 'produto_id',
+            postgresql_include=['quantidade_contada']
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     inventario_id = Column(Integer, ForeignKey('inventario_estoque.id'), nullable=False)
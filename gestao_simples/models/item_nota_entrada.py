@@ -1,9 +1,19 @@
 # models/item_nota_entrada.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from models.base import BaseModel
 
 class ItemNotaEntrada(BaseModel):
     __tablename__ = 'itens_nota_entrada'
+    __table_args__ = (
+        # Junção nota -> itens da auditoria PEPS (cobre quantidade/valor no PostgreSQL)
+        Index(
+            'ix_itens_nota_entrada_nota_codigo', 'nota_entrada_id', 'codigo_produto_fornecedor',
+            postgresql_include=['quantidade', 'valor']
+        ),
+        Index('ix_itens_nota_entrada_codigo', 'codigo_produto_fornecedor'),
+        Index('ix_itens_nota_entrada_produto', 'produto_id'),
+        Index('ix_itens_nota_entrada_item_fornecedor', 'item_fornecedor_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     nota_entrada_id = Column(Integer, ForeignKey('notas_entrada.id'))
@@ -11,4 +21,9 @@ class ItemNotaEntrada(BaseModel):
     descricao = Column(String(255), nullable=False)
     quantidade = Column(Float, nullable=False)
     unidade_medida = Column(String(50), nullable=False)
-    valor = Column(Float, nullable=False)
\ No newline at end of file
+    valor = Column(Float, nullable=False)
+    # Item do catálogo do fornecedor (nulo quando o item não tem código)
+    item_fornecedor_id = Column(Integer, ForeignKey('itens_fornecedor.id'), nullable=True)
+    # Resolvidos pela associação do fornecedor ao gravar a nota (nulos enquanto não associado)
+    produto_id = Column(Integer, ForeignKey('produtos.id'), nullable=True)
+    quantidade_por_grade = Column(Float, nullable=True)
\ No newline at end of file
@@ -1,10 +1,15 @@
 # models/nota_entrada.py
-from sqlalchemy import Column, String, ForeignKey, Integer, Float, DateTime
+from sqlalchemy import Column, String, ForeignKey, Integer, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from models.base import BaseModel
 
 class NotaEntrada(BaseModel):
     __tablename__ = 'notas_entrada' 
+    __table_args__ = (
+        Index('ix_notas_entrada_fornecedor_emissao', 'fornecedor_id', 'data_emissao'),
+        # Corte por data do inventário na auditoria PEPS
+        Index('ix_notas_entrada_emissao', 'data_emissao'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     modelo = Column(Integer, nullable=True)
@@ -1,10 +1,18 @@
 # models/produto_fornecedor_associacao.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 class ProdutoFornecedorAssociacao(BaseModel):
     __tablename__ = 'produto_fornecedor_associacao'
+    __table_args__ = (
+        # Junção item da nota -> produto (cobre produto/grade no PostgreSQL)
+        Index(
+            'ix_pfa_fornecedor_codigo', 'fornecedor_id', 'codigo_produto_fornecedor',
+            postgresql_include=['produto_id', 'quantidade_por_grade']
+        ),
+        Index('ix_pfa_produto', 'produto_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     produto_id = Column(Integer, ForeignKey('produtos.id'), nullable=False)
@@ -0,0 +1,18 @@
+# models/saldo_fechamento.py
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from models.base import BaseModel
+
+class SaldoFechamento(BaseModel):
+    """Lote com saldo remanescente no encerramento de um inventário (ponto de partida do próximo)"""
+    __tablename__ = 'auditoria_saldos_fechamento'
+    __table_args__ = (
+        Index('ix_saldos_fechamento_inventario_produto', 'inventario_id', 'produto_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    inventario_id = Column(Integer, ForeignKey('inventario_estoque.id', ondelete='CASCADE'), nullable=False)
+    produto_id = Column(Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False)
+    item_nota_entrada_id = Column(Integer, nullable=False)  # Lote de origem
+    data_emissao = Column(DateTime, nullable=False)
+    quantidade_unidades = Column(Float, nullable=False)  # Saldo do lote no encerramento
+    valor_unitario = Column(Float, nullable=False)
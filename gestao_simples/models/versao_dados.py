@@ -0,0 +1,13 @@
+# models/versao_dados.py
+from sqlalchemy import Column, String
+from models.base import BaseModel
+
+class VersaoDados(BaseModel):
+    """
+    Marca de versão de um conjunto de tabelas, trocada a cada escrita nelas.
+    Serve de chave para os resultados em cache (ex.: auditoria PEPS).
+    """
+    __tablename__ = 'versao_dados'
+
+    nome = Column(String(50), primary_key=True)
+    versao = Column(String(32), nullable=False)
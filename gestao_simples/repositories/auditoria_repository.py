@@ -1,45 +1,84 @@
 # repositories/auditoria_repository.py
-from sqlalchemy import text
-from config.database import SessionLocal
+from sqlalchemy import text, bindparam, DateTime
+from config.database import obter_sessao, SessionLocal
+from config.settings import TAMANHO_LOTE_STREAMING, AUDITORIA_ESTRATEGIA, DB_CONFIG
+from repositories.versao_dados_repository import VersaoDadosRepository, VERSAO_AUDITORIA
+from utils.logger import logger
 
-class AuditoriaRepository:
-    def obter_dados_peps(self, referencia_inventario: str = None):
-        query = text("""
+# Colunas devolvidas pela auditoria PEPS, na ordem da consulta
+COLUNAS_PEPS = [
+    'produto_id',
+    'nome',
+    'data_emissao',
+    'quantidade_unidades',
+    'valor_unitario',
+    'valor_total_lote',
+    'quantidade_acumulada',
+    'quantidade_saida',
+    'quantidade_consumida',
+    'saldo_remanescente',
+    'valor_consumido',
+    'valor_saldo_remanescente',
+    'data_corte_inventario',
+]
+
+
+def tipar_datas(query, *colunas):
+    """
+    Declara colunas de data de uma consulta text() como DateTime: o SQLite as devolve
+    como texto e os INSERTs das camadas/saldos (e as comparações de data de corte)
+    esperam datetime. No MySQL e no PostgreSQL o driver já devolve datetime.
+    """
+    return query.columns(**{coluna: DateTime for coluna in colunas})
+
+
+def montar_consulta_peps(filtrar_produtos: bool = False, somente_com_saldo: bool = False):
+    """
+    Monta a CTE PEPS para um inventário (:inventario_id).
+
+    Com filtrar_produtos=True a consulta recebe também :produto_ids (lista) e só
+    calcula as camadas desses produtos. Com somente_com_saldo=True as camadas
+    totalmente consumidas são descartadas no banco. O lote de origem
+    (item_nota_entrada_id) desempata entradas com a mesma data de emissão.
+
+    Produto e grade vêm do próprio item (resolvidos pela associação ao gravar a nota);
+    itens sem associação ficam de fora.
+    """
+    filtro_entradas = "AND ine.produto_id IN :produto_ids" if filtrar_produtos else ""
+    filtro_inventario = "AND ii.produto_id IN :produto_ids" if filtrar_produtos else ""
+    filtro_saldo = "WHERE (cc.quantidade_unidades - cc.quantidade_consumida) <> 0" if somente_com_saldo else ""
+
+    query = text(f"""
         WITH dados_inventario AS (
-            SELECT 
+            SELECT
                 id,
-                data_fim_contagem 
+                data_fim_contagem
             FROM inventario_estoque
-            WHERE referencia = COALESCE(:referencia_inventario, 
-                  (SELECT referencia 
-                   FROM inventario_estoque 
-                   ORDER BY data_fim_contagem DESC 
-                   LIMIT 1))
+            WHERE id = :inventario_id
         ),
 
         entradas_ordenadas AS (
             SELECT
-                pfa.produto_id,
+                ine.id AS item_nota_entrada_id,
+                ine.produto_id,
                 ne.data_emissao,
-                (ine.quantidade * pfa.quantidade_por_grade) AS quantidade_unidades,
+                (ine.quantidade * ine.quantidade_por_grade) AS quantidade_unidades,
                 ine.valor AS valor_unitario,
-                (ine.quantidade * pfa.quantidade_por_grade) * ine.valor AS valor_total_lote
+                (ine.quantidade * ine.quantidade_por_grade) * ine.valor AS valor_total_lote
             FROM
                 itens_nota_entrada ine
             JOIN notas_entrada ne ON
-                ine.nota_entrada_id = ne.id
-            JOIN produto_fornecedor_associacao pfa ON
-                ine.codigo_produto_fornecedor = pfa.codigo_produto_fornecedor
-                AND ne.fornecedor_id = pfa.fornecedor_id,
+                ine.nota_entrada_id = ne.id,
                 dados_inventario di
             WHERE
-                ne.data_emissao <= di.data_fim_contagem
-            ORDER BY
-                ne.data_emissao ASC
+                ine.produto_id IS NOT NULL
+                AND ne.data_emissao <= di.data_fim_contagem
+                {filtro_entradas}
         ),
 
         camadas_peps AS (
             SELECT
+                item_nota_entrada_id,
                 produto_id,
                 data_emissao,
                 quantidade_unidades,
@@ -47,7 +86,7 @@ class AuditoriaRepository:
                 valor_total_lote,
                 SUM(quantidade_unidades) OVER (
                     PARTITION BY produto_id
-                    ORDER BY data_emissao ASC
+                    ORDER BY data_emissao ASC, item_nota_entrada_id ASC
                     ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
                 ) AS quantidade_acumulada
             FROM
@@ -63,6 +102,7 @@ class AuditoriaRepository:
                 dados_inventario di
             WHERE
                 ii.inventario_id = di.id
+                {filtro_inventario}
             GROUP BY
                 ii.produto_id
         ),
@@ -84,6 +124,7 @@ class AuditoriaRepository:
 
         consumo_por_camada AS (
             SELECT
+                c.item_nota_entrada_id,
                 c.produto_id,
                 c.data_emissao,
                 c.quantidade_unidades,
@@ -94,12 +135,12 @@ class AuditoriaRepository:
                 CASE
                     WHEN ts.quantidade_saida >= c.quantidade_acumulada THEN c.quantidade_unidades
                     WHEN ts.quantidade_saida > COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
-                        PARTITION BY c.produto_id 
-                        ORDER BY c.data_emissao
-                    ), 0) 
+                        PARTITION BY c.produto_id
+                        ORDER BY c.data_emissao, c.item_nota_entrada_id
+                    ), 0)
                     THEN ts.quantidade_saida - COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
-                        PARTITION BY c.produto_id 
-                        ORDER BY c.data_emissao
+                        PARTITION BY c.produto_id
+                        ORDER BY c.data_emissao, c.item_nota_entrada_id
                     ), 0)
                     ELSE 0
                 END AS quantidade_consumida
@@ -110,6 +151,7 @@ class AuditoriaRepository:
         )
 
         SELECT
+            cc.item_nota_entrada_id,
             cc.produto_id,
             p.nome,
             cc.data_emissao,
@@ -130,14 +172,312 @@ class AuditoriaRepository:
         LEFT JOIN total_entradas_saidas ts ON
             ts.produto_id = cc.produto_id,
             dados_inventario di
+        {filtro_saldo}
         ORDER BY
             cc.produto_id,
-            cc.data_emissao ASC;
+            cc.data_emissao ASC,
+            cc.item_nota_entrada_id ASC;
+    """)
+
+    if filtrar_produtos:
+        query = query.bindparams(bindparam('produto_ids', expanding=True))
+    return tipar_datas(query, 'data_emissao', 'data_corte_inventario')
+
+
+def _resolver_estrategia():
+    """Estratégia das camadas conforme AUDITORIA_ESTRATEGIA; valores inválidos caem no padrão com aviso"""
+    padrao = 'visao' if DB_CONFIG['type'] == 'postgres' else 'tabela'
+    if AUDITORIA_ESTRATEGIA == 'visao' and DB_CONFIG['type'] != 'postgres':
+        logger.warning("AUDITORIA_ESTRATEGIA=visao exige PostgreSQL; a auditoria usará a estratégia 'tabela'.")
+        return 'tabela'
+    if AUDITORIA_ESTRATEGIA in ('visao', 'tabela'):
+        return AUDITORIA_ESTRATEGIA
+    if AUDITORIA_ESTRATEGIA != 'auto':
+        logger.warning(f"AUDITORIA_ESTRATEGIA inválida: {AUDITORIA_ESTRATEGIA}. Use auto, visao ou tabela; usando '{padrao}'.")
+    return padrao
+
+
+# Resolvida uma vez ao carregar o módulo (o aviso não se repete a cada serviço criado)
+ESTRATEGIA_CAMADAS = _resolver_estrategia()
+
+
+class AuditoriaRepository:
+    def __init__(self):
+        self.versao_repository = VersaoDadosRepository()
+
+    @staticmethod
+    def estrategia_camadas():
+        """
+        'visao': visão materializada com REFRESH CONCURRENTLY (PostgreSQL);
+        'tabela': tabela de resumo mantida pela aplicação (MySQL e demais).
+        """
+        return ESTRATEGIA_CAMADAS
+
+    def obter_versao_dados(self):
+        """
+        Marca de versão dos dados auditados: renovada na mesma transação de toda escrita
+        nas tabelas da auditoria (ver versao_dados_repository). Leitura por chave primária.
+        """
+        return self.versao_repository.obter(VERSAO_AUDITORIA)
+
+    def listar_produtos_associados(self):
+        """(id, nome) dos produtos com associação a item de fornecedor (os que podem ter camadas)"""
+        query = text("""
+            SELECT p.id, p.nome
+            FROM produtos p
+            WHERE EXISTS (
+                SELECT 1 FROM produto_fornecedor_associacao pfa WHERE pfa.produto_id = p.id
+            )
+            ORDER BY p.nome
+        """)
+        with obter_sessao() as session:
+            return session.execute(query).all()
+
+    def obter_inventario(self, referencia_inventario: str = None):
+        """
+        Retorna (id, referencia, data_fim_contagem) do inventário da referência informada
+        ou, sem referência, do último inventário encerrado.
+        """
+        if referencia_inventario:
+            query = text("""
+                SELECT id, referencia, data_fim_contagem
+                FROM inventario_estoque
+                WHERE referencia = :referencia_inventario
+            """)
+        else:
+            query = text("""
+                SELECT id, referencia, data_fim_contagem
+                FROM inventario_estoque
+                WHERE data_fim_contagem IS NOT NULL
+                ORDER BY data_fim_contagem DESC
+                LIMIT 1
+            """)
+
+        with obter_sessao() as session:
+            return session.execute(tipar_datas(query, 'data_fim_contagem'), {"referencia_inventario": referencia_inventario}).first()
+
+    def listar_inventarios_encerrados(self, a_partir_de=None):
+        """(id, referencia, data_fim_contagem) dos inventários encerrados, opcionalmente só os com data de corte >= a_partir_de"""
+        filtro_data = "AND data_fim_contagem >= :a_partir_de" if a_partir_de is not None else ""
+        query = text(f"""
+            SELECT id, referencia, data_fim_contagem
+            FROM inventario_estoque
+            WHERE data_fim_contagem IS NOT NULL
+              {filtro_data}
+            ORDER BY data_fim_contagem
+        """)
+        with obter_sessao() as session:
+            return session.execute(tipar_datas(query, 'data_fim_contagem'), {"a_partir_de": a_partir_de}).all()
+
+    def listar_produtos_por_itens(self, fornecedor_id: int, codigos: list):
+        """Produtos associados aos códigos de item de um fornecedor"""
+        if not codigos:
+            return []
+        query = text("""
+            SELECT DISTINCT produto_id
+            FROM produto_fornecedor_associacao
+            WHERE fornecedor_id = :fornecedor_id
+              AND codigo_produto_fornecedor IN :codigos
+        """).bindparams(bindparam('codigos', expanding=True))
+
+        with obter_sessao() as session:
+            result = session.execute(query, {"fornecedor_id": fornecedor_id, "codigos": list(codigos)})
+            return [row.produto_id for row in result]
+
+    def calcular_camadas(self, inventario_id: int, produto_ids: list = None, somente_com_saldo: bool = False, session=None):
+        """Executa a CTE PEPS de um inventário (opcionalmente de alguns produtos)"""
+        filtrar_produtos = produto_ids is not None
+        if filtrar_produtos and not produto_ids:
+            return []
+
+        params = {"inventario_id": inventario_id}
+        if filtrar_produtos:
+            params["produto_ids"] = list(produto_ids)
+
+        with obter_sessao(session) as session:
+            result = session.execute(montar_consulta_peps(filtrar_produtos, somente_com_saldo), params)
+            return [dict(row) for row in result.mappings()]
+
+    def obter_inventario_por_id(self, inventario_id: int):
+        """(id, referencia, data_fim_contagem) do inventário"""
+        query = text("""
+            SELECT id, referencia, data_fim_contagem
+            FROM inventario_estoque
+            WHERE id = :inventario_id
+        """)
+        with obter_sessao() as session:
+            return session.execute(tipar_datas(query, 'data_fim_contagem'), {"inventario_id": inventario_id}).first()
+
+    def obter_inventario_anterior(self, inventario_id: int):
+        """(id, referencia, data_fim_contagem) do inventário encerrado imediatamente antes deste"""
+        query = text("""
+            SELECT anterior.id, anterior.referencia, anterior.data_fim_contagem
+            FROM inventario_estoque atual
+            JOIN inventario_estoque anterior ON
+                anterior.data_fim_contagem < atual.data_fim_contagem
+            WHERE atual.id = :inventario_id
+            ORDER BY anterior.data_fim_contagem DESC
+            LIMIT 1
         """)
+        with obter_sessao() as session:
+            return session.execute(tipar_datas(query, 'data_fim_contagem'), {"inventario_id": inventario_id}).first()
 
+    def listar_entradas(self, inventario_id: int, produto_ids: list = None, apos=None, session=None):
+        """
+        Lotes de entrada até a data de corte do inventário, sem janelas/LAG, ordenados
+        por produto, data de emissão e lote (entrada do motor NumPy). Com apos, só os
+        lotes emitidos depois dessa data (incremental a partir de um fechamento).
+        """
+        filtro_produtos = "AND ine.produto_id IN :produto_ids" if produto_ids is not None else ""
+        filtro_periodo = "AND ne.data_emissao > :apos" if apos is not None else ""
+        query = text(f"""
+            SELECT
+                ine.id AS item_nota_entrada_id,
+                ine.produto_id,
+                p.nome,
+                ne.data_emissao,
+                (ine.quantidade * ine.quantidade_por_grade) AS quantidade_unidades,
+                ine.valor AS valor_unitario
+            FROM
+                itens_nota_entrada ine
+            JOIN notas_entrada ne ON
+                ine.nota_entrada_id = ne.id
+            JOIN produtos p ON
+                p.id = ine.produto_id
+            JOIN inventario_estoque ie ON
+                ie.id = :inventario_id
+            WHERE
+                ne.data_emissao <= ie.data_fim_contagem
+                {filtro_periodo}
+                {filtro_produtos}
+            ORDER BY
+                ine.produto_id,
+                ne.data_emissao ASC,
+                ine.id ASC
+        """)
+        params = {"inventario_id": inventario_id}
+        if apos is not None:
+            params["apos"] = apos
+        if produto_ids is not None:
+            query = query.bindparams(bindparam('produto_ids', expanding=True))
+            params["produto_ids"] = list(produto_ids)
+
+        with obter_sessao(session) as session:
+            return session.execute(tipar_datas(query, 'data_emissao'), params).all()
+
+    def listar_entradas_por_periodo(self, produto_id: int = None):
+        """
+        Todos os lotes até o último inventário encerrado, ordenados por produto, data e
+        lote, cada um com a data de corte do primeiro inventário que o inclui (periodo_corte).
+        """
+        filtro_produto = "AND ine.produto_id = :produto_id" if produto_id is not None else ""
+        query = text(f"""
+            SELECT
+                lotes.*
+            FROM (
+                SELECT
+                    ine.id AS item_nota_entrada_id,
+                    ine.produto_id,
+                    p.nome,
+                    ne.data_emissao,
+                    (ine.quantidade * ine.quantidade_por_grade) AS quantidade_unidades,
+                    ine.valor AS valor_unitario,
+                    (
+                        SELECT MIN(ie.data_fim_contagem)
+                        FROM inventario_estoque ie
+                        WHERE ie.data_fim_contagem >= ne.data_emissao
+                    ) AS periodo_corte
+                FROM
+                    itens_nota_entrada ine
+                JOIN notas_entrada ne ON
+                    ine.nota_entrada_id = ne.id
+                JOIN produtos p ON
+                    p.id = ine.produto_id
+                WHERE 1 = 1
+                    {filtro_produto}
+            ) lotes
+            WHERE
+                lotes.periodo_corte IS NOT NULL
+            ORDER BY
+                lotes.produto_id,
+                lotes.data_emissao ASC,
+                lotes.item_nota_entrada_id ASC
+        """)
+        with obter_sessao() as session:
+            return session.execute(tipar_datas(query, 'data_emissao', 'periodo_corte'), {"produto_id": produto_id}).all()
+
+    def listar_contagens_encerradas(self, produto_id: int = None):
+        """Quantidade contada por inventário encerrado e produto"""
+        filtro_produto = "AND ii.produto_id = :produto_id" if produto_id is not None else ""
+        query = text(f"""
+            SELECT
+                ii.inventario_id,
+                ii.produto_id,
+                SUM(ii.quantidade_contada) AS quantidade_inventario
+            FROM itens_inventario ii
+            JOIN inventario_estoque ie ON
+                ie.id = ii.inventario_id
+            WHERE ie.data_fim_contagem IS NOT NULL
+                {filtro_produto}
+            GROUP BY ii.inventario_id, ii.produto_id
+        """)
+        with obter_sessao() as session:
+            return session.execute(query, {"produto_id": produto_id}).all()
+
+    def listar_contagens(self, inventario_id: int, produto_ids: list = None, session=None):
+        """Quantidade contada por produto no inventário, ordenada por produto"""
+        filtro_produtos = "AND produto_id IN :produto_ids" if produto_ids is not None else ""
+        query = text(f"""
+            SELECT
+                produto_id,
+                SUM(quantidade_contada) AS quantidade_inventario
+            FROM itens_inventario
+            WHERE inventario_id = :inventario_id
+                {filtro_produtos}
+            GROUP BY produto_id
+            ORDER BY produto_id
+        """)
+        params = {"inventario_id": inventario_id}
+        if produto_ids is not None:
+            query = query.bindparams(bindparam('produto_ids', expanding=True))
+            params["produto_ids"] = list(produto_ids)
+
+        with obter_sessao(session) as session:
+            return session.execute(query, params).all()
+
+    def iterar_dados_peps(self, referencia_inventario: str = None, produto_id: int = None,
+                          somente_com_saldo: bool = False, tamanho_lote: int = TAMANHO_LOTE_STREAMING):
+        """
+        Versão em streaming de obter_dados_peps: gera listas de até tamanho_lote linhas
+        lidas por cursor no servidor, sem materializar o resultado inteiro.
+        """
+        inventario = self.obter_inventario(referencia_inventario)
+        if not inventario:
+            return
+
+        filtrar_produtos = produto_id is not None
+        params = {"inventario_id": inventario.id}
+        if filtrar_produtos:
+            params["produto_ids"] = [produto_id]
+
+        # Sessão própria: com cursor no servidor a conexão fica ocupada até o fim da
+        # leitura (SSCursor no MySQL) e não pode ser a da unidade de trabalho
         with SessionLocal() as session:
             result = session.execute(
-                query, 
-                {"referencia_inventario": referencia_inventario}
+                montar_consulta_peps(filtrar_produtos, somente_com_saldo),
+                params,
+                execution_options={'stream_results': True, 'yield_per': tamanho_lote}
             )
-            return [dict(row) for row in result.mappings()]
\ No newline at end of file
+            for lote in result.mappings().partitions():
+                yield [{coluna: linha[coluna] for coluna in COLUNAS_PEPS} for linha in lote]
+
+    def obter_dados_peps(self, referencia_inventario: str = None, produto_id: int = None, somente_com_saldo: bool = False):
+        inventario = self.obter_inventario(referencia_inventario)
+        if not inventario:
+            return []
+
+        produto_ids = [produto_id] if produto_id is not None else None
+        return [
+            {coluna: linha[coluna] for coluna in COLUNAS_PEPS}
+            for linha in self.calcular_camadas(inventario.id, produto_ids, somente_com_saldo)
+        ]
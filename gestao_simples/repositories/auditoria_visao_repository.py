@@ -0,0 +1,181 @@
+# repositories/auditoria_visao_repository.py
+from sqlalchemy import text
+from config.database import obter_sessao, SessionLocal, engine
+from config.settings import TAMANHO_LOTE_STREAMING
+
+NOME_VISAO = 'mv_auditoria_camadas_peps'
+
+# Camadas PEPS de todos os inventários encerrados (PostgreSQL), como criadas pela v005
+# (produto pela associação do código do fornecedor). A v007 recria a visão lendo o
+# produto resolvido nos itens; as leituras abaixo usam só colunas comuns às duas.
+SQL_CRIAR_VISAO = f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {NOME_VISAO} AS
+    WITH dados_inventario AS (
+        SELECT id, data_fim_contagem
+        FROM inventario_estoque
+        WHERE data_fim_contagem IS NOT NULL
+    ),
+
+    entradas_ordenadas AS (
+        SELECT
+            di.id AS inventario_id,
+            ine.id AS item_nota_entrada_id,
+            pfa.id AS associacao_id,
+            pfa.produto_id,
+            ne.data_emissao,
+            (ine.quantidade * pfa.quantidade_por_grade) AS quantidade_unidades,
+            ine.valor AS valor_unitario,
+            (ine.quantidade * pfa.quantidade_por_grade) * ine.valor AS valor_total_lote
+        FROM
+            itens_nota_entrada ine
+        JOIN notas_entrada ne ON
+            ine.nota_entrada_id = ne.id
+        JOIN produto_fornecedor_associacao pfa ON
+            ine.codigo_produto_fornecedor = pfa.codigo_produto_fornecedor
+            AND ne.fornecedor_id = pfa.fornecedor_id
+        JOIN dados_inventario di ON
+            ne.data_emissao <= di.data_fim_contagem
+    ),
+
+    camadas_peps AS (
+        SELECT
+            e.*,
+            SUM(quantidade_unidades) OVER (
+                PARTITION BY inventario_id, produto_id
+                ORDER BY data_emissao ASC, item_nota_entrada_id ASC, associacao_id ASC
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ) AS quantidade_acumulada
+        FROM
+            entradas_ordenadas e
+    ),
+
+    contagens AS (
+        SELECT
+            ii.inventario_id,
+            ii.produto_id,
+            SUM(ii.quantidade_contada) AS quantidade_inventario
+        FROM
+            itens_inventario ii
+        GROUP BY
+            ii.inventario_id,
+            ii.produto_id
+    ),
+
+    total_entradas_saidas AS (
+        SELECT
+            c.inventario_id,
+            c.produto_id,
+            SUM(c.quantidade_unidades) - COALESCE(MAX(ct.quantidade_inventario), 0) AS quantidade_saida
+        FROM
+            camadas_peps c
+        LEFT JOIN contagens ct ON
+            ct.inventario_id = c.inventario_id
+            AND ct.produto_id = c.produto_id
+        GROUP BY
+            c.inventario_id,
+            c.produto_id
+    ),
+
+    consumo_por_camada AS (
+        SELECT
+            c.inventario_id,
+            c.item_nota_entrada_id,
+            c.associacao_id,
+            c.produto_id,
+            c.data_emissao,
+            c.quantidade_unidades,
+            c.valor_unitario,
+            c.valor_total_lote,
+            c.quantidade_acumulada,
+            ts.quantidade_saida,
+            CASE
+                WHEN ts.quantidade_saida >= c.quantidade_acumulada THEN c.quantidade_unidades
+                WHEN ts.quantidade_saida > COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
+                    PARTITION BY c.inventario_id, c.produto_id
+                    ORDER BY c.data_emissao, c.item_nota_entrada_id, c.associacao_id
+                ), 0)
+                THEN ts.quantidade_saida - COALESCE(LAG(c.quantidade_acumulada, 1) OVER (
+                    PARTITION BY c.inventario_id, c.produto_id
+                    ORDER BY c.data_emissao, c.item_nota_entrada_id, c.associacao_id
+                ), 0)
+                ELSE 0
+            END AS quantidade_consumida
+        FROM
+            camadas_peps c
+        JOIN total_entradas_saidas ts ON
+            ts.inventario_id = c.inventario_id
+            AND ts.produto_id = c.produto_id
+    )
+
+    SELECT
+        cc.*,
+        (cc.quantidade_unidades - cc.quantidade_consumida) AS saldo_remanescente,
+        (cc.quantidade_consumida * cc.valor_unitario) AS valor_consumido,
+        ((cc.quantidade_unidades - cc.quantidade_consumida) * cc.valor_unitario) AS valor_saldo_remanescente
+    FROM
+        consumo_por_camada cc
+"""
+
+# O índice único é exigido pelo REFRESH ... CONCURRENTLY
+SQL_INDICES_VISAO = [
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{NOME_VISAO} "
+    f"ON {NOME_VISAO} (inventario_id, item_nota_entrada_id, associacao_id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{NOME_VISAO}_inventario_produto "
+    f"ON {NOME_VISAO} (inventario_id, produto_id, data_emissao)",
+]
+
+
+class AuditoriaVisaoRepository:
+    """Leitura e atualização da visão materializada das camadas PEPS (PostgreSQL)"""
+
+    def _consulta_camadas(self, produto_id: int = None, somente_com_saldo: bool = False):
+        filtro_produto = "AND v.produto_id = :produto_id" if produto_id is not None else ""
+        filtro_saldo = "AND v.saldo_remanescente <> 0" if somente_com_saldo else ""
+        return text(f"""
+            SELECT
+                v.produto_id,
+                p.nome,
+                v.data_emissao,
+                v.quantidade_unidades,
+                v.valor_unitario,
+                v.valor_total_lote,
+                v.quantidade_acumulada,
+                v.quantidade_saida,
+                v.quantidade_consumida,
+                v.saldo_remanescente,
+                v.valor_consumido,
+                v.valor_saldo_remanescente,
+                ie.data_fim_contagem AS data_corte_inventario
+            FROM {NOME_VISAO} v
+            JOIN produtos p ON p.id = v.produto_id
+            JOIN inventario_estoque ie ON ie.id = v.inventario_id
+            WHERE v.inventario_id = :inventario_id
+                {filtro_produto}
+                {filtro_saldo}
+            ORDER BY v.produto_id, v.data_emissao, v.item_nota_entrada_id
+        """)
+
+    def listar_camadas(self, inventario_id: int, produto_id: int = None, somente_com_saldo: bool = False):
+        query = self._consulta_camadas(produto_id, somente_com_saldo)
+        with obter_sessao() as session:
+            result = session.execute(query, {"inventario_id": inventario_id, "produto_id": produto_id})
+            return [dict(row) for row in result.mappings()]
+
+    def iterar_camadas(self, inventario_id: int, produto_id: int = None, somente_com_saldo: bool = False,
+                       tamanho_lote: int = TAMANHO_LOTE_STREAMING):
+        query = self._consulta_camadas(produto_id, somente_com_saldo)
+        # Sessão própria: a conexão fica presa ao cursor do servidor até o fim da leitura
+        with SessionLocal() as session:
+            result = session.execute(
+                query,
+                {"inventario_id": inventario_id, "produto_id": produto_id},
+                execution_options={'stream_results': True, 'yield_per': tamanho_lote}
+            )
+            for lote in result.mappings().partitions():
+                yield [dict(row) for row in lote]
+
+    def atualizar(self, concorrente: bool = True):
+        """REFRESH da visão; CONCURRENTLY mantém as leituras liberadas durante a atualização"""
+        modo = "CONCURRENTLY " if concorrente else ""
+        with engine.begin() as conn:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW {modo}{NOME_VISAO}"))
@@ -1,5 +1,5 @@
 # repositories/base_repository.py
-from config.database import SessionLocal
+from config.database import obter_sessao
 from sqlalchemy import exists
 
 class BaseRepository:
@@ -7,28 +7,28 @@ class BaseRepository:
         self.model = model
         
     def criar(self, obj):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             session.add(obj)
             session.commit()
             session.refresh(obj)
             return obj
     
     def listar(self):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(self.model).all()
     
     def buscar_por_id(self, id):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(self.model).filter(self.model.id == id).first()
     
     def atualizar(self, obj):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             session.merge(obj)
             session.commit()
             return obj
     
     def deletar(self, id):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             obj = session.query(self.model).filter(self.model.id == id).first()
             session.delete(obj)
             session.commit()
@@ -39,6 +39,6 @@ class BaseRepository:
         Verifica se há registros vinculados de relacionamento com a entidade.
         Retorna True se houver, False caso contrário.
         """
-        with SessionLocal() as session:  # Usa um gerenciador de contexto para a sessão
+        with obter_sessao() as session:  # Usa um gerenciador de contexto para a sessão
             existe = session.query(exists().where(entidade_id == id)).scalar()
             return existe
\ No newline at end of file
@@ -0,0 +1,134 @@
+# repositories/camada_peps_repository.py
+from datetime import datetime
+from sqlalchemy import insert, delete, select
+from repositories.base_repository import BaseRepository
+from models.camada_peps import CamadaPeps
+from models.camada_peps_estado import CamadaPepsEstado
+from models.produto import Produto
+from models.inventario_estoque import InventarioEstoque
+from config.database import obter_sessao, SessionLocal
+from config.settings import TAMANHO_LOTE_STREAMING
+
+class CamadaPepsRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(CamadaPeps)
+
+    def substituir_camadas(self, inventario_id: int, camadas: list, data_corte, produto_ids: list = None, session=None):
+        """
+        Troca as camadas gravadas de um inventário (ou só de alguns produtos) pelas
+        recalculadas e marca o inventário como atualizado, na mesma transação.
+        """
+        colunas = {coluna.key for coluna in self.model.__table__.columns} - {'id', 'created_at', 'updated_at'}
+        linhas = [
+            {**{chave: valor for chave, valor in camada.items() if chave in colunas}, 'inventario_id': inventario_id}
+            for camada in camadas
+        ]
+
+        with obter_sessao(session) as session:
+            excluir = delete(self.model).where(self.model.inventario_id == inventario_id)
+            if produto_ids is not None:
+                excluir = excluir.where(self.model.produto_id.in_(list(produto_ids)))
+            session.execute(excluir, execution_options={'synchronize_session': False})
+
+            if linhas:
+                session.execute(insert(self.model), linhas)
+
+            estado = session.get(CamadaPepsEstado, inventario_id)
+            if estado is None:
+                session.add(CamadaPepsEstado(inventario_id=inventario_id, data_corte=data_corte, atualizado_em=datetime.now()))
+            else:
+                estado.data_corte = data_corte
+                estado.atualizado_em = datetime.now()
+
+            session.commit()
+            return len(linhas)
+
+    def _consultar_camadas(self, inventario_id: int, produto_id: int = None, somente_com_saldo: bool = False):
+        query = (
+            select(
+                self.model.produto_id,
+                Produto.nome,
+                self.model.data_emissao,
+                self.model.quantidade_unidades,
+                self.model.valor_unitario,
+                self.model.valor_total_lote,
+                self.model.quantidade_acumulada,
+                self.model.quantidade_saida,
+                self.model.quantidade_consumida,
+                self.model.saldo_remanescente,
+                self.model.valor_consumido,
+                self.model.valor_saldo_remanescente,
+                InventarioEstoque.data_fim_contagem.label('data_corte_inventario'),
+            )
+            .join(Produto, Produto.id == self.model.produto_id)
+            .join(InventarioEstoque, InventarioEstoque.id == self.model.inventario_id)
+            .where(self.model.inventario_id == inventario_id)
+            .order_by(self.model.produto_id, self.model.data_emissao, self.model.item_nota_entrada_id)
+        )
+        if produto_id is not None:
+            query = query.where(self.model.produto_id == produto_id)
+        if somente_com_saldo:
+            query = query.where(self.model.saldo_remanescente != 0)
+        return query
+
+    def listar_camadas(self, inventario_id: int, produto_id: int = None, somente_com_saldo: bool = False):
+        """Camadas gravadas de um inventário no mesmo formato de AuditoriaRepository.obter_dados_peps"""
+        query = self._consultar_camadas(inventario_id, produto_id, somente_com_saldo)
+        with obter_sessao() as session:
+            return [dict(row) for row in session.execute(query).mappings()]
+
+    def iterar_camadas(self, inventario_id: int, produto_id: int = None, somente_com_saldo: bool = False,
+                       tamanho_lote: int = TAMANHO_LOTE_STREAMING):
+        """Gera as camadas gravadas em listas de até tamanho_lote linhas (cursor no servidor)"""
+        query = self._consultar_camadas(inventario_id, produto_id, somente_com_saldo)
+        # Sessão própria: a conexão fica presa ao cursor do servidor até o fim da leitura
+        with SessionLocal() as session:
+            result = session.execute(query, execution_options={'stream_results': True, 'yield_per': tamanho_lote})
+            for lote in result.mappings().partitions():
+                yield [dict(row) for row in lote]
+
+    def listar_como_entradas(self, inventario_id: int, produto_ids: list = None):
+        """
+        Lotes das camadas gravadas no formato de AuditoriaRepository.listar_entradas:
+        todos os lotes até a data de corte do inventário, inclusive os já consumidos,
+        com a quantidade e o valor originais.
+        """
+        query = (
+            select(
+                self.model.item_nota_entrada_id,
+                self.model.produto_id,
+                Produto.nome,
+                self.model.data_emissao,
+                self.model.quantidade_unidades,
+                self.model.valor_unitario,
+            )
+            .join(Produto, Produto.id == self.model.produto_id)
+            .where(self.model.inventario_id == inventario_id)
+            .order_by(self.model.produto_id, self.model.data_emissao, self.model.item_nota_entrada_id)
+        )
+        if produto_ids is not None:
+            query = query.where(self.model.produto_id.in_(list(produto_ids)))
+
+        with obter_sessao() as session:
+            return session.execute(query).all()
+
+    def buscar_estado(self, inventario_id: int):
+        with obter_sessao() as session:
+            return session.get(CamadaPepsEstado, inventario_id)
+
+    def listar_inventarios_atualizados(self, inventario_ids: list):
+        """Dos inventários informados, os que já têm camadas gravadas"""
+        if not inventario_ids:
+            return []
+        with obter_sessao() as session:
+            query = select(CamadaPepsEstado.inventario_id).where(CamadaPepsEstado.inventario_id.in_(list(inventario_ids)))
+            return list(session.execute(query).scalars())
+
+    def invalidar(self, inventario_ids: list = None):
+        """Remove a marca de atualizado (todos os inventários quando inventario_ids é None)"""
+        with obter_sessao() as session:
+            query = delete(CamadaPepsEstado)
+            if inventario_ids is not None:
+                query = query.where(CamadaPepsEstado.inventario_id.in_(list(inventario_ids)))
+            session.execute(query)
+            session.commit()
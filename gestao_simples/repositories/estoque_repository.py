@@ -1,6 +1,6 @@
 # repositories/estoque_repository.py
 from repositories.base_repository import BaseRepository
-from config.database import SessionLocal
+from config.database import obter_sessao
 from models.estoque import Estoque
 
 class EstoqueRepository(BaseRepository):
@@ -8,14 +8,14 @@ class EstoqueRepository(BaseRepository):
         super().__init__(EstoqueRepository)
         
     def criar(self, estoque):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             session.add(estoque)
             session.commit()
             session.refresh(estoque)
             return estoque
     
     def atualizar(self, estoque_id, nova_quantidade):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             estoque = session.query(Estoque).filter(Estoque.id == estoque_id).first()
             if estoque:
                 estoque.quantidade = nova_quantidade
@@ -24,5 +24,5 @@ class EstoqueRepository(BaseRepository):
             return None
     
     def buscar_por_produto(self, produto_id):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(Estoque).filter(Estoque.produto_id == produto_id).all()
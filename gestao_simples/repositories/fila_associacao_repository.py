@@ -0,0 +1,149 @@
+# repositories/fila_associacao_repository.py
+from sqlalchemy import select, insert, delete, func
+from repositories.base_repository import BaseRepository
+from repositories.produto_fornecedor_associacao_repository import consulta_itens_nao_associados
+from models.item_fila_associacao import ItemFilaAssociacao
+from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
+from models.fornecedor import Fornecedor
+from config.database import obter_sessao
+
+class FilaAssociacaoRepository(BaseRepository):
+    """
+    Fila persistida dos itens de fornecedor aguardando associação.
+
+    Métodos que recebem session rodam na transação de quem chamou (sem commit);
+    sem session, confirmam a própria alteração.
+    """
+    def __init__(self):
+        super().__init__(ItemFilaAssociacao)
+
+    def listar_itens(self):
+        query = (
+            select(
+                self.model.id,
+                self.model.fornecedor_id,
+                Fornecedor.nome.label('fornecedor_nome'),
+                self.model.codigo_produto_fornecedor,
+                self.model.descricao,
+                self.model.unidade_medida,
+            )
+            .join(Fornecedor, Fornecedor.id == self.model.fornecedor_id)
+            .order_by(self.model.fornecedor_id, func.lower(self.model.descricao))
+        )
+        with obter_sessao() as session:
+            return session.execute(query).all()
+
+    def adicionar_itens(self, fornecedor_id: int, itens, session=None):
+        """
+        Enfileira os itens (código, descrição, unidade) de uma nota que ainda não têm
+        associação nem estão na fila. Consulta só os códigos da nota.
+        """
+        chaves = {(codigo, descricao, unidade) for codigo, descricao, unidade in itens if codigo is not None}
+        if not chaves:
+            return 0
+        codigos = list({codigo for codigo, _, _ in chaves})
+        confirmar = session is None
+
+        with obter_sessao(session) as session:
+            associados = set(map(tuple, session.execute(
+                select(
+                    ProdutoFornecedorAssociacao.codigo_produto_fornecedor,
+                    ProdutoFornecedorAssociacao.descricao_produto_fornecedor
+                ).where(
+                    ProdutoFornecedorAssociacao.fornecedor_id == fornecedor_id,
+                    ProdutoFornecedorAssociacao.codigo_produto_fornecedor.in_(codigos)
+                )
+            )))
+            na_fila = set(map(tuple, session.execute(
+                select(
+                    self.model.codigo_produto_fornecedor,
+                    self.model.descricao,
+                    self.model.unidade_medida
+                ).where(
+                    self.model.fornecedor_id == fornecedor_id,
+                    self.model.codigo_produto_fornecedor.in_(codigos)
+                )
+            )))
+
+            novos = [
+                {
+                    'fornecedor_id': fornecedor_id,
+                    'codigo_produto_fornecedor': codigo,
+                    'descricao': descricao,
+                    'unidade_medida': unidade,
+                }
+                for codigo, descricao, unidade in sorted(chaves)
+                if (codigo, descricao) not in associados and (codigo, descricao, unidade) not in na_fila
+            ]
+            if novos:
+                session.execute(insert(self.model), novos)
+            if confirmar:
+                session.commit()
+            return len(novos)
+
+    def remover_item(self, fornecedor_id: int, codigo: str, descricao: str):
+        """Tira da fila o item associado (todas as unidades com o mesmo código e descrição)"""
+        with obter_sessao() as session:
+            resultado = session.execute(
+                delete(self.model).where(
+                    self.model.fornecedor_id == fornecedor_id,
+                    self.model.codigo_produto_fornecedor == codigo,
+                    self.model.descricao == descricao
+                ),
+                execution_options={'synchronize_session': False}
+            )
+            session.commit()
+            return resultado.rowcount
+
+    def sincronizar_fornecedores(self, fornecedor_ids: list = None, session=None):
+        """
+        Recalcula a fila dos fornecedores informados (todos quando None) a partir das
+        notas e associações: insere os itens que faltam e remove os que saíram.
+        """
+        if fornecedor_ids is not None:
+            fornecedor_ids = [fornecedor_id for fornecedor_id in set(fornecedor_ids) if fornecedor_id is not None]
+            if not fornecedor_ids:
+                return
+        confirmar = session is None
+
+        with obter_sessao(session) as session:
+            esperados = set(map(tuple, session.execute(consulta_itens_nao_associados(fornecedor_ids))))
+
+            query = select(
+                self.model.id,
+                self.model.fornecedor_id,
+                self.model.codigo_produto_fornecedor,
+                self.model.descricao,
+                self.model.unidade_medida
+            )
+            if fornecedor_ids is not None:
+                query = query.where(self.model.fornecedor_id.in_(fornecedor_ids))
+            atuais = {}
+            for row in session.execute(query):
+                atuais.setdefault(tuple(row)[1:], []).append(row.id)
+
+            # Itens que saíram das notas ou ganharam associação (e duplicados)
+            excluir = [
+                item_id
+                for chave, ids in atuais.items()
+                for item_id in (ids if chave not in esperados else ids[1:])
+            ]
+            if excluir:
+                session.execute(
+                    delete(self.model).where(self.model.id.in_(excluir)),
+                    execution_options={'synchronize_session': False}
+                )
+
+            novos = [
+                {
+                    'fornecedor_id': fornecedor_id,
+                    'codigo_produto_fornecedor': codigo,
+                    'descricao': descricao,
+                    'unidade_medida': unidade,
+                }
+                for fornecedor_id, codigo, descricao, unidade in esperados - set(atuais)
+            ]
+            if novos:
+                session.execute(insert(self.model), novos)
+            if confirmar:
+                session.commit()
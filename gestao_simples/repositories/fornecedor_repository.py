@@ -1,7 +1,7 @@
 # repositories/produto_repository.py
 from repositories.base_repository import BaseRepository
 from models.fornecedor import Fornecedor
-from config.database import SessionLocal
+from config.database import obter_sessao
 
 
 class FornecedorRepository(BaseRepository):
@@ -9,5 +9,5 @@ class FornecedorRepository(BaseRepository):
         super().__init__(Fornecedor)
         
     def buscar_fornecedor_por_cnpj(self, cnpj):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(Fornecedor).filter_by(cnpj=cnpj).first()
\ No newline at end of file
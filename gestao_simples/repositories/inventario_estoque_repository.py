@@ -1,7 +1,7 @@
 # repositories/inventario_estoque_repository.py
 from models.inventario_estoque import InventarioEstoque
 from models.item_inventario import ItemInventario
-from config.database import SessionLocal
+from config.database import obter_sessao
 from repositories.base_repository import BaseRepository
 from sqlalchemy.orm import joinedload
 from datetime import datetime
@@ -16,13 +16,13 @@ class InventarioEstoqueRepository(BaseRepository):
             produto_id=produto_id,
             quantidade_contada=quantidade
         )
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             session.add(item)
             session.commit()
             return item
         
     def atualizar(self, inventario_id: int, dados):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             inventario = session.query(InventarioEstoque).get(inventario_id)
             if not inventario:
                 raise Exception("Inventário não encontrado")
@@ -30,11 +30,14 @@ class InventarioEstoqueRepository(BaseRepository):
             inventario.referencia = dados.referencia
             inventario.data_inicio_contagem = dados.data_inicio_contagem
             inventario.observacoes = dados.observacoes
+            # Correção da data de corte de um inventário encerrado
+            if dados.data_fim_contagem is not None:
+                inventario.data_fim_contagem = dados.data_fim_contagem
             session.commit()
             return inventario        
         
     def encerrar_contagem(self, inventario_id: int, data_fim: datetime):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             inventario = session.query(InventarioEstoque).get(inventario_id)
             
             if not inventario:
@@ -45,7 +48,7 @@ class InventarioEstoqueRepository(BaseRepository):
             return inventario        
 
     def listar_itens_por_inventario(self, inventario_id: int):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return (
                 session.query(ItemInventario)
                 .options(joinedload(ItemInventario.produto))  # Carrega o relacionamento
@@ -54,7 +57,7 @@ class InventarioEstoqueRepository(BaseRepository):
             )
 
     def buscar_por_referencia(self, referencia: str):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return (
                 session.query(InventarioEstoque)
                 .filter(InventarioEstoque.referencia == referencia)
@@ -62,7 +65,7 @@ class InventarioEstoqueRepository(BaseRepository):
                 )
 
     def listar(self):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return (
                 session.query(InventarioEstoque)
                 .options(joinedload(InventarioEstoque.itens))  # Carrega os itens junto
@@ -70,14 +73,15 @@ class InventarioEstoqueRepository(BaseRepository):
             )
         
     def remover_item(self, item_id: int):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             item = session.query(ItemInventario).get(item_id)
             if item:
                 session.delete(item)
                 session.commit()
+            return item
 
     def buscar_por_id(self, inventario_id: int):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return (
                 session.query(InventarioEstoque)
                 .options(
@@ -0,0 +1,109 @@
+# repositories/item_fornecedor_repository.py
+from sqlalchemy import select, insert, update, exists, func
+from repositories.base_repository import BaseRepository
+from models.item_fornecedor import ItemFornecedor
+from models.item_nota_entrada import ItemNotaEntrada
+from models.nota_entrada import NotaEntrada
+from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
+from config.database import obter_sessao
+
+
+def insercao_itens_fornecedor(nota_entrada_id: int = None):
+    """
+    INSERT ... SELECT dos itens distintos das notas (fornecedor, código, descrição,
+    unidade) que ainda não estão no catálogo. Todas as notas quando nota_entrada_id é None.
+    """
+    registrado = exists().where(
+        ItemFornecedor.fornecedor_id == NotaEntrada.fornecedor_id,
+        ItemFornecedor.codigo_produto_fornecedor == ItemNotaEntrada.codigo_produto_fornecedor,
+        ItemFornecedor.descricao == ItemNotaEntrada.descricao,
+        ItemFornecedor.unidade_medida == ItemNotaEntrada.unidade_medida
+    )
+    itens = (
+        select(
+            NotaEntrada.fornecedor_id,
+            ItemNotaEntrada.codigo_produto_fornecedor,
+            ItemNotaEntrada.descricao,
+            ItemNotaEntrada.unidade_medida
+        )
+        .select_from(ItemNotaEntrada)
+        .join(NotaEntrada, ItemNotaEntrada.nota_entrada_id == NotaEntrada.id)
+        .where(ItemNotaEntrada.codigo_produto_fornecedor.isnot(None))
+        .where(~registrado)
+        .group_by(
+            NotaEntrada.fornecedor_id,
+            ItemNotaEntrada.codigo_produto_fornecedor,
+            ItemNotaEntrada.descricao,
+            ItemNotaEntrada.unidade_medida
+        )
+    )
+    if nota_entrada_id is not None:
+        itens = itens.where(ItemNotaEntrada.nota_entrada_id == nota_entrada_id)
+    return insert(ItemFornecedor).from_select(
+        ['fornecedor_id', 'codigo_produto_fornecedor', 'descricao', 'unidade_medida'], itens
+    )
+
+
+def atualizacao_associacoes_itens(fornecedor_id: int = None, codigos: list = None, nota_entrada_id: int = None):
+    """
+    UPDATE que grava em cada item do catálogo a associação do fornecedor com o mesmo
+    código (nula quando não há). Com mais de uma associação para o código, vale a de
+    mesma descrição e depois a mais antiga. Sem filtros atualiza o catálogo inteiro.
+    """
+    mesmo_codigo = (
+        ProdutoFornecedorAssociacao.fornecedor_id == ItemFornecedor.fornecedor_id,
+        ProdutoFornecedorAssociacao.codigo_produto_fornecedor == ItemFornecedor.codigo_produto_fornecedor,
+    )
+    # Duas subconsultas por MIN(id) em vez de ORDER BY ... LIMIT 1: o SQLite não aceita
+    # a tabela atualizada no ORDER BY de uma subconsulta correlacionada
+    mesma_descricao = (
+        select(func.min(ProdutoFornecedorAssociacao.id))
+        .where(*mesmo_codigo, ProdutoFornecedorAssociacao.descricao_produto_fornecedor == ItemFornecedor.descricao)
+        .scalar_subquery()
+    )
+    mais_antiga = select(func.min(ProdutoFornecedorAssociacao.id)).where(*mesmo_codigo).scalar_subquery()
+    associacao = func.coalesce(mesma_descricao, mais_antiga)
+
+    query = update(ItemFornecedor).values(associacao_id=associacao)
+    if fornecedor_id is not None:
+        query = query.where(ItemFornecedor.fornecedor_id == fornecedor_id)
+    if codigos is not None:
+        query = query.where(ItemFornecedor.codigo_produto_fornecedor.in_(list(codigos)))
+    if nota_entrada_id is not None:
+        query = query.where(ItemFornecedor.id.in_(
+            select(ItemNotaEntrada.item_fornecedor_id).where(ItemNotaEntrada.nota_entrada_id == nota_entrada_id)
+        ))
+    return query
+
+
+class ItemFornecedorRepository(BaseRepository):
+    """
+    Catálogo normalizado dos itens de fornecedor: cada combinação de fornecedor, código,
+    descrição e unidade vira um id inteiro, usado nas junções e agrupamentos.
+
+    Métodos que recebem session rodam na transação de quem chamou (sem commit);
+    sem session, confirmam a própria alteração.
+    """
+    def __init__(self):
+        super().__init__(ItemFornecedor)
+
+    def registrar_itens_nota(self, nota_entrada_id: int, session=None):
+        """Inclui no catálogo os itens da nota que ainda não estão nele (uma instrução)"""
+        confirmar = session is None
+        with obter_sessao(session) as session:
+            resultado = session.execute(insercao_itens_fornecedor(nota_entrada_id))
+            if confirmar:
+                session.commit()
+            return resultado.rowcount
+
+    def resolver_associacoes(self, fornecedor_id: int = None, codigos: list = None, nota_entrada_id: int = None, session=None):
+        """Recalcula a associação dos itens do catálogo filtrados (uma instrução)"""
+        confirmar = session is None
+        with obter_sessao(session) as session:
+            resultado = session.execute(
+                atualizacao_associacoes_itens(fornecedor_id, codigos, nota_entrada_id),
+                execution_options={'synchronize_session': False}
+            )
+            if confirmar:
+                session.commit()
+            return resultado.rowcount
@@ -1,33 +1,157 @@
 # repositories/item_nota_entrada_repository.py
 from repositories.base_repository import BaseRepository
 from models.item_nota_entrada import ItemNotaEntrada
-from config.database import SessionLocal
+from models.nota_entrada import NotaEntrada
+from models.item_fornecedor import ItemFornecedor
+from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
+from config.database import obter_sessao
+from sqlalchemy import insert, update, delete, select
+
+# Colunas preenchidas a partir do catálogo e da associação do fornecedor, nunca pelos dados das telas
+COLUNAS_RESOLVIDAS = {'item_fornecedor_id', 'produto_id', 'quantidade_por_grade'}
+
+
+def atualizacao_itens_fornecedor(nota_entrada_id: int = None):
+    """
+    UPDATE que liga cada item da nota ao seu registro no catálogo do fornecedor
+    (mesmo fornecedor, código, descrição e unidade). Sem filtro atualiza todos os itens.
+    """
+    item_fornecedor = (
+        select(ItemFornecedor.id)
+        .where(
+            NotaEntrada.id == ItemNotaEntrada.nota_entrada_id,
+            ItemFornecedor.fornecedor_id == NotaEntrada.fornecedor_id,
+            ItemFornecedor.codigo_produto_fornecedor == ItemNotaEntrada.codigo_produto_fornecedor,
+            ItemFornecedor.descricao == ItemNotaEntrada.descricao,
+            ItemFornecedor.unidade_medida == ItemNotaEntrada.unidade_medida
+        )
+        .scalar_subquery()
+    )
+    query = update(ItemNotaEntrada).values(item_fornecedor_id=item_fornecedor)
+    if nota_entrada_id is not None:
+        query = query.where(ItemNotaEntrada.nota_entrada_id == nota_entrada_id)
+    return query
+
+
+def atualizacao_produtos_resolvidos(fornecedor_id: int = None, codigos: list = None, nota_entrada_id: int = None):
+    """
+    UPDATE que grava em cada item o produto_id e a quantidade_por_grade da associação
+    do seu item de catálogo (nulos quando não há associação). As junções são todas
+    por chave inteira: item -> itens_fornecedor -> produto_fornecedor_associacao.
+
+    Sem filtros atualiza todos os itens (carga inicial).
+    """
+    def _da_associacao(coluna):
+        return (
+            select(coluna)
+            .select_from(ItemFornecedor)
+            .join(ProdutoFornecedorAssociacao, ProdutoFornecedorAssociacao.id == ItemFornecedor.associacao_id)
+            .where(ItemFornecedor.id == ItemNotaEntrada.item_fornecedor_id)
+            .scalar_subquery()
+        )
+
+    query = update(ItemNotaEntrada).values(
+        produto_id=_da_associacao(ProdutoFornecedorAssociacao.produto_id),
+        quantidade_por_grade=_da_associacao(ProdutoFornecedorAssociacao.quantidade_por_grade)
+    )
+    if nota_entrada_id is not None:
+        query = query.where(ItemNotaEntrada.nota_entrada_id == nota_entrada_id)
+    if fornecedor_id is not None or codigos is not None:
+        itens_catalogo = select(ItemFornecedor.id)
+        if fornecedor_id is not None:
+            itens_catalogo = itens_catalogo.where(ItemFornecedor.fornecedor_id == fornecedor_id)
+        if codigos is not None:
+            itens_catalogo = itens_catalogo.where(ItemFornecedor.codigo_produto_fornecedor.in_(list(codigos)))
+        query = query.where(ItemNotaEntrada.item_fornecedor_id.in_(itens_catalogo))
+    return query
+
 
 class ItemNotaEntradaRepository(BaseRepository):
     def __init__(self):
         super().__init__(ItemNotaEntrada)
     
     def listar_por_nota_entrada(self, nota_entrada_id, session=None):
-        if session is None:
-            session = SessionLocal()
-        with session:
+        with obter_sessao(session) as session:
             return session.query(self.model).filter(self.model.nota_entrada_id == nota_entrada_id).all()
     
     def criar(self, obj, session=None):
-        if session is None:
-            session = SessionLocal()
-        session.add(obj)
-        session.commit()
-        session.refresh(obj)
-        return obj
+        with obter_sessao(session) as session:
+            session.add(obj)
+            session.commit()
+            session.refresh(obj)
+            return obj
     
+    def colunas_editaveis(self):
+        """Colunas gravadas a partir dos dados das telas (sem PK, timestamps e colunas resolvidas)"""
+        return {coluna.key for coluna in self.model.__table__.columns} - {'id', 'created_at', 'updated_at'} - COLUNAS_RESOLVIDAS
+
+    def criar_em_lote(self, itens_data, nota_entrada_id, session):
+        """
+        Insere os itens de uma nota em um único INSERT multi-linha/executemany.
+
+        Não faz commit nem refresh: roda dentro da transação de quem chamou.
+        Chaves que não são colunas do model (ex.: _sa_instance_state) são ignoradas.
+        """
+        colunas = self.colunas_editaveis()
+        linhas = [
+            {**{chave: valor for chave, valor in item.items() if chave in colunas}, 'nota_entrada_id': nota_entrada_id}
+            for item in itens_data
+        ]
+        if linhas:
+            session.execute(insert(self.model), linhas)
+        return len(linhas)
+
+    def atualizar_em_lote(self, itens_data, session):
+        """UPDATE por chave primária de vários itens em um único executemany (sem commit)"""
+        colunas = self.colunas_editaveis() | {'id'}
+        linhas = [{chave: valor for chave, valor in item.items() if chave in colunas} for item in itens_data]
+        if linhas:
+            session.execute(update(self.model), linhas)
+        return len(linhas)
+
+    def deletar_em_lote(self, ids, session):
+        """DELETE ... WHERE id IN (...) em uma única instrução (sem commit)"""
+        ids = list(ids)
+        if ids:
+            session.execute(
+                delete(self.model).where(self.model.id.in_(ids)),
+                execution_options={'synchronize_session': False}
+            )
+        return len(ids)
+
+    def vincular_itens_fornecedor(self, nota_entrada_id: int, session=None):
+        """Liga os itens da nota ao catálogo do fornecedor (uma instrução; sem commit com session)"""
+        confirmar = session is None
+        with obter_sessao(session) as session:
+            resultado = session.execute(
+                atualizacao_itens_fornecedor(nota_entrada_id),
+                execution_options={'synchronize_session': False}
+            )
+            if confirmar:
+                session.commit()
+            return resultado.rowcount
+
+    def resolver_produtos(self, fornecedor_id: int = None, codigos: list = None, nota_entrada_id: int = None, session=None):
+        """
+        Resolve produto e grade dos itens em uma única instrução. Com session roda na
+        transação de quem chamou (sem commit); sem session, confirma a alteração.
+        """
+        confirmar = session is None
+
+        with obter_sessao(session) as session:
+            resultado = session.execute(
+                atualizacao_produtos_resolvidos(fornecedor_id, codigos, nota_entrada_id),
+                execution_options={'synchronize_session': False}
+            )
+            if confirmar:
+                session.commit()
+            return resultado.rowcount
+
     def atualizar(self, obj, session=None):
-        if session is None:
-            session = SessionLocal()
-        # Não use with session: (remove essa linha)
-        session.merge(obj)
-        # Não faça commit aqui! ❌
-        return obj
+        with obter_sessao(session) as session:
+            session.merge(obj)
+            # Não faça commit aqui! ❌
+            return obj
 
     def deletar(self, id, session=None):
         try:
@@ -42,7 +166,5 @@ class ItemNotaEntradaRepository(BaseRepository):
             raise
         
     def buscar_por_id(self, id, session=None):
-        if session is None:
-            session = SessionLocal()        
-        with session:
+        with obter_sessao(session) as session:
             return session.query(self.model).filter(self.model.id == id).first()
\ No newline at end of file
@@ -1,7 +1,8 @@
 # repositories/nota_entrada_repository.py
 from repositories.base_repository import BaseRepository
-from config.database import SessionLocal
+from config.database import obter_sessao
 from models.nota_entrada import NotaEntrada
+from sqlalchemy import exists
 
 class NotaEntradaRepository(BaseRepository):
     def __init__(self):
@@ -9,25 +10,33 @@ class NotaEntradaRepository(BaseRepository):
 
     def criar(self, obj, session=None):
         if session is None:
-            session = SessionLocal()
-            session.add(obj)
-            session.commit()
-            session.refresh(obj)
+            with obter_sessao() as session:
+                session.add(obj)
+                session.commit()
+                session.refresh(obj)
         else:
             session.add(obj)
             session.flush()  # Força o flush para gerar o ID
         return obj
     
     def atualizar(self, obj, session=None):
-        if session is None:
-            session = SessionLocal()        
-        with session:
+        with obter_sessao(session) as session:
             session.merge(obj)
             session.commit()
             return obj
         
     def buscar_por_chave_acesso(self, chave_acesso, session=None):
-        if session is None:
-            session = SessionLocal()        
-        with session:        
-            return session.query(NotaEntrada).filter(NotaEntrada.chave_acesso == chave_acesso).first()
\ No newline at end of file
+        with obter_sessao(session) as session:        
+            return session.query(NotaEntrada).filter(NotaEntrada.chave_acesso == chave_acesso).first()
+
+    def existe_chave_acesso(self, chave_acesso, session=None) -> bool:
+        with obter_sessao(session) as session:
+            return session.query(exists().where(NotaEntrada.chave_acesso == chave_acesso)).scalar()
+
+    def listar_chaves_acesso(self):
+        """Chaves de acesso de todas as notas gravadas (só a coluna)"""
+        with obter_sessao() as session:
+            return [
+                chave for (chave,) in
+                session.query(NotaEntrada.chave_acesso).filter(NotaEntrada.chave_acesso.isnot(None)).all()
+            ]
@@ -1,7 +1,10 @@
 # repositories/produto_fornecedor_associacao_repository.py
 from repositories.base_repository import BaseRepository
 from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
-from config.database import SessionLocal
+from models.item_nota_entrada import ItemNotaEntrada
+from models.item_fornecedor import ItemFornecedor
+from config.database import obter_sessao
+from sqlalchemy import exists, select
 from sqlalchemy.orm import joinedload
 
 class ProdutoFornecedorAssociacaoRepository(BaseRepository):
@@ -9,20 +12,48 @@ class ProdutoFornecedorAssociacaoRepository(BaseRepository):
         super().__init__(ProdutoFornecedorAssociacao)
 
     def listar(self):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(ProdutoFornecedorAssociacao).options(
                 joinedload(ProdutoFornecedorAssociacao.produto),
                 joinedload(ProdutoFornecedorAssociacao.fornecedor)
                 ).all()
 
     def buscar_por_criterios(self, fornecedor_id, codigo, descricao):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(ProdutoFornecedorAssociacao).filter(
                 ProdutoFornecedorAssociacao.fornecedor_id == fornecedor_id,
                 ProdutoFornecedorAssociacao.codigo_produto_fornecedor == codigo,
                 ProdutoFornecedorAssociacao.descricao_produto_fornecedor == descricao
             ).first()
 
-    def listar_nao_associados(self, fornecedor_id):
-        # Implemente conforme a lógica de negócio
-        pass
\ No newline at end of file
+    def listar_nao_associados(self, fornecedor_ids: list = None, session=None):
+        """(fornecedor_id, código, descrição, unidade) dos itens sem associação"""
+        with obter_sessao(session) as session:
+            return session.execute(consulta_itens_nao_associados(fornecedor_ids)).all()
+
+
+def consulta_itens_nao_associados(fornecedor_ids: list = None):
+    """
+    Itens do catálogo dos fornecedores (fornecedor, código, descrição, unidade) presentes
+    em alguma nota e sem associação com o mesmo fornecedor, código e descrição, em uma
+    única consulta (NOT EXISTS). Todos os fornecedores quando fornecedor_ids é None.
+    """
+    em_notas = exists().where(ItemNotaEntrada.item_fornecedor_id == ItemFornecedor.id)
+    associado = exists().where(
+        ProdutoFornecedorAssociacao.fornecedor_id == ItemFornecedor.fornecedor_id,
+        ProdutoFornecedorAssociacao.codigo_produto_fornecedor == ItemFornecedor.codigo_produto_fornecedor,
+        ProdutoFornecedorAssociacao.descricao_produto_fornecedor == ItemFornecedor.descricao
+    )
+    query = (
+        select(
+            ItemFornecedor.fornecedor_id,
+            ItemFornecedor.codigo_produto_fornecedor,
+            ItemFornecedor.descricao,
+            ItemFornecedor.unidade_medida
+        )
+        .where(em_notas)
+        .where(~associado)
+    )
+    if fornecedor_ids is not None:
+        query = query.where(ItemFornecedor.fornecedor_id.in_(list(fornecedor_ids)))
+    return query
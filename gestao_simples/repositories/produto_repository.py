@@ -1,12 +1,12 @@
 # repositories/produto_repository.py
 from repositories.base_repository import BaseRepository
 from models.produto import Produto
-from config.database import SessionLocal
+from config.database import obter_sessao
 
 class ProdutoRepository(BaseRepository):
     def __init__(self):
         super().__init__(Produto)
 
     def buscar_produto_por_nome(self, nome):
-        with SessionLocal() as session:
+        with obter_sessao() as session:
             return session.query(Produto).filter_by(nome=nome).first()        
\ No newline at end of file
@@ -0,0 +1,56 @@
+# repositories/saldo_fechamento_repository.py
+from sqlalchemy import insert, delete, select
+from repositories.base_repository import BaseRepository
+from models.saldo_fechamento import SaldoFechamento
+from models.produto import Produto
+from config.database import obter_sessao
+
+class SaldoFechamentoRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(SaldoFechamento)
+
+    def substituir(self, inventario_id: int, camadas: list, produto_ids: list = None, session=None):
+        """Grava como saldo de fechamento as camadas com saldo remanescente"""
+        linhas = [
+            {
+                'inventario_id': inventario_id,
+                'produto_id': camada['produto_id'],
+                'item_nota_entrada_id': camada['item_nota_entrada_id'],
+                'data_emissao': camada['data_emissao'],
+                'quantidade_unidades': camada['saldo_remanescente'],
+                'valor_unitario': camada['valor_unitario'],
+            }
+            for camada in camadas if camada['saldo_remanescente']
+        ]
+
+        with obter_sessao(session) as session:
+            excluir = delete(self.model).where(self.model.inventario_id == inventario_id)
+            if produto_ids is not None:
+                excluir = excluir.where(self.model.produto_id.in_(list(produto_ids)))
+            session.execute(excluir, execution_options={'synchronize_session': False})
+
+            if linhas:
+                session.execute(insert(self.model), linhas)
+            session.commit()
+            return len(linhas)
+
+    def listar_como_entradas(self, inventario_id: int, produto_ids: list = None):
+        """Saldos no formato de AuditoriaRepository.listar_entradas (lotes de partida)"""
+        query = (
+            select(
+                self.model.item_nota_entrada_id,
+                self.model.produto_id,
+                Produto.nome,
+                self.model.data_emissao,
+                self.model.quantidade_unidades,
+                self.model.valor_unitario,
+            )
+            .join(Produto, Produto.id == self.model.produto_id)
+            .where(self.model.inventario_id == inventario_id)
+            .order_by(self.model.produto_id, self.model.data_emissao, self.model.item_nota_entrada_id)
+        )
+        if produto_ids is not None:
+            query = query.where(self.model.produto_id.in_(list(produto_ids)))
+
+        with obter_sessao() as session:
+            return session.execute(query).all()
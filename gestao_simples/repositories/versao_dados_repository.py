@@ -0,0 +1,57 @@
+# repositories/versao_dados_repository.py
+import uuid
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from config.database import obter_sessao
+from models.versao_dados import VersaoDados
+
+VERSAO_AUDITORIA = 'auditoria'
+
+# Tabelas cujas alterações mudam o resultado da auditoria
+TABELAS_VERSAO_AUDITORIA = frozenset({
+    'notas_entrada',
+    'itens_nota_entrada',
+    'produto_fornecedor_associacao',
+    'produtos',
+    'inventario_estoque',
+    'itens_inventario',
+    'auditoria_camadas_estado',
+})
+
+
+def renovacao_versao(nome: str = VERSAO_AUDITORIA):
+    """UPDATE que troca a marca por uma nova (nunca reaproveitada, nem após restaurar um backup)"""
+    tabela = VersaoDados.__table__
+    return update(tabela).where(tabela.c.nome == nome).values(versao=uuid.uuid4().hex)
+
+
+class VersaoDadosRepository:
+    def obter(self, nome: str = VERSAO_AUDITORIA):
+        """Marca atual (None se a linha não existir: quem usa não deve guardar em cache)"""
+        with obter_sessao() as session:
+            return session.execute(select(VersaoDados.versao).where(VersaoDados.nome == nome)).scalar()
+
+    def renovar(self, nome: str = VERSAO_AUDITORIA, session=None):
+        """Troca a marca (escritas feitas fora das sessões da aplicação, ex.: restauração)"""
+        confirmar = session is None
+        with obter_sessao(session) as session:
+            session.execute(renovacao_versao(nome))
+            if confirmar:
+                session.commit()
+
+
+# Toda sessão que grava nas tabelas auditadas renova a marca na mesma transação
+@event.listens_for(Session, "after_flush")
+def _renovar_apos_flush(session, flush_context):
+    alterados = (*session.new, *session.dirty, *session.deleted)
+    if any(getattr(obj, '__tablename__', None) in TABELAS_VERSAO_AUDITORIA for obj in alterados):
+        session.connection().execute(renovacao_versao())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _renovar_em_instrucoes(estado):
+    # INSERT/UPDATE/DELETE em lote (session.execute) não passam pelo flush
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return
+    if estado.statement.table.name in TABELAS_VERSAO_AUDITORIA:
+        estado.session.connection().execute(renovacao_versao())
@@ -1,16 +1,175 @@
 # services/auditoria_service.py
 from repositories.auditoria_repository import AuditoriaRepository
 from services.inventario_estoque_service import InventarioEstoqueService
+from services.camada_peps_service import CamadaPepsService
+from services.peps_numpy import calcular_comparativo_numpy
+from utils.cache import CacheLRU
+from utils.format import format_datetime, format_brl, format_value_brl
+from config.settings import EXPORT_DIR
+from datetime import datetime
 import streamlit as st
+import csv
+import os
+
+# Resultados da auditoria por (consulta, versão dos dados), compartilhados entre sessões
+_cache_auditoria = CacheLRU(tamanho_maximo=64)
+
+# Colunas somadas nos totais da auditoria
+COLUNAS_TOTAIS = [
+    'quantidade_unidades',
+    'valor_total_lote',
+    'quantidade_consumida',
+    'saldo_remanescente',
+    'valor_consumido',
+    'valor_saldo_remanescente',
+]
+
+
+def invalidar_cache_auditoria():
+    """Após uma restauração: os dados mudaram sem passar pelas sessões da aplicação"""
+    AuditoriaRepository().versao_repository.renovar()
+    _cache_auditoria.limpar()
+
 
 class AuditoriaService:
-    def __init__(self):
+    def __init__(self, motor: str = None):
+        """motor: 'sql' ou 'numpy' (padrão AUDITORIA_MOTOR do .env)"""
         self.repository = AuditoriaRepository()
         self.inventario_service = InventarioEstoqueService()
+        self.camada_peps_service = CamadaPepsService(motor)
+
+    def obter_versao_dados(self):
+        return self.repository.obter_versao_dados()
+
+    def obter_dados_auditoria(self, referencia_inventario: str = None, produto_id: int = None,
+                              somente_com_saldo: bool = False, versao=None):
+        """
+        Camadas PEPS do inventário. Com versao (obter_versao_dados) o resultado é
+        reaproveitado do cache enquanto os dados não mudarem; a lista devolvida é
+        compartilhada e não deve ser alterada.
+        """
+        if versao is not None:
+            # Todas as camadas ficam em cache; o filtro de saldo é feito em memória
+            chave = ('camadas', referencia_inventario, produto_id, versao)
+            dados = _cache_auditoria.obter(chave)
+            if dados is None:
+                dados = self._obter_camadas(referencia_inventario, produto_id)
+                _cache_auditoria.guardar(chave, dados)
+            if somente_com_saldo:
+                return [d for d in dados if d['saldo_remanescente'] != 0]
+            return dados
+
+        return self._obter_camadas(referencia_inventario, produto_id, somente_com_saldo)
+
+    def _obter_camadas(self, referencia_inventario: str = None, produto_id: int = None, somente_com_saldo: bool = False):
+        inventario = self.repository.obter_inventario(referencia_inventario)
+        if not inventario:
+            return []
+        # Lê as camadas gravadas; o cálculo completo só ocorre se o inventário estiver desatualizado
+        return self.camada_peps_service.obter_camadas(inventario, produto_id, somente_com_saldo)
+
+    def iterar_dados_auditoria(self, referencia_inventario: str = None, produto_id: int = None,
+                               somente_com_saldo: bool = False, **kwargs):
+        """Camadas do inventário em lotes lidos em streaming (memória limitada ao lote)"""
+        inventario = self.repository.obter_inventario(referencia_inventario)
+        if not inventario:
+            return
+        yield from self.camada_peps_service.iterar_camadas(inventario, produto_id, somente_com_saldo, **kwargs)
+
+    def calcular_totais(self, referencia_inventario: str = None, produto_id: int = None, somente_com_saldo: bool = False):
+        """Totais gerais e por produto, acumulados lote a lote"""
+        totais = dict.fromkeys(COLUNAS_TOTAIS, 0.0)
+        por_produto = {}
+        for lote in self.iterar_dados_auditoria(referencia_inventario, produto_id, somente_com_saldo):
+            for linha in lote:
+                produto = por_produto.setdefault(linha['produto_id'], dict.fromkeys(COLUNAS_TOTAIS, 0.0))
+                for coluna in COLUNAS_TOTAIS:
+                    valor = linha[coluna] or 0.0
+                    produto[coluna] += valor
+                    totais[coluna] += valor
+        return totais, por_produto
+
+    def exportar_csv(self, referencia_inventario: str = None, produto_id: int = None, somente_com_saldo: bool = False):
+        """
+        Grava as camadas em CSV (mesmas colunas da tela, linha Total ao final) escrevendo
+        lote a lote em EXPORT_DIR. Retorna o caminho do arquivo.
+        """
+        caminho = os.path.join(EXPORT_DIR, f"auditoria_estoque_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv")
+        totais = dict.fromkeys(COLUNAS_TOTAIS, 0.0)
+
+        with open(caminho, 'w', newline='', encoding='utf-8-sig') as arquivo:
+            writer = csv.writer(arquivo, delimiter=';')
+            writer.writerow([
+                'ID', 'Produto', 'Data Entrada (Lote)', 'Custo Unitário', 'Consumo (UN)', 'Custo Consumido',
+                'Custo Total', 'Quantidade (UN)', 'Saldo (UN)', 'Saldo Financeiro'
+            ])
+            for lote in self.iterar_dados_auditoria(referencia_inventario, produto_id, somente_com_saldo):
+                for linha in lote:
+                    for coluna in COLUNAS_TOTAIS:
+                        totais[coluna] += linha[coluna] or 0.0
+                    writer.writerow(self._linha_csv(linha))
+
+            writer.writerow(self._linha_csv({
+                'produto_id': 'Total', 'nome': '', 'data_emissao': None, 'valor_unitario': None, **totais
+            }))
+
+        return caminho
+
+    def _linha_csv(self, linha):
+        return [
+            linha['produto_id'],
+            linha['nome'],
+            format_datetime(linha['data_emissao']) if linha['data_emissao'] else '',
+            format_brl(linha['valor_unitario']) if linha['valor_unitario'] is not None else '',
+            format_value_brl(linha['quantidade_consumida'], decimals=3),
+            format_brl(linha['valor_consumido']),
+            format_brl(linha['valor_total_lote']),
+            format_value_brl(linha['quantidade_unidades'], decimals=3),
+            format_value_brl(linha['saldo_remanescente'], decimals=3),
+            format_brl(linha['valor_saldo_remanescente']),
+        ]
+
+    def obter_comparativo(self, produto_id: int = None, versao=None):
+        """
+        Consumo do período, custo consumido e saldo de cada produto em todos os
+        inventários encerrados, calculados em uma única passada pelos lotes.
+        """
+        chave = ('comparativo', produto_id, versao)
+        if versao is not None:
+            comparativo = _cache_auditoria.obter(chave)
+            if comparativo is not None:
+                return comparativo
+
+        inventarios = self.repository.listar_inventarios_encerrados()
+        entradas = self.repository.listar_entradas_por_periodo(produto_id)
+        contagens = self.repository.listar_contagens_encerradas(produto_id)
+        comparativo = calcular_comparativo_numpy(entradas, contagens, inventarios)
+
+        if versao is not None:
+            _cache_auditoria.guardar(chave, comparativo)
+        return comparativo
+
+    def listar_produtos(self, versao=None):
+        """{produto_id: nome} para o filtro da auditoria, sem calcular camadas"""
+        chave = ('produtos', versao)
+        if versao is not None:
+            produtos = _cache_auditoria.obter(chave)
+            if produtos is not None:
+                return produtos
+
+        produtos = {row.id: row.nome for row in self.repository.listar_produtos_associados()}
+        if versao is not None:
+            _cache_auditoria.guardar(chave, produtos)
+        return produtos
+
+    def reconstruir_camadas(self):
+        return self.camada_peps_service.reconstruir()
 
-    def obter_dados_auditoria(self, referencia_inventario: str = None):
-        dados = self.repository.obter_dados_peps(referencia_inventario)           
-        return dados
+    def conferir_motores(self, referencia_inventario: str = None):
+        inventario = self.repository.obter_inventario(referencia_inventario)
+        if not inventario or inventario.data_fim_contagem is None:
+            return None
+        return self.camada_peps_service.conferir_motores(inventario)
 
     def listar_referencias_inventarios(self):
-        return [inv.referencia for inv in self.inventario_service.listar_inventarios()]    
\ No newline at end of file
+        return [inv.referencia for inv in self.inventario_service.listar_inventarios()]    
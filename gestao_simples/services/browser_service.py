@@ -2,99 +2,418 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from config.settings import CHROME_DRIVER_CACHE_PATH
+from config.settings import CHROME_DRIVER_CACHE_PATH, NAVEGADOR_POOL_TAMANHO, NAVEGADOR_TEMPO_OCIOSO, SEFAZ_CONEXOES
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException, StaleElementReferenceException
 
 from webdriver_manager.chrome import ChromeDriverManager
 import streamlit as st
 from utils.logger import logger
+import atexit
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)  # Suprime avisos SSL
 
+# Segundos entre as verificações da página de resultado feitas pelo WebDriverWait
+INTERVALO_VERIFICACAO_CAPTCHA = 0.25
+# Segundos aguardando a thread da espera terminar antes de devolver o navegador ao pool
+ESPERA_FIM_VERIFICACAO = 2
+
+
+class EsperaCancelada(Exception):
+    """A espera do CAPTCHA foi interrompida (rerun/stop do Streamlit)"""
+
+# Caminho do ChromeDriver resolvido uma vez por processo
+_caminho_driver = None
+_lock_caminho = threading.Lock()
+
+
+def _caminho_chrome_driver():
+    """Caminho do ChromeDriver: memória, arquivo de cache e, por último, o webdriver_manager"""
+    global _caminho_driver
+    with _lock_caminho:
+        if _caminho_driver and os.path.exists(_caminho_driver):
+            return _caminho_driver
+
+        if os.path.exists(CHROME_DRIVER_CACHE_PATH):
+            with open(CHROME_DRIVER_CACHE_PATH, "r") as f:
+                cached_path = f.read().strip()
+            if os.path.exists(cached_path):
+                _caminho_driver = cached_path
+                return _caminho_driver
+
+        logger.info("Procurando ChromeDriver...")
+        os.environ["WDM_LOCAL"] = "2"
+        wdm_dir = os.path.join(os.path.expanduser("~"), ".wdm")
+        os.environ["WDM_LOCAL_PATH"] = wdm_dir
+        os.makedirs(wdm_dir, exist_ok=True)
+
+        _caminho_driver = ChromeDriverManager().install()
+        with open(CHROME_DRIVER_CACHE_PATH, "w") as f:
+            f.write(_caminho_driver)
+        logger.info(f"ChromeDriver encontrado em: {_caminho_driver}")
+        return _caminho_driver
+
+
+def _invalidar_caminho_chrome_driver():
+    global _caminho_driver
+    with _lock_caminho:
+        _caminho_driver = None
+        if os.path.exists(CHROME_DRIVER_CACHE_PATH):
+            os.remove(CHROME_DRIVER_CACHE_PATH)
+
+
+def _opcoes_chrome():
+    """
+    Perfil leve: sem extensões, sincronização, notificações nem tarefas de fundo, e
+    carregamento 'eager' (o HTML basta; não espera imagens e folhas de estilo).
+    As imagens continuam habilitadas porque o usuário precisa ver o CAPTCHA.
+    """
+    chrome_options = Options()
+    chrome_options.page_load_strategy = 'eager'
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--start-maximized')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-software-rasterizer')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-background-networking')
+    chrome_options.add_argument('--disable-sync')
+    chrome_options.add_argument('--disable-notifications')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--no-default-browser-check')
+    chrome_options.add_experimental_option('prefs', {
+        'credentials_enable_service': False,
+        'profile.password_manager_enabled': False,
+        'profile.default_content_setting_values.notifications': 2,
+    })
+    return chrome_options
+
+
+def criar_driver():
+    """Abre um Chrome novo; com um ChromeDriver em cache inválido, baixa outro e tenta de novo"""
+    try:
+        return webdriver.Chrome(service=Service(executable_path=_caminho_chrome_driver()), options=_opcoes_chrome())
+    except WebDriverException:
+        logger.warning("Falha ao usar ChromeDriver cacheado. Atualizando...")
+        _invalidar_caminho_chrome_driver()
+        return webdriver.Chrome(service=Service(executable_path=_caminho_chrome_driver()), options=_opcoes_chrome())
+
+
+class PoolNavegadores:
+    """
+    Navegadores Chrome abertos e reaproveitados entre as consultas, compartilhados
+    pelas sessões do Streamlit (thread-safe).
+
+    Um navegador devolvido volta para uma página em branco e fica minimizado
+    até a próxima consulta (os cookies da SEFAZ são mantidos). Antes de ser entregue
+    passa por uma verificação de saúde; navegadores travados ou fechados pelo usuário
+    são descartados. Os ociosos há mais de `tempo_ocioso` segundos são encerrados.
+    """
+    def __init__(self, criar, tamanho_maximo: int = NAVEGADOR_POOL_TAMANHO,
+                 tempo_ocioso: float = NAVEGADOR_TEMPO_OCIOSO, espera_aquecimento: float = 60):
+        self.criar = criar
+        self.tamanho_maximo = max(1, tamanho_maximo)
+        self.tempo_ocioso = tempo_ocioso
+        self.espera_aquecimento = espera_aquecimento
+        self._livres = []  # (driver, devolvido_em)
+        self._aquecendo = 0
+        self._condicao = threading.Condition()
+        self._vigia = None
+
+    def aquecer(self, quantidade: int = 1):
+        """Abre em segundo plano navegadores até haver `quantidade` livres ou abrindo"""
+        with self._condicao:
+            faltam = min(quantidade, self.tamanho_maximo) - len(self._livres) - self._aquecendo
+            self._aquecendo += max(0, faltam)
+        for _ in range(max(0, faltam)):
+            threading.Thread(target=self._abrir_em_segundo_plano, daemon=True).start()
+
+    def _abrir_em_segundo_plano(self):
+        driver = None
+        try:
+            inicio = time.time()
+            driver = self.criar()
+            self._esconder(driver)
+            logger.info(f"Navegador pré-aberto em {time.time() - inicio:.1f}s")
+        except Exception as e:
+            logger.error(f"Erro ao pré-abrir navegador: {str(e)}")
+        with self._condicao:
+            self._aquecendo -= 1
+            if driver:
+                self._livres.append((driver, time.time()))
+            self._condicao.notify_all()
+        self._iniciar_vigia()
+
+    def obter(self):
+        """Navegador livre e saudável do pool, o que está sendo pré-aberto ou um novo"""
+        with self._condicao:
+            if not self._livres and self._aquecendo:
+                self._condicao.wait_for(lambda: self._livres or not self._aquecendo, timeout=self.espera_aquecimento)
+            livres, self._livres = self._livres, []
+
+        driver = None
+        for candidato, devolvido_em in livres:
+            if driver is not None:
+                with self._condicao:
+                    self._livres.append((candidato, devolvido_em))
+            elif self._saudavel(candidato):
+                driver = candidato
+            else:
+                self.descartar(candidato)
+        if driver is None:
+            driver = self.criar()
+        self._mostrar(driver)
+        return driver
+
+    def devolver(self, driver):
+        """Limpa o navegador após a consulta e o guarda para a próxima (ou fecha, se sobrar)"""
+        if not self._resetar(driver):
+            self.descartar(driver)
+            return
+        self._devolver_ou_fechar(driver)
+        self._iniciar_vigia()
+
+    def _devolver_ou_fechar(self, driver):
+        with self._condicao:
+            if len(self._livres) < self.tamanho_maximo:
+                self._livres.append((driver, time.time()))
+                self._condicao.notify_all()
+                return
+        self.descartar(driver)
+
+    def descartar(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def encerrar_ociosos(self):
+        limite = time.time() - self.tempo_ocioso
+        with self._condicao:
+            ociosos = [driver for driver, devolvido_em in self._livres if devolvido_em < limite]
+            self._livres = [(driver, devolvido_em) for driver, devolvido_em in self._livres if devolvido_em >= limite]
+        for driver in ociosos:
+            self.descartar(driver)
+        if ociosos:
+            logger.info(f"{len(ociosos)} navegador(es) ocioso(s) encerrado(s)")
+
+    def encerrar(self):
+        with self._condicao:
+            livres, self._livres = self._livres, []
+        for driver, _ in livres:
+            self.descartar(driver)
+
+    def _iniciar_vigia(self):
+        with self._condicao:
+            if self._vigia and self._vigia.is_alive():
+                return
+            self._vigia = threading.Thread(target=self._vigiar, daemon=True)
+            self._vigia.start()
+
+    def _vigiar(self):
+        # Encerra os ociosos; termina quando o pool fica vazio (reiniciada na próxima devolução)
+        while True:
+            time.sleep(min(30, self.tempo_ocioso))
+            self.encerrar_ociosos()
+            with self._condicao:
+                if not self._livres:
+                    self._vigia = None
+                    return
+
+    @staticmethod
+    def _saudavel(driver):
+        try:
+            return bool(driver.window_handles) and driver.current_url is not None
+        except Exception:
+            return False
+
+    @staticmethod
+    def _resetar(driver):
+        """Fecha abas extras e volta para uma página em branco; False se o navegador não responde"""
+        try:
+            abas = driver.window_handles
+            for aba in abas[1:]:
+                driver.switch_to.window(aba)
+                driver.close()
+            driver.switch_to.window(abas[0])
+            driver.get('about:blank')
+            PoolNavegadores._esconder(driver)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _esconder(driver):
+        try:
+            driver.minimize_window()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _mostrar(driver):
+        try:
+            driver.maximize_window()
+        except Exception:
+            pass
+
+
+_pool_navegadores = PoolNavegadores(criar_driver)
+atexit.register(_pool_navegadores.encerrar)
+
+
+def _modelo_da_resposta(response):
+    """Modelo da nota (65 NFC-e / 55 NF-e) de uma resposta sem CAPTCHA; None se a SEFAZ pediu CAPTCHA"""
+    texto = response.text.lower()
+    if response.status_code != 200 or any(
+        term in texto for term in ["captcha", "certificate", "certificado", "validação"]
+    ):
+        return None
+    return 55 if 'aba_nft_0' in texto else 65
+
+
+class SessaoSefaz:
+    """
+    Sessão HTTP compartilhada para as consultas à SEFAZ: conexões mantidas abertas
+    (keep-alive), novas tentativas com espera crescente em falhas temporárias e,
+    depois de um CAPTCHA resolvido, os cookies e o User-Agent do navegador.
+    """
+    def __init__(self, timeout: float = 10, tentativas: int = 3, conexoes: int = SEFAZ_CONEXOES):
+        self.timeout = timeout
+        self.autenticada = False
+        self._lock = threading.Lock()
+        self.sessao = requests.Session()
+        retry = Retry(
+            total=tentativas,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET'])
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, conexoes), max_retries=retry)
+        self.sessao.mount('https://', adapter)
+        self.sessao.mount('http://', adapter)
+
+    def obter(self, url):
+        return self.sessao.get(url, timeout=self.timeout)
+
+    def importar_cookies(self, driver):
+        """Copia os cookies e o User-Agent do navegador (a SEFAZ associa a validação a eles)"""
+        try:
+            cookies = driver.get_cookies()
+            user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception as e:
+            logger.warning(f"Não foi possível copiar os cookies do navegador: {str(e)}")
+            return
+        with self._lock:
+            self.sessao.cookies.clear()
+            for cookie in cookies:
+                self.sessao.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/'),
+                    secure=cookie.get('secure', False),
+                    expires=cookie.get('expiry')
+                )
+            self.sessao.headers['User-Agent'] = user_agent
+            self.autenticada = bool(cookies)
+        logger.info(f"Sessão da SEFAZ atualizada com {len(cookies)} cookies do navegador")
+
+    def invalidar(self):
+        with self._lock:
+            self.sessao.cookies.clear()
+            self.sessao.headers['User-Agent'] = requests.utils.default_user_agent()
+            self.autenticada = False
+        logger.info("Sessão da SEFAZ expirada; o próximo acesso pedirá um novo CAPTCHA")
+
+
+_sessao_sefaz = SessaoSefaz()
+
+
 class BrowserService:
     def __init__(self):
         self.driver = None
-        self.chrome_driver_path = None
-        self.cache_file = CHROME_DRIVER_CACHE_PATH # Arquivo para armazenar o caminho
-        
-    def _load_cached_driver_path(self):
-        """Carrega o caminho do driver do arquivo de cache, se existir e for válido."""
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file, "r") as f:
-                cached_path = f.read().strip()
-                if os.path.exists(cached_path):
-                    return cached_path
-        return None
-    
-    def _save_cached_driver_path(self, path):
-        """Salva o caminho do driver no arquivo de cache."""
-        with open(self.cache_file, "w") as f:
-            f.write(path)
+        self.pool = _pool_navegadores
+        self._espera = None  # (thread, evento de cancelamento) da espera do CAPTCHA em andamento
 
     def get_chrome_driver_path(self):
         """Obtém o caminho do ChromeDriver, usando cache quando possível."""
-        cached_path = self._load_cached_driver_path()
-        if cached_path:
-            st.write("✅ Usando ChromeDriver cacheado.")
-            return cached_path
-        
         try:
-            st.write("🔍 Procurando ChromeDriver...")
-            # Configuração do diretório de cache
-            os.environ["WDM_LOCAL"] = "2"
-            wdm_dir = os.path.join(os.path.expanduser("~"), ".wdm")
-            os.environ["WDM_LOCAL_PATH"] = wdm_dir
-            os.makedirs(wdm_dir, exist_ok=True)
-
-            # Busca o driver e salva no cache
-            driver_path = ChromeDriverManager().install()
-            self._save_cached_driver_path(driver_path)
-            st.success(f"ChromeDriver encontrado em: {driver_path}")
-            return driver_path
+            return _caminho_chrome_driver()
         except Exception as e:
             st.error(f"Erro ao obter ChromeDriver: {str(e)}")
             raise
-    
+
     def initialize_driver(self):
-        """Inicializa o driver, com tratamento para falhas no cache."""
+        """Obtém um navegador do pool (já aberto quando possível)."""
         try:
-            st.write("🚀 Iniciando configuração do Chrome...")
-            chrome_options = Options()
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--start-maximized')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--disable-software-rasterizer')
-            chrome_options.add_argument('--disable-extensions')
-
-            if not self.chrome_driver_path:
-                self.chrome_driver_path = self.get_chrome_driver_path()
-
-            service = Service(executable_path=self.chrome_driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            st.success("Chrome iniciado com sucesso!")
+            st.write("🚀 Obtendo navegador...")
+            inicio = time.time()
+            self.driver = self.pool.obter()
+            logger.info(f"Navegador pronto em {time.time() - inicio:.1f}s")
             return True
-        except WebDriverException as e:
-            st.warning("Falha ao usar ChromeDriver cacheado. Atualizando...")
-            # Limpa o cache e tenta novamente
-            self.chrome_driver_path = None
-            if os.path.exists(self.cache_file):
-                os.remove(self.cache_file)
-            return self.initialize_driver()  # Recursão controlada
         except Exception as e:
             st.error(f"Erro crítico ao inicializar Chrome: {str(e)}")
             logger.error(f"Error initializing browser: {str(e)}")
             return False
 
+    def release_driver(self):
+        """
+        Devolve o navegador ao pool para a próxima consulta. Com a espera do CAPTCHA ainda
+        em andamento (script interrompido), cancela a espera e aguarda a thread terminar;
+        se ela continuar usando o navegador, ele é descartado em vez de devolvido.
+        """
+        if not self.driver:
+            return
+        driver, self.driver = self.driver, None
+        espera, self._espera = self._espera, None
+        if espera is not None:
+            thread, cancelar = espera
+            cancelar.set()
+            thread.join(timeout=ESPERA_FIM_VERIFICACAO)
+            if thread.is_alive():
+                logger.warning("Espera do CAPTCHA ainda em andamento; navegador descartado")
+                self.pool.descartar(driver)
+                return
+        self.pool.devolver(driver)
+
+    def _aguardar_resultado(self, timeout, cancelar=None):
+        """
+        Espera no driver (sem sleeps fixos) até a página de resultado aparecer: tabela de
+        itens da NFC-e (tabResult) ou abas da NF-e (aba_nft_0). Retorna (html, modelo).
+        Com `cancelar` definido, a próxima verificação levanta EsperaCancelada.
+        """
+        pagina_de_resultado = EC.any_of(
+            EC.presence_of_element_located((By.ID, 'tabResult')),
+            EC.presence_of_element_located((By.ID, 'aba_nft_0'))
+        )
+
+        def _condicao(driver):
+            if cancelar is not None and cancelar.is_set():
+                raise EsperaCancelada("Espera do CAPTCHA cancelada")
+            return pagina_de_resultado(driver)
+
+        elemento = WebDriverWait(
+            self.driver, timeout, poll_frequency=INTERVALO_VERIFICACAO_CAPTCHA,
+            ignored_exceptions=(StaleElementReferenceException,)
+        ).until(_condicao)
+        modelo = 65 if elemento.get_attribute('id') == 'tabResult' else 55  # nfce / nfe
+        return self.driver.page_source, modelo
+
     def wait_for_captcha_solution(self, url, timeout=300):
         """
         Opens URL and waits for user to solve CAPTCHA.
         Returns the page source after CAPTCHA is solved.
+
+        A espera roda em uma thread; a thread do Streamlit só atualiza o progresso
+        e recebe o resultado assim que a página de resultado aparece.
         """
         try:
             with st.status("Processando QR Code", expanded=False) as status:
@@ -107,70 +426,92 @@ class BrowserService:
                 self.driver.get(url)
                 
                 status.update(label="Aguardando resolução do CAPTCHA", state="running")
-                
-                start_time = time.time()
-                while (time.time() - start_time) < timeout:
+
+                resultado = {}
+                concluido = threading.Event()
+                cancelar = threading.Event()
+
+                def _aguardar():
                     try:
-                        # Verificar se o driver ainda está ativo
-                        current_url = self.driver.current_url
-                        
-                        # Verificar se página foi carregada
-                        if len(self.driver.find_elements(By.ID, 'tabResult')) > 0:
-                            modelo = 65 #nfce
-                        elif len(self.driver.find_elements(By.ID, 'aba_nft_0')) > 0:
-                            modelo = 55 #nfe
-                        else:
-                            modelo = None
-
-                        if modelo:
-                            status.update(label="CAPTCHA resolvido!", state="complete")
-                            return self.driver.page_source, modelo
-                        
-                        time.sleep(2)
-                    
+                        resultado['pagina'] = self._aguardar_resultado(timeout, cancelar)
                     except Exception as e:
-                        status.update(label=f"Erro: {str(e)}", state="error")
-                        break
+                        resultado['erro'] = e
+                    finally:
+                        concluido.set()
+
+                start_time = time.time()
+                thread = threading.Thread(target=_aguardar, daemon=True)
+                # release_driver (no finally) cancela a espera se o script for interrompido
+                self._espera = (thread, cancelar)
+                thread.start()
+                while not concluido.wait(1):
+                    restante = int(timeout - (time.time() - start_time))
+                    status.update(label=f"Aguardando resolução do CAPTCHA ({max(restante, 0)}s restantes)")
 
-                status.update(label="Tempo limite excedido", state="error")
-                raise TimeoutException("Processo de CAPTCHA interrompido")
+                if 'pagina' in resultado:
+                    logger.info(f"CAPTCHA resolvido em {time.time() - start_time:.1f}s")
+                    _sessao_sefaz.importar_cookies(self.driver)
+                    status.update(label="CAPTCHA resolvido!", state="complete")
+                    return resultado['pagina']
+
+                if isinstance(resultado.get('erro'), TimeoutException):
+                    status.update(label="Tempo limite excedido", state="error")
+                    raise TimeoutException("Processo de CAPTCHA interrompido")
+                # Navegador fechado pelo usuário ou driver sem resposta
+                status.update(label=f"Erro: {str(resultado.get('erro'))}", state="error")
+                raise resultado['erro']
 
         except Exception as e:
             st.error(f"Erro durante processo de CAPTCHA: {str(e)}")
             logger.error(f"Erro durante espera do CAPTCHA: {str(e)}")
             raise
         finally:
-            if self.driver:
-                try:
-                    self.driver.quit()
-                    self.driver = None
-                except Exception:
-                    pass
+            self.release_driver()
 
     def get_page_with_captcha_handling(self, url):
         """
         Main method to handle page access with CAPTCHA detection.
         Returns page source after successful access.
+
+        Depois de um CAPTCHA resolvido, as consultas seguintes usam a sessão HTTP com os
+        cookies do navegador; o navegador só volta a abrir quando a SEFAZ pede outro CAPTCHA.
         """
         try:
             st.toast("Iniciando acesso à página...")
+            autenticada = _sessao_sefaz.autenticada
+
+            # Abre o navegador em paralelo ao acesso direto, caso o CAPTCHA seja necessário
+            if not autenticada:
+                self.pool.aquecer()
             
-            # Primeira tentativa com requests
+            # Primeira tentativa com requests (sessão com keep-alive e novas tentativas)
+            pediu_captcha = False
             try:
-                st.toast("Tentando acesso direto...")
-                response = requests.get(url, timeout=10)
+                st.toast("Usando a sessão já validada..." if autenticada else "Tentando acesso direto...")
+                inicio = time.time()
+                response = _sessao_sefaz.obter(url)
                 st.toast(f"Status code: {response.status_code}")
                 
                 # Se a resposta for bem-sucedida e não contiver CAPTCHA
-                if response.status_code == 200 and not any(term in response.text.lower() 
-                    for term in ["captcha", "certificate", "certificado", "validação"]):
+                modelo = _modelo_da_resposta(response)
+                if modelo:
+                    logger.info(f"Página obtida sem navegador em {time.time() - inicio:.2f}s")
                     st.success("Acesso direto bem-sucedido!")
-                    return response.text, 65 #nfce
+                    return response.text, modelo
                 else:
+                    # Só uma página de CAPTCHA (200) indica cookies recusados; erros HTTP não
+                    pediu_captcha = response.status_code == 200
                     st.warning("Detectada necessidade de CAPTCHA no acesso direto.")
                     
             except requests.RequestException as e:
                 st.warning(f"Falha no acesso direto: {str(e)}")
+
+            if autenticada:
+                if pediu_captcha:
+                    # A SEFAZ não aceita mais os cookies: um novo CAPTCHA gera outros
+                    _sessao_sefaz.invalidar()
+                # Falhas de rede mantêm os cookies para as próximas notas; esta segue pelo navegador
+                self.pool.aquecer()
             
             st.info("""
                 **📢 Atenção:**  
@@ -190,4 +531,4 @@ class BrowserService:
         except Exception as e:
             st.error(f"Erro no processamento da página: {str(e)}")
             logger.error(f"Erro no processamento da página: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,319 @@
+# services/camada_peps_service.py
+import time
+import threading
+from repositories.camada_peps_repository import CamadaPepsRepository
+from repositories.auditoria_repository import AuditoriaRepository
+from repositories.auditoria_visao_repository import AuditoriaVisaoRepository
+from repositories.saldo_fechamento_repository import SaldoFechamentoRepository
+from services.peps_numpy import calcular_camadas_numpy
+from config.settings import AUDITORIA_MOTOR, AUDITORIA_INCREMENTAL, AUDITORIA_ATRASO_ATUALIZACAO
+from utils.logger import logger
+
+MOTORES_PEPS = ('sql', 'numpy')
+
+
+class AtualizadorVisao:
+    """
+    Agrupa as alterações de notas, associações e contagens em um único REFRESH
+    CONCURRENTLY em segundo plano, disparado após `atraso` segundos sem novas alterações.
+    Uma leitura com atualização pendente executa o REFRESH antes de consultar.
+    """
+    def __init__(self, repository, atraso: float = AUDITORIA_ATRASO_ATUALIZACAO):
+        self.repository = repository
+        self.atraso = atraso
+        self._pendente = False
+        self._timer = None
+        self._lock = threading.Lock()
+        self._lock_execucao = threading.Lock()
+
+    def solicitar(self):
+        with self._lock:
+            self._pendente = True
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.atraso, self.garantir_atualizada)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def garantir_atualizada(self):
+        with self._lock_execucao:
+            with self._lock:
+                if not self._pendente:
+                    return
+                self._pendente = False
+            inicio = time.time()
+            try:
+                self.repository.atualizar(concorrente=True)
+                logger.info(f"Visão materializada da auditoria atualizada em {time.time() - inicio:.2f}s")
+            except Exception as e:
+                with self._lock:
+                    self._pendente = True
+                # A leitura segue com os dados do último REFRESH; a próxima tenta de novo
+                logger.error(f"Erro ao atualizar a visão materializada da auditoria: {str(e)}")
+
+
+_atualizador_visao = AtualizadorVisao(AuditoriaVisaoRepository())
+
+class CamadaPepsService:
+    """
+    Mantém as camadas PEPS gravadas por inventário encerrado.
+
+    As telas de auditoria leem as camadas gravadas; notas, associações e contagens
+    recalculam apenas os produtos/inventários afetados. Um inventário sem marca de
+    atualizado (nunca calculado, reencerrado ou com falha em uma atualização) é
+    recalculado por inteiro na próxima leitura.
+
+    Cada cálculo grava também o saldo de fechamento (lotes com saldo) do inventário.
+    O inventário seguinte parte das camadas gravadas deste e lê só as notas posteriores.
+
+    No PostgreSQL (estratégia 'visao') as camadas vêm de uma visão materializada e
+    as alterações apenas agendam um REFRESH CONCURRENTLY.
+    """
+    def __init__(self, motor: str = None, incremental: bool = None):
+        self.repository = CamadaPepsRepository()
+        self.auditoria_repository = AuditoriaRepository()
+        self.saldo_repository = SaldoFechamentoRepository()
+        self.visao_repository = AuditoriaVisaoRepository()
+        self.estrategia = AuditoriaRepository.estrategia_camadas()
+        self.motor = motor or AUDITORIA_MOTOR
+        self.incremental = AUDITORIA_INCREMENTAL if incremental is None else incremental
+        if self.motor not in MOTORES_PEPS:
+            raise ValueError(f"Motor PEPS inválido: {self.motor}. Use um de {', '.join(MOTORES_PEPS)}.")
+
+    def calcular_camadas(self, inventario_id: int, data_corte, produto_ids: list = None, motor: str = None):
+        """Calcula as camadas sem gravar, pela CTE no banco ou pelo motor NumPy"""
+        if (motor or self.motor) == 'numpy':
+            if produto_ids is not None and not produto_ids:
+                return []
+            entradas = self.auditoria_repository.listar_entradas(inventario_id, produto_ids)
+            contagens = self.auditoria_repository.listar_contagens(inventario_id, produto_ids)
+            return calcular_camadas_numpy(entradas, contagens, data_corte)
+        return self.auditoria_repository.calcular_camadas(inventario_id, produto_ids)
+
+    def calcular_camadas_incrementais(self, inventario_id: int, data_corte, produto_ids: list = None):
+        """
+        Calcula a partir das camadas gravadas do inventário anterior (todos os lotes até
+        a data de corte dele, com a quantidade original) mais as notas emitidas depois,
+        de modo que o resultado é o mesmo do cálculo completo. Só as notas novas passam
+        pela consulta de entradas. Retorna None quando o anterior não está atualizado.
+        """
+        anterior = self.auditoria_repository.obter_inventario_anterior(inventario_id)
+        if anterior is None:
+            return None
+
+        estado = self.repository.buscar_estado(anterior.id)
+        if estado is None or estado.data_corte != anterior.data_fim_contagem:
+            return None
+
+        if produto_ids is not None and not produto_ids:
+            return []
+
+        lotes_anteriores = self.repository.listar_como_entradas(anterior.id, produto_ids)
+        entradas = self.auditoria_repository.listar_entradas(inventario_id, produto_ids, apos=anterior.data_fim_contagem)
+        contagens = self.auditoria_repository.listar_contagens(inventario_id, produto_ids)
+
+        # Lotes anteriores são emitidos até o corte do anterior e as notas novas depois dele;
+        # a ordem PEPS é por produto, data e lote
+        lotes = sorted(
+            [*lotes_anteriores, *entradas],
+            key=lambda lote: (lote.produto_id, lote.data_emissao, lote.item_nota_entrada_id),
+        )
+        return calcular_camadas_numpy(lotes, contagens, data_corte)
+
+    def _agendar_visao(self):
+        """Na estratégia 'visao' agenda o REFRESH e retorna True (nada mais a fazer)"""
+        if self.estrategia != 'visao':
+            return False
+        _atualizador_visao.solicitar()
+        return True
+
+    def fechar_inventario(self, inventario_id: int):
+        """Calcula as camadas e grava o saldo de fechamento ao encerrar a contagem"""
+        if self._agendar_visao():
+            return
+        inventario_ids = None
+        try:
+            inventario = self.auditoria_repository.obter_inventario_por_id(inventario_id)
+            inventario_ids = [inventario_id]
+            if inventario and inventario.data_fim_contagem is not None:
+                # Os inventários seguintes partem do saldo de fechamento deste
+                posteriores = self.auditoria_repository.listar_inventarios_encerrados(inventario.data_fim_contagem)
+                inventario_ids += [posterior.id for posterior in posteriores if posterior.id != inventario_id]
+            self.repository.invalidar(inventario_ids)
+            if inventario and inventario.data_fim_contagem is not None:
+                self.recalcular_inventario(inventario.id, inventario.data_fim_contagem)
+        except Exception as e:
+            # Sem marca de atualizado o inventário é recalculado na próxima auditoria
+            logger.error(f"Erro ao gravar o saldo de fechamento do inventário {inventario_id}: {str(e)}")
+            self._invalidar_com_seguranca(inventario_ids)
+
+    def obter_camadas(self, inventario, produto_id: int = None, somente_com_saldo: bool = False):
+        """Camadas do inventário (linha de AuditoriaRepository.obter_inventario)"""
+        if inventario.data_fim_contagem is None:
+            return []
+
+        if self.estrategia == 'visao':
+            _atualizador_visao.garantir_atualizada()
+            return self.visao_repository.listar_camadas(inventario.id, produto_id, somente_com_saldo)
+
+        estado = self.repository.buscar_estado(inventario.id)
+        if estado is None or estado.data_corte != inventario.data_fim_contagem:
+            self.recalcular_inventario(inventario.id, inventario.data_fim_contagem)
+
+        return self.repository.listar_camadas(inventario.id, produto_id, somente_com_saldo)
+
+    def iterar_camadas(self, inventario, produto_id: int = None, somente_com_saldo: bool = False, **kwargs):
+        """Como obter_camadas, mas gerando lotes de linhas lidos em streaming"""
+        if inventario.data_fim_contagem is None:
+            return
+
+        if self.estrategia == 'visao':
+            _atualizador_visao.garantir_atualizada()
+            yield from self.visao_repository.iterar_camadas(inventario.id, produto_id, somente_com_saldo, **kwargs)
+            return
+
+        estado = self.repository.buscar_estado(inventario.id)
+        if estado is None or estado.data_corte != inventario.data_fim_contagem:
+            self.recalcular_inventario(inventario.id, inventario.data_fim_contagem)
+
+        yield from self.repository.iterar_camadas(inventario.id, produto_id, somente_com_saldo, **kwargs)
+
+    def recalcular_inventario(self, inventario_id: int, data_corte, produto_ids: list = None):
+        inicio = time.time()
+        camadas = None
+        if self.incremental:
+            camadas = self.calcular_camadas_incrementais(inventario_id, data_corte, produto_ids)
+        modo = "incremental" if camadas is not None else f"motor {self.motor}"
+        if camadas is None:
+            camadas = self.calcular_camadas(inventario_id, data_corte, produto_ids)
+
+        # Saldo antes das camadas: a marca de atualizado só é gravada com os dois em dia
+        self.saldo_repository.substituir(inventario_id, camadas, produto_ids)
+        total = self.repository.substituir_camadas(inventario_id, camadas, data_corte, produto_ids)
+        escopo = f"{len(produto_ids)} produtos" if produto_ids is not None else "todos os produtos"
+        logger.info(
+            f"Camadas PEPS do inventário {inventario_id} recalculadas ({escopo}, {modo}): "
+            f"{total} camadas em {time.time() - inicio:.2f}s"
+        )
+        return total
+
+    def conferir_motores(self, inventario, tolerancia: float = 1e-6):
+        """Calcula o inventário pelos dois motores e compara camada a camada"""
+        resultado = {}
+        camadas = {}
+        for motor in MOTORES_PEPS:
+            inicio = time.time()
+            camadas[motor] = self.calcular_camadas(inventario.id, inventario.data_fim_contagem, motor=motor)
+            resultado[f'tempo_{motor}'] = time.time() - inicio
+
+        chave = lambda camada: camada['item_nota_entrada_id']
+        por_lote_sql = {chave(camada): camada for camada in camadas['sql']}
+        colunas = [
+            'quantidade_unidades', 'valor_total_lote', 'quantidade_acumulada', 'quantidade_saida',
+            'quantidade_consumida', 'saldo_remanescente', 'valor_consumido', 'valor_saldo_remanescente',
+        ]
+
+        divergencias = abs(len(camadas['sql']) - len(camadas['numpy']))
+        diferenca_maxima = 0.0
+        for camada in camadas['numpy']:
+            referencia = por_lote_sql.get(chave(camada))
+            if referencia is None:
+                continue
+            diferenca = max(abs((camada[coluna] or 0) - (referencia[coluna] or 0)) for coluna in colunas)
+            diferenca_maxima = max(diferenca_maxima, diferenca)
+            if diferenca > tolerancia:
+                divergencias += 1
+
+        resultado.update({
+            'camadas': len(camadas['sql']),
+            'divergencias': divergencias,
+            'diferenca_maxima': diferenca_maxima,
+        })
+        logger.info(f"Conferência dos motores PEPS no inventário {inventario.id}: {resultado}")
+        return resultado
+
+    def reconstruir(self):
+        """Descarta e recalcula as camadas de todos os inventários encerrados (reparo)"""
+        inventarios = self.auditoria_repository.listar_inventarios_encerrados()
+        if self.estrategia == 'visao':
+            self.visao_repository.atualizar(concorrente=True)
+            return len(inventarios)
+
+        self.repository.invalidar()
+        for inventario in inventarios:
+            self.recalcular_inventario(inventario.id, inventario.data_fim_contagem)
+        return len(inventarios)
+
+    def atualizar_produtos(self, produto_ids, a_partir_de=None):
+        """
+        Recalcula os produtos nos inventários já calculados com data de corte >= a_partir_de
+        (todos quando None). Falhas não interrompem quem chamou: os inventários afetados
+        perdem a marca de atualizado e são recalculados na próxima leitura.
+        """
+        produto_ids = sorted(set(produto_ids or []))
+        if not produto_ids or self._agendar_visao():
+            return
+
+        inventario_ids = []
+        try:
+            inventarios = self.auditoria_repository.listar_inventarios_encerrados(a_partir_de)
+            inventario_ids = [inventario.id for inventario in inventarios]
+            calculados = set(self.repository.listar_inventarios_atualizados(inventario_ids))
+            for inventario in inventarios:
+                if inventario.id in calculados:
+                    self.recalcular_inventario(inventario.id, inventario.data_fim_contagem, produto_ids)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar camadas PEPS dos produtos {produto_ids}: {str(e)}")
+            self._invalidar_com_seguranca(inventario_ids or None)
+
+    def atualizar_itens_fornecedor(self, fornecedor_id: int, codigos, a_partir_de=None):
+        """Atualiza os produtos associados aos códigos de item de um fornecedor"""
+        if self._agendar_visao():
+            return
+        try:
+            produto_ids = self.auditoria_repository.listar_produtos_por_itens(fornecedor_id, [c for c in set(codigos) if c])
+        except Exception as e:
+            logger.error(f"Erro ao localizar produtos dos itens do fornecedor {fornecedor_id}: {str(e)}")
+            self._invalidar_com_seguranca(None)
+            return
+        self.atualizar_produtos(produto_ids, a_partir_de)
+
+    def atualizar_produtos_inventario(self, inventario_id: int, produto_ids):
+        """Recalcula produtos de um único inventário (contagem alterada), se ele já foi calculado"""
+        if self._agendar_visao():
+            return
+        try:
+            estado = self.repository.buscar_estado(inventario_id)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar camadas PEPS do inventário {inventario_id}: {str(e)}")
+            self._invalidar_com_seguranca([inventario_id])
+            return
+        if estado is not None:
+            # A contagem muda o saldo de fechamento: os inventários seguintes também são recalculados
+            self.atualizar_produtos(produto_ids, a_partir_de=estado.data_corte)
+
+    def invalidar_inventario(self, inventario_id: int):
+        if self._agendar_visao():
+            return
+        self._invalidar_com_seguranca([inventario_id])
+
+    def invalidar_a_partir_de(self, data_corte):
+        """
+        Data de corte alterada ou inventário excluído: os inventários encerrados com
+        data de corte >= data_corte perdem a marca de atualizado, pois cada um parte
+        do saldo de fechamento do anterior.
+        """
+        if self._agendar_visao():
+            return
+        try:
+            inventario_ids = [inventario.id for inventario in self.auditoria_repository.listar_inventarios_encerrados(data_corte)]
+        except Exception as e:
+            logger.error(f"Erro ao localizar inventários posteriores a {data_corte}: {str(e)}")
+            inventario_ids = None
+        self._invalidar_com_seguranca(inventario_ids)
+
+    def _invalidar_com_seguranca(self, inventario_ids):
+        try:
+            self.repository.invalidar(inventario_ids)
+        except Exception as e:
+            logger.error(f"Erro ao invalidar camadas PEPS: {str(e)}")
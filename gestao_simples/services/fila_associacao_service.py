@@ -0,0 +1,56 @@
+# services/fila_associacao_service.py
+from repositories.fila_associacao_repository import FilaAssociacaoRepository
+from utils.logger import logger
+
+class FilaAssociacaoService:
+    """
+    Mantém a fila de itens de fornecedor aguardando associação.
+
+    Notas gravadas enfileiram seus itens sem associação; notas editadas ou excluídas e
+    associações alteradas ou excluídas recalculam a fila dos fornecedores envolvidos;
+    uma associação criada tira o item da fila. A tela de associação só lê a fila.
+    """
+    def __init__(self):
+        self.repository = FilaAssociacaoRepository()
+
+    def listar_itens(self):
+        return [
+            {
+                "id": row.id,
+                "fornecedor_id": row.fornecedor_id,
+                "fornecedor_nome": row.fornecedor_nome,
+                "codigo_produto_fornecedor": row.codigo_produto_fornecedor,
+                "descricao": row.descricao,
+                "unidade": row.unidade_medida
+            }
+            for row in self.repository.listar_itens()
+        ]
+
+    def adicionar_itens_nota(self, fornecedor_id: int, itens_data, session=None):
+        """Enfileira os itens de uma nota nova (na transação da nota quando session é informada)"""
+        itens = [
+            (item_data.get('codigo_produto_fornecedor'), item_data.get('descricao'), item_data.get('unidade_medida'))
+            for item_data in itens_data
+        ]
+        return self.repository.adicionar_itens(fornecedor_id, itens, session=session)
+
+    def sincronizar_fornecedores(self, fornecedor_ids, session=None):
+        return self.repository.sincronizar_fornecedores(list(fornecedor_ids), session=session)
+
+    def item_associado(self, fornecedor_id: int, codigo: str, descricao: str):
+        try:
+            self.repository.remover_item(fornecedor_id, codigo, descricao)
+        except Exception as e:
+            # O item continua na fila; a próxima sincronização do fornecedor o remove
+            logger.error(f"Erro ao remover da fila de associação o item {codigo} do fornecedor {fornecedor_id}: {str(e)}")
+
+    def atualizar_fornecedores(self, fornecedor_ids):
+        """Recalcula a fila dos fornecedores sem interromper quem chamou em caso de falha"""
+        try:
+            self.sincronizar_fornecedores(fornecedor_ids)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar a fila de associação dos fornecedores {fornecedor_ids}: {str(e)}")
+
+    def reconstruir(self):
+        """Recalcula a fila de todos os fornecedores (reparo)"""
+        self.repository.sincronizar_fornecedores()
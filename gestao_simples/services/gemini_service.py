@@ -1,15 +1,16 @@
 # services/gemini_service.py
 import google.generativeai as genai
 from PIL import Image
+import io
 import json
 import os
 from datetime import datetime
 from models.nota_entrada import NotaEntrada
 from models.fornecedor import Fornecedor
+from services.indice_itens_fornecedor import obter_indice_fornecedor, normalizar_texto, pontuar, ItemNormalizado
 from utils.logger import logger
+from utils.armazem_documentos import armazem_documentos, hash_conteudo
 import streamlit as st
-from difflib import SequenceMatcher
-import re
 
 class GeminiService:
     def __init__(self):
@@ -67,6 +68,13 @@ class GeminiService:
             dict: Dados estruturados do cupom no formato esperado
         """
         try:
+            # Cupom já lido (mesma imagem): usa a resposta guardada em vez de chamar a API
+            hash_imagem = self._hash_imagem(image)
+            data = armazem_documentos.obter_json('cupom', hash_imagem)
+            if data is not None:
+                logger.info(f"Cupom {hash_imagem[:12]} lido do armazém local")
+                return self._process_gemini_response(data)
+
             prompt = """
             Analise esta imagem de cupom não fiscal e extraia os seguintes dados em formato JSON:
 
@@ -132,6 +140,9 @@ class GeminiService:
             # Valida e processa os dados
             processed_data = self._process_gemini_response(data)
             
+            # Só respostas processadas com sucesso são reaproveitadas
+            self._guardar_cupom(hash_imagem, image, data)
+
             logger.info("Dados do cupom extraídos com sucesso")
             return processed_data
 
@@ -144,6 +155,21 @@ class GeminiService:
             logger.error(f"Erro ao processar cupom com Gemini API: {str(e)}")
             raise Exception(f"Erro ao processar cupom: {str(e)}")
 
+    @staticmethod
+    def _hash_imagem(image):
+        """Endereço do cupom: SHA-256 dos pixels (independe do arquivo/compressão de origem)"""
+        return hash_conteudo(f"{image.mode}{image.size}".encode('utf-8') + image.tobytes())
+
+    def _guardar_cupom(self, hash_imagem, image, data):
+        """Guarda a imagem e a resposta da API; falhas não interrompem a leitura do cupom"""
+        try:
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            armazem_documentos.guardar('cupom_imagem', hash_imagem, buffer.getvalue())
+            armazem_documentos.guardar_json('cupom', hash_imagem, data)
+        except Exception as e:
+            logger.error(f"Erro ao guardar o cupom {hash_imagem[:12]}: {str(e)}")
+
     def _generate_matching_suggestions(self, cupom_data, fornecedor_id, nota_entrada_service):
         """
         Gera sugestões de matching para aprovação do usuário
@@ -157,10 +183,10 @@ class GeminiService:
             dict: Dados do cupom com sugestões de matching
         """
         try:
-            # Busca itens históricos do fornecedor
-            itens_historicos = nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor_id)
+            # Índice dos itens históricos do fornecedor (em cache até o fornecedor receber notas)
+            indice = obter_indice_fornecedor(fornecedor_id, nota_entrada_service)
             
-            if not itens_historicos:
+            if not indice:
                 # Se não há itens históricos, retorna dados originais
                 cupom_data['matching_suggestions'] = []
                 return cupom_data
@@ -168,16 +194,9 @@ class GeminiService:
             sugestoes_matching = []
             
             for i, item_gemini in enumerate(cupom_data['itens']):
-                melhor_match = None
-                melhor_score = 0
-                
-                # Compara com cada item histórico
-                for item_historico in itens_historicos:
-                    score = self._calculate_similarity_score(item_gemini, item_historico)
-                    
-                    if score > melhor_score and score >= 0.6:  # Threshold de 60% para sugestões
-                        melhor_match = item_historico
-                        melhor_score = score
+                # Compara só com os candidatos do índice (threshold de 60% para sugestões)
+                posicao, melhor_score = indice.melhor_correspondencia(item_gemini, minimo=0.6)
+                melhor_match = indice.itens[posicao] if posicao is not None else None
                 
                 if melhor_match:
                     sugestao = {
@@ -302,10 +321,10 @@ class GeminiService:
             dict: Dados do cupom com itens mesclados
         """
         try:
-            # Busca itens históricos do fornecedor
-            itens_historicos = nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor_id)
+            # Índice dos itens históricos do fornecedor (em cache até o fornecedor receber notas)
+            indice = obter_indice_fornecedor(fornecedor_id, nota_entrada_service)
             
-            if not itens_historicos:
+            if not indice:
                 # Se não há itens históricos, retorna dados originais
                 return cupom_data
             
@@ -313,21 +332,9 @@ class GeminiService:
             itens_matchados = set()  # Para rastrear quais itens históricos já foram usados
             
             for item_gemini in cupom_data['itens']:
-                melhor_match = None
-                melhor_score = 0
-                melhor_index = -1
-                
-                # Compara com cada item histórico
-                for i, item_historico in enumerate(itens_historicos):
-                    if i in itens_matchados:
-                        continue  # Pula itens já matchados
-                    
-                    score = self._calculate_similarity_score(item_gemini, item_historico)
-                    
-                    if score > melhor_score and score >= 0.7:  # Threshold de 70% de similaridade
-                        melhor_match = item_historico
-                        melhor_score = score
-                        melhor_index = i
+                # Candidatos do índice, pulando itens já matchados (threshold de 70% de similaridade)
+                melhor_index, melhor_score = indice.melhor_correspondencia(item_gemini, minimo=0.7, ignorar=itens_matchados)
+                melhor_match = indice.itens[melhor_index] if melhor_index is not None else None
                 
                 if melhor_match:
                     # Usa dados do item histórico com valores atualizados do Gemini
@@ -374,55 +381,18 @@ class GeminiService:
         Returns:
             float: Score de 0 a 1 indicando similaridade
         """
-        score_total = 0
-        peso_total = 0
-        
-        # 1. Comparação de código (peso 40%)
-        codigo_gemini = self._normalize_string(item_gemini.get('codigo_produto_fornecedor', ''))
-        codigo_historico = self._normalize_string(item_historico.get('codigo', ''))
-        
-        if codigo_gemini and codigo_historico:
-            if codigo_gemini == codigo_historico:
-                score_codigo = 1.0
-            else:
-                score_codigo = SequenceMatcher(None, codigo_gemini, codigo_historico).ratio()
-            score_total += score_codigo * 0.4
-            peso_total += 0.4
-        
-        # 2. Comparação de descrição (peso 50%)
-        desc_gemini = self._normalize_string(item_gemini.get('descricao', ''))
-        desc_historico = self._normalize_string(item_historico.get('descricao', ''))
-        
-        if desc_gemini and desc_historico:
-            # Usa SequenceMatcher para comparação de strings
-            score_descricao = SequenceMatcher(None, desc_gemini, desc_historico).ratio()
-            
-            # Bonus para palavras-chave em comum
-            palavras_gemini = set(desc_gemini.split())
-            palavras_historico = set(desc_historico.split())
-            palavras_comuns = palavras_gemini.intersection(palavras_historico)
-            
-            if palavras_comuns:
-                bonus = len(palavras_comuns) / max(len(palavras_gemini), len(palavras_historico))
-                score_descricao = min(1.0, score_descricao + bonus * 0.2)
-            
-            score_total += score_descricao * 0.5
-            peso_total += 0.5
-        
-        # 3. Comparação de unidade de medida (peso 10%)
-        unidade_gemini = self._normalize_string(item_gemini.get('unidade_medida', ''))
-        unidade_historico = self._normalize_string(item_historico.get('unidade', ''))
-        
-        if unidade_gemini and unidade_historico:
-            score_unidade = 1.0 if unidade_gemini == unidade_historico else 0.0
-            score_total += score_unidade * 0.1
-            peso_total += 0.1
-        
-        # Calcula score final
-        if peso_total > 0:
-            return score_total / peso_total
-        else:
-            return 0.0
+        return pontuar(
+            ItemNormalizado(
+                item_gemini.get('codigo_produto_fornecedor', ''),
+                item_gemini.get('descricao', ''),
+                item_gemini.get('unidade_medida', '')
+            ),
+            ItemNormalizado(
+                item_historico.get('codigo', ''),
+                item_historico.get('descricao', ''),
+                item_historico.get('unidade', '')
+            )
+        )
 
     def _normalize_string(self, text):
         """
@@ -434,16 +404,7 @@ class GeminiService:
         Returns:
             str: String normalizada
         """
-        if not text or not isinstance(text, str):
-            return ""
-        
-        # Remove espaços extras e converte para minúsculo
-        normalized = re.sub(r'\s+', ' ', text.strip().lower())
-        
-        # Remove caracteres especiais comuns
-        normalized = re.sub(r'[^\w\s]', '', normalized)
-        
-        return normalized
+        return normalizar_texto(text)
 
     def _process_gemini_response(self, data):
         """
@@ -0,0 +1,141 @@
+# services/indice_itens_fornecedor.py
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from utils.cache import CacheLRU
+
+_ESPACOS = re.compile(r'\s+')
+_ESPECIAIS = re.compile(r'[^\w\s]')
+
+# Candidatos pontuados por item do cupom (os demais itens do histórico não são comparados)
+TOTAL_CANDIDATOS = 20
+
+# Índices por fornecedor, compartilhados entre as sessões; removidos quando o fornecedor recebe notas
+_cache_indices = CacheLRU(tamanho_maximo=32)
+
+
+def normalizar_texto(texto):
+    """Minúsculas, espaços simples e sem caracteres especiais (base de toda comparação)"""
+    if not texto or not isinstance(texto, str):
+        return ""
+    return _ESPECIAIS.sub('', _ESPACOS.sub(' ', texto.strip().lower()))
+
+
+def _trigramas(texto):
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class ItemNormalizado:
+    """Código, descrição e unidade já normalizados, com as palavras da descrição"""
+    __slots__ = ('codigo', 'descricao', 'unidade', 'palavras')
+
+    def __init__(self, codigo, descricao, unidade):
+        self.codigo = normalizar_texto(codigo)
+        self.descricao = normalizar_texto(descricao)
+        self.unidade = normalizar_texto(unidade)
+        self.palavras = set(self.descricao.split())
+
+
+def pontuar(item, candidato):
+    """
+    Similaridade de 0 a 1 entre dois itens normalizados: código (peso 40%),
+    descrição com bônus por palavras em comum (50%) e unidade (10%).
+    """
+    score_total = 0
+    peso_total = 0
+
+    if item.codigo and candidato.codigo:
+        if item.codigo == candidato.codigo:
+            score_codigo = 1.0
+        else:
+            score_codigo = SequenceMatcher(None, item.codigo, candidato.codigo).ratio()
+        score_total += score_codigo * 0.4
+        peso_total += 0.4
+
+    if item.descricao and candidato.descricao:
+        score_descricao = SequenceMatcher(None, item.descricao, candidato.descricao).ratio()
+        palavras_comuns = item.palavras & candidato.palavras
+        if palavras_comuns:
+            bonus = len(palavras_comuns) / max(len(item.palavras), len(candidato.palavras))
+            score_descricao = min(1.0, score_descricao + bonus * 0.2)
+        score_total += score_descricao * 0.5
+        peso_total += 0.5
+
+    if item.unidade and candidato.unidade:
+        score_total += (1.0 if item.unidade == candidato.unidade else 0.0) * 0.1
+        peso_total += 0.1
+
+    return score_total / peso_total if peso_total > 0 else 0.0
+
+
+class IndiceItensFornecedor:
+    """
+    Itens históricos de um fornecedor preparados para busca: strings normalizadas uma
+    única vez, mapa de código exato e índice invertido de palavras e trigramas.
+    Cada consulta pontua apenas os candidatos recuperados pelo índice.
+    """
+    def __init__(self, itens_historicos):
+        self.itens = itens_historicos
+        self.normalizados = [
+            ItemNormalizado(item.get('codigo', ''), item.get('descricao', ''), item.get('unidade', ''))
+            for item in itens_historicos
+        ]
+        self.por_codigo = {}
+        self.por_termo = {}
+        for posicao, item in enumerate(self.normalizados):
+            if item.codigo:
+                self.por_codigo.setdefault(item.codigo, []).append(posicao)
+            termos = item.palavras | _trigramas(item.descricao) | _trigramas(item.codigo)
+            for termo in termos:
+                self.por_termo.setdefault(termo, []).append(posicao)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def candidatos(self, item, ignorar=(), total=TOTAL_CANDIDATOS):
+        """Posições com o mesmo código e as que mais compartilham palavras/trigramas"""
+        exatos = [posicao for posicao in self.por_codigo.get(item.codigo, []) if posicao not in ignorar]
+
+        termos = item.palavras | _trigramas(item.descricao) | _trigramas(item.codigo)
+        ocorrencias = Counter()
+        for termo in termos:
+            ocorrencias.update(self.por_termo.get(termo, ()))
+        for posicao in ignorar:
+            ocorrencias.pop(posicao, None)
+
+        selecionados = dict.fromkeys(exatos)
+        for posicao, _ in ocorrencias.most_common(total):
+            selecionados.setdefault(posicao)
+        return list(selecionados)
+
+    def melhor_correspondencia(self, item_dados, minimo, ignorar=()):
+        """
+        (posição, score) do item histórico mais parecido com score >= minimo,
+        ou (None, 0) quando nenhum candidato atinge o mínimo.
+        """
+        item = ItemNormalizado(
+            item_dados.get('codigo_produto_fornecedor', ''),
+            item_dados.get('descricao', ''),
+            item_dados.get('unidade_medida', '')
+        )
+        melhor_posicao, melhor_score = None, 0
+        for posicao in self.candidatos(item, ignorar):
+            score = pontuar(item, self.normalizados[posicao])
+            if score > melhor_score and score >= minimo:
+                melhor_posicao, melhor_score = posicao, score
+        return melhor_posicao, melhor_score
+
+
+def obter_indice_fornecedor(fornecedor_id: int, nota_entrada_service):
+    """Índice do fornecedor em cache, montado a partir dos itens únicos das notas na primeira busca"""
+    indice = _cache_indices.obter(fornecedor_id)
+    if indice is None:
+        indice = IndiceItensFornecedor(nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor_id))
+        _cache_indices.guardar(fornecedor_id, indice)
+    return indice
+
+
+def invalidar_indice_fornecedor(fornecedor_id: int):
+    """Chamado quando notas do fornecedor são gravadas, alteradas ou excluídas"""
+    _cache_indices.remover(fornecedor_id)
@@ -1,11 +1,13 @@
 # services/inventario_estoque_service.py
 from repositories.inventario_estoque_repository import InventarioEstoqueRepository
+from services.camada_peps_service import CamadaPepsService
 from utils.validacoes import ValidationError, validar_quantidade_positiva, validar_formato_referencia
 from datetime import datetime
 
 class InventarioEstoqueService:
     def __init__(self):
         self.repository = InventarioEstoqueRepository()
+        self.camada_peps_service = CamadaPepsService()
 
     def criar_inventario(self, dados):
         validar_formato_referencia(dados.referencia)       
@@ -23,15 +25,24 @@ class InventarioEstoqueService:
         existing = self.repository.buscar_por_referencia(dados.referencia)
         if existing and existing.id != inventario_id:
             raise ValidationError(f"Já existe um inventário com a referência '{dados.referencia}'.")
-        
-        return self.repository.atualizar(inventario_id, dados)    
+
+        anterior = self.repository.buscar_por_id(inventario_id)
+        inventario = self.repository.atualizar(inventario_id, dados)
+        # Data de corte alterada: este inventário e os seguintes são recalculados
+        if anterior and anterior.data_fim_contagem != inventario.data_fim_contagem:
+            datas = [data for data in (anterior.data_fim_contagem, inventario.data_fim_contagem) if data is not None]
+            self.camada_peps_service.invalidar_a_partir_de(min(datas))
+        return inventario
 
     def encerrar_contagem(self, inventario_id: int, data_fim: datetime = None):
         try:
-            return self.repository.encerrar_contagem(
+            inventario = self.repository.encerrar_contagem(
                 inventario_id,
                 data_fim
             )
+            # Nova data de corte: calcula as camadas e grava o saldo de fechamento
+            self.camada_peps_service.fechar_inventario(inventario_id)
+            return inventario
         except Exception as e:
             if "Contagem já encerrada" in str(e):
                 raise ValidationError(str(e)) from e
@@ -39,7 +50,9 @@ class InventarioEstoqueService:
 
     def adicionar_item(self, inventario_id: int, produto_id: int, quantidade: float):
         validar_quantidade_positiva(quantidade)
-        return self.repository.adicionar_item(inventario_id, produto_id, quantidade)
+        item = self.repository.adicionar_item(inventario_id, produto_id, quantidade)
+        self.camada_peps_service.atualizar_produtos_inventario(inventario_id, [produto_id])
+        return item
     
     def listar_inventarios(self):
         return self.repository.listar()
@@ -51,7 +64,13 @@ class InventarioEstoqueService:
         return self.repository.listar_itens_por_inventario(inventario_id)
     
     def deletar_inventario(self, inventario_id: int):
-        self.repository.deletar(inventario_id)        
+        inventario = self.repository.buscar_por_id(inventario_id)
+        self.repository.deletar(inventario_id)
+        if inventario and inventario.data_fim_contagem is not None:
+            # Os inventários seguintes partiam do saldo de fechamento do excluído
+            self.camada_peps_service.invalidar_a_partir_de(inventario.data_fim_contagem)
         
     def remover_item(self, item_id: int):
-        self.repository.remover_item(item_id)
\ No newline at end of file
+        item = self.repository.remover_item(item_id)
+        if item:
+            self.camada_peps_service.atualizar_produtos_inventario(item.inventario_id, [item.produto_id])
\ No newline at end of file
@@ -1,19 +1,52 @@
 # services/item_nota_entrada_service.py
 from repositories.item_nota_entrada_repository import ItemNotaEntradaRepository
+from repositories.item_fornecedor_repository import ItemFornecedorRepository
 from models.item_nota_entrada import ItemNotaEntrada
+from config.database import obter_sessao
 
 class ItemNotaEntradaService:
     def __init__(self):
         self.repository = ItemNotaEntradaRepository()
+        self.item_fornecedor_repository = ItemFornecedorRepository()
 
-    def listar_itens_por_nota_entrada(self, nota_entrada_id: int) -> list[ItemNotaEntrada]:
-        return self.repository.listar_por_nota_entrada(nota_entrada_id)
+    def listar_itens_por_nota_entrada(self, nota_entrada_id: int, session=None) -> list[ItemNotaEntrada]:
+        return self.repository.listar_por_nota_entrada(nota_entrada_id, session=session)
 
     def criar_item(self, item: ItemNotaEntrada, session=None) -> ItemNotaEntrada:
         if session:
             return self.repository.criar(item, session=session)
         return self.repository.criar(item)
 
+    def criar_itens_em_lote(self, itens_data: list[dict], nota_entrada_id: int, session) -> int:
+        return self.repository.criar_em_lote(itens_data, nota_entrada_id, session=session)
+
+    def atualizar_itens_em_lote(self, itens_data: list[dict], session) -> int:
+        return self.repository.atualizar_em_lote(itens_data, session=session)
+
+    def deletar_itens_em_lote(self, ids: list[int], session) -> int:
+        return self.repository.deletar_em_lote(ids, session=session)
+
+    def resolver_produtos_nota(self, nota_entrada_id: int, session) -> int:
+        """
+        Catálogo, produto e grade de todos os itens da nota (na transação da nota): registra
+        os itens novos do fornecedor, liga cada item ao seu id e resolve as associações.
+        """
+        self.item_fornecedor_repository.registrar_itens_nota(nota_entrada_id, session=session)
+        self.repository.vincular_itens_fornecedor(nota_entrada_id, session=session)
+        self.item_fornecedor_repository.resolver_associacoes(nota_entrada_id=nota_entrada_id, session=session)
+        return self.repository.resolver_produtos(nota_entrada_id=nota_entrada_id, session=session)
+
+    def resolver_produtos_itens(self, fornecedor_id: int, codigos: list) -> int:
+        """Produto e grade dos itens do fornecedor com os códigos (associação alterada)"""
+        codigos = [codigo for codigo in set(codigos) if codigo]
+        if not codigos:
+            return 0
+        with obter_sessao() as session:
+            self.item_fornecedor_repository.resolver_associacoes(fornecedor_id, codigos, session=session)
+            total = self.repository.resolver_produtos(fornecedor_id, codigos, session=session)
+            session.commit()
+            return total
+
     def atualizar_item(self, item: ItemNotaEntrada, session=None) -> ItemNotaEntrada:
         if session:
             return self.repository.atualizar(item, session=session)
@@ -3,17 +3,73 @@ from repositories.nota_entrada_repository import NotaEntradaRepository
 from utils.validacoes import validar_nota_entrada,validar_item_nota_entrada, ValidationError
 from utils.logger import logger
 from utils.message_handler import message_handler, MessageType
-from config.database import SessionLocal
+from config.database import SessionLocal, obter_sessao, contar_instrucoes
 from services.item_nota_entrada_service import ItemNotaEntradaService
+from services.camada_peps_service import CamadaPepsService
+from services.fila_associacao_service import FilaAssociacaoService
+from services.indice_itens_fornecedor import invalidar_indice_fornecedor
 from models.item_nota_entrada import ItemNotaEntrada
+from models.item_fornecedor import ItemFornecedor
 from models.nota_entrada import NotaEntrada
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func
+import re
+import threading
+
+
+class ChavesCadastradas:
+    """
+    Chaves de acesso das notas gravadas, em memória e compartilhadas entre as sessões
+    do Streamlit (thread-safe), usadas só como indicação para recusar uma nota repetida
+    antes de qualquer acesso à SEFAZ. A fonte da verdade é a restrição unique do banco
+    (IntegrityError na gravação): uma chave presente no conjunto é confirmada no banco
+    e o conjunto é descartado a cada nota gravada, alterada ou excluída.
+    """
+    def __init__(self, carregar, confirmar):
+        self._carregar = carregar
+        self._confirmar = confirmar
+        self._chaves = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalizar(chave):
+        return re.sub(r'\D', '', chave or '')
+
+    def contem(self, chave) -> bool:
+        normalizada = self._normalizar(chave)
+        with self._lock:
+            if self._chaves is None:
+                self._chaves = {self._normalizar(c) for c in self._carregar()}
+            indicada = normalizada in self._chaves
+        # Ausente: segue para a gravação, onde a restrição do banco decide
+        return indicada and self._confirmar(chave)
+
+    def invalidar(self):
+        """Recarrega do banco na próxima consulta"""
+        with self._lock:
+            self._chaves = None
+
+
+_chaves_cadastradas = ChavesCadastradas(
+    NotaEntradaRepository().listar_chaves_acesso,
+    NotaEntradaRepository().existe_chave_acesso,
+)
+
+
+def chave_acesso_cadastrada(chave_acesso: str) -> bool:
+    return _chaves_cadastradas.contem(chave_acesso)
+
+
+def invalidar_chaves_cadastradas():
+    _chaves_cadastradas.invalidar()
+
 
 class NotaEntradaService:
     def __init__(self):
         self.repository = NotaEntradaRepository()
-        self.item_service = ItemNotaEntradaService()        
+        self.item_service = ItemNotaEntradaService()
+        self.camada_peps_service = CamadaPepsService()
+        self.fila_associacao_service = FilaAssociacaoService()
 
     def criar_nota_entrada_atomica(self, nota_entrada_data, itens_data):
         session = SessionLocal()
@@ -25,19 +81,34 @@ class NotaEntradaService:
                 if self.repository.buscar_por_chave_acesso(nota_entrada_data.chave_acesso, session=session):
                     raise ValidationError("Chave de acesso já cadastrada.")
             
-            # Criar NotaEntrada
-            nota_entrada = self.repository.criar(nota_entrada_data, session=session)
-            
-            # Forçar o flush para gerar o ID da NotaEntrada
-            session.flush()
-            
-            # Criar Itens
-            for item_data in itens_data:
-                item_data['nota_entrada_id'] = nota_entrada.id
-                novo_item = ItemNotaEntrada(**item_data)
-                self.item_service.criar_item(novo_item, session=session)
+            with contar_instrucoes(session) as contador:
+                # Criar NotaEntrada
+                nota_entrada = self.repository.criar(nota_entrada_data, session=session)
+                
+                # Forçar o flush para gerar o ID da NotaEntrada
+                session.flush()
+                
+                # Criar Itens em lote (um único INSERT, sem commit/refresh por item)
+                total_itens = self.item_service.criar_itens_em_lote(itens_data, nota_entrada.id, session=session)
+
+                # Produto e grade de cada item pela associação do fornecedor (uma instrução por nota)
+                self.item_service.resolver_produtos_nota(nota_entrada.id, session=session)
+
+                # Itens ainda sem associação entram na fila na mesma transação
+                self.fila_associacao_service.adicionar_itens_nota(nota_entrada.fornecedor_id, itens_data, session=session)
             
             session.commit()
+            logger.info(
+                f"NotaEntrada {nota_entrada.id} gravada com {total_itens} itens "
+                f"em {contador['instrucoes']} instruções SQL"
+            )
+            _chaves_cadastradas.invalidar()
+            invalidar_indice_fornecedor(nota_entrada.fornecedor_id)
+            self.camada_peps_service.atualizar_itens_fornecedor(
+                nota_entrada.fornecedor_id,
+                [item_data.get('codigo_produto_fornecedor') for item_data in itens_data],
+                a_partir_de=nota_entrada.data_emissao
+            )
             # Se chegou aqui, deu sucesso
             message_handler.add_message(
                 MessageType.SUCCESS,
@@ -49,8 +120,12 @@ class NotaEntradaService:
             raise
         except IntegrityError as e:
             session.rollback()
-            if "Duplicate entry" in str(e.orig):
+            # Só a unicidade de notas_entrada.chave_acesso vira mensagem ao usuário (MySQL,
+            # PostgreSQL e SQLite citam a coluna ou o índice dela); outras violações, como
+            # uq_itens_fornecedor_item em gravações simultâneas, seguem como erro
+            if "chave_acesso" in str(e.orig):
                 raise ValidationError("Chave de acesso já existe. Utilize uma chave única.")
+            logger.error(f"Violação de integridade ao gravar a nota de entrada: {str(e.orig)}")
             raise
         except Exception as e:
             session.rollback()
@@ -58,35 +133,77 @@ class NotaEntradaService:
         finally:
             session.close()
 
-    def atualizar_nota_entrada_atomica(self, nota_entrada, itens_data, ids_para_excluir=None):
+    def atualizar_nota_entrada_atomica(self, nota_entrada, itens_data, ids_para_excluir=None, excluir_ausentes=False):
+        """
+        Grava a nota e a diferença dos itens em uma única transação. Só são excluídos os
+        itens em ids_para_excluir; com excluir_ausentes=True, também os itens gravados
+        que não vieram em itens_data.
+        """
         session = SessionLocal()
         try:
             # Inicia a transação explicitamente
             session.begin()
             
+            # Fornecedor e data gravados antes da edição (para atualizar as camadas PEPS)
+            original = session.get(NotaEntrada, nota_entrada.id)
+            fornecedor_original, emissao_original = original.fornecedor_id, original.data_emissao
+
             # Atualiza NotaEntrada usando merge para anexar ao contexto da sessão
             nota_entrada_atualizada = session.merge(nota_entrada)
             
-            # Exclui itens removidos
-            if ids_para_excluir:
-                for item_id in ids_para_excluir:
-                    item = session.query(ItemNotaEntrada).get(item_id)
-                    if item:
-                        session.delete(item)
-            
-            # Processa atualizações e novos itens
-            for item_data in itens_data:
-                if item_data['id']:  # Item existente
-                    item = session.query(ItemNotaEntrada).get(item_data['id'])
-                    for key, value in item_data.items():
-                        if key not in ['id', '_sa_instance_state']:
-                            setattr(item, key, value)
-                else:  # Novo item
-                    novo_item = ItemNotaEntrada(**item_data)
-                    session.add(novo_item)
+            with contar_instrucoes(session) as contador:
+                # Calcula a diferença uma única vez a partir dos itens gravados
+                atuais = {
+                    item.id: item
+                    for item in self.item_service.listar_itens_por_nota_entrada(nota_entrada_atualizada.id, session=session)
+                }
+                colunas = self.item_service.repository.colunas_editaveis()
+                ids_para_excluir = set(ids_para_excluir or [])
+                if excluir_ausentes:
+                    ids_para_excluir |= set(atuais) - {item_data['id'] for item_data in itens_data if item_data.get('id')}
+
+                novos = [item_data for item_data in itens_data if not item_data.get('id')]
+                alterados = [
+                    item_data for item_data in itens_data
+                    if item_data.get('id') in atuais and any(
+                        getattr(atuais[item_data['id']], chave) != valor
+                        for chave, valor in item_data.items() if chave in colunas
+                    )
+                ]
+
+                # Aplica em lote: DELETE ... IN, UPDATE por PK e INSERT dos novos
+                excluidos = self.item_service.deletar_itens_em_lote(
+                    [item_id for item_id in ids_para_excluir if item_id in atuais], session=session
+                )
+                atualizados = self.item_service.atualizar_itens_em_lote(alterados, session=session)
+                inseridos = self.item_service.criar_itens_em_lote(novos, nota_entrada_atualizada.id, session=session)
+
+                # Produto e grade dos itens (a nota pode ter trocado de fornecedor) e
+                # fila de associação dos fornecedores envolvidos
+                session.flush()
+                self.item_service.resolver_produtos_nota(nota_entrada_atualizada.id, session=session)
+                self.fila_associacao_service.sincronizar_fornecedores(
+                    {fornecedor_original, nota_entrada_atualizada.fornecedor_id}, session=session
+                )
             
+            # Lidos antes do commit: os itens excluídos não podem ser recarregados depois dele
+            codigos = (
+                [item.codigo_produto_fornecedor for item in atuais.values()]
+                + [item_data.get('codigo_produto_fornecedor') for item_data in itens_data]
+            )
+
             # Confirma TODAS as operações de uma vez
             session.commit()
+            _chaves_cadastradas.invalidar()
+            logger.info(
+                f"NotaEntrada {nota_entrada_atualizada.id}: {excluidos} itens excluídos, {atualizados} atualizados, "
+                f"{inseridos} inseridos em {contador['instrucoes']} instruções SQL"
+            )
+            a_partir_de = min(emissao_original, nota_entrada_atualizada.data_emissao)
+            for fornecedor_id in {fornecedor_original, nota_entrada_atualizada.fornecedor_id}:
+                invalidar_indice_fornecedor(fornecedor_id)
+                self.camada_peps_service.atualizar_itens_fornecedor(fornecedor_id, codigos, a_partir_de=a_partir_de)
+
             success_msg = f"NotaEntrada atualizada com sucesso"
             logger.info(success_msg)
             message_handler.add_message(
@@ -103,6 +220,8 @@ class NotaEntradaService:
     def criar_nota_entrada(self, dados):
         try:
             nota_entrada = self.repository.criar(dados)
+            _chaves_cadastradas.invalidar()
+            invalidar_indice_fornecedor(nota_entrada.fornecedor_id)
             success_msg = f"NotaEntrada cadastrado com sucesso"
             logger.info(success_msg)
             message_handler.add_message(
@@ -124,29 +243,47 @@ class NotaEntradaService:
         return self.repository.buscar_por_id(id)
     
     def atualizar_nota_entrada(self, dados):
-        return self.repository.atualizar(dados)
+        resultado = self.repository.atualizar(dados)
+        _chaves_cadastradas.invalidar()
+        return resultado
     
     def deletar_nota_entrada(self, id):
-        return self.repository.deletar(id)
+        nota_entrada = self.repository.buscar_por_id(id)
+        codigos = [item.codigo_produto_fornecedor for item in self.item_service.listar_itens_por_nota_entrada(id)]
+        resultado = self.repository.deletar(id)
+        _chaves_cadastradas.invalidar()
+        if nota_entrada:
+            invalidar_indice_fornecedor(nota_entrada.fornecedor_id)
+            self.fila_associacao_service.atualizar_fornecedores([nota_entrada.fornecedor_id])
+            self.camada_peps_service.atualizar_itens_fornecedor(
+                nota_entrada.fornecedor_id, codigos, a_partir_de=nota_entrada.data_emissao
+            )
+        return resultado
     
     def listar_itens_unicos_por_fornecedor(self, fornecedor_id: int) -> list:
-        with SessionLocal() as session:
-            resultados = (
+        with obter_sessao() as session:
+            # Agrupa pela chave inteira do catálogo; o texto vem de itens_fornecedor
+            ultimas_entradas = (
                 session.query(
-                    ItemNotaEntrada.codigo_produto_fornecedor,
-                    ItemNotaEntrada.unidade_medida,
-                    ItemNotaEntrada.descricao,
+                    ItemNotaEntrada.item_fornecedor_id,
                     func.max(ItemNotaEntrada.valor).label("valor"),
                     func.max(NotaEntrada.data_emissao).label("data_emissao")
                 )
                 .join(NotaEntrada, ItemNotaEntrada.nota_entrada_id == NotaEntrada.id)
                 .filter(NotaEntrada.fornecedor_id == fornecedor_id)
-                .filter(ItemNotaEntrada.codigo_produto_fornecedor.isnot(None))
-                .group_by(
-                    ItemNotaEntrada.codigo_produto_fornecedor,
-                    ItemNotaEntrada.unidade_medida,
-                    ItemNotaEntrada.descricao
+                .filter(ItemNotaEntrada.item_fornecedor_id.isnot(None))
+                .group_by(ItemNotaEntrada.item_fornecedor_id)
+                .subquery()
+            )
+            resultados = (
+                session.query(
+                    ItemFornecedor.codigo_produto_fornecedor,
+                    ItemFornecedor.unidade_medida,
+                    ItemFornecedor.descricao,
+                    ultimas_entradas.c.valor,
+                    ultimas_entradas.c.data_emissao
                 )
+                .join(ultimas_entradas, ultimas_entradas.c.item_fornecedor_id == ItemFornecedor.id)
                 .all()
             )
 
@@ -0,0 +1,171 @@
+# services/peps_numpy.py
+import numpy as np
+
+def calcular_camadas_numpy(entradas, contagens, data_corte):
+    """
+    Calcula o consumo PEPS por camada com operações vetorizadas.
+
+    Equivalente à CTE de AuditoriaRepository (mesmas colunas e mesma ordem), mas
+    sem funções de janela no banco: útil em dialetos onde a CTE é lenta.
+
+    Args:
+        entradas: lotes de AuditoriaRepository.listar_entradas, já ordenados por
+            produto, data de emissão e lote.
+        contagens: linhas (produto_id, quantidade_inventario) ordenadas por produto.
+        data_corte: data_fim_contagem do inventário (data_corte_inventario).
+    """
+    if not entradas:
+        return []
+
+    produto = np.fromiter((e.produto_id for e in entradas), dtype=np.int64, count=len(entradas))
+    quantidade = np.fromiter((e.quantidade_unidades for e in entradas), dtype=np.float64, count=len(entradas))
+    valor = np.fromiter((e.valor_unitario for e in entradas), dtype=np.float64, count=len(entradas))
+
+    # Início de cada partição de produto (os lotes chegam ordenados por produto)
+    inicios = np.flatnonzero(np.r_[True, produto[1:] != produto[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(produto)])
+    fins = inicios + tamanhos - 1
+
+    # Soma acumulada por produto: soma global menos o acumulado antes da partição
+    soma_global = np.cumsum(quantidade)
+    base = np.r_[0.0, soma_global][inicios]
+    acumulada = soma_global - np.repeat(base, tamanhos)
+
+    # Acumulado da camada anterior (LAG), zero na primeira camada de cada produto
+    anterior = np.r_[0.0, acumulada[:-1]]
+    anterior[inicios] = 0.0
+
+    # Quantidade contada por produto localizada por busca binária nas contagens ordenadas
+    produtos_unicos = produto[inicios]
+    contado = np.zeros(len(produtos_unicos))
+    if contagens:
+        produtos_contados = np.fromiter((c.produto_id for c in contagens), dtype=np.int64, count=len(contagens))
+        quantidades_contadas = np.fromiter(
+            (c.quantidade_inventario or 0.0 for c in contagens), dtype=np.float64, count=len(contagens)
+        )
+        posicoes = np.searchsorted(produtos_contados, produtos_unicos)
+        posicoes_validas = np.minimum(posicoes, len(produtos_contados) - 1)
+        encontrados = (posicoes < len(produtos_contados)) & (produtos_contados[posicoes_validas] == produtos_unicos)
+        contado[encontrados] = quantidades_contadas[posicoes_validas[encontrados]]
+
+    saida = np.repeat(acumulada[fins] - contado, tamanhos)
+
+    # Camadas totalmente consumidas, a camada onde a saída termina e as intactas
+    consumida = np.where(
+        saida >= acumulada,
+        quantidade,
+        np.where(saida > anterior, saida - anterior, 0.0)
+    )
+    saldo = quantidade - consumida
+
+    colunas = {
+        'quantidade_unidades': quantidade.tolist(),
+        'valor_unitario': valor.tolist(),
+        'valor_total_lote': (quantidade * valor).tolist(),
+        'quantidade_acumulada': acumulada.tolist(),
+        'quantidade_saida': saida.tolist(),
+        'quantidade_consumida': consumida.tolist(),
+        'saldo_remanescente': saldo.tolist(),
+        'valor_consumido': (consumida * valor).tolist(),
+        'valor_saldo_remanescente': (saldo * valor).tolist(),
+    }
+
+    return [
+        {
+            'item_nota_entrada_id': entrada.item_nota_entrada_id,
+            'produto_id': entrada.produto_id,
+            'nome': entrada.nome,
+            'data_emissao': entrada.data_emissao,
+            **{nome: valores[i] for nome, valores in colunas.items()},
+            'data_corte_inventario': data_corte,
+        }
+        for i, entrada in enumerate(entradas)
+    ]
+
+
+def calcular_comparativo_numpy(entradas, contagens, inventarios):
+    """
+    Consumo e saldo PEPS de todos os inventários encerrados em uma única passada
+    pelos lotes (em vez de uma execução da CTE por inventário).
+
+    Para cada produto, o total comprado até cada data de corte vem da soma acumulada
+    dos lotes; o custo consumido é a curva de custo acumulado PEPS avaliada (busca
+    binária) na saída acumulada. Os valores do período são a diferença para o
+    inventário anterior; os saldos coincidem com a auditoria completa de cada inventário.
+
+    Args:
+        entradas: lotes de AuditoriaRepository.listar_entradas_por_periodo.
+        contagens: linhas (inventario_id, produto_id, quantidade_inventario).
+        inventarios: linhas (id, referencia, data_fim_contagem) ordenadas pela data de corte.
+    """
+    if not entradas or not inventarios:
+        return []
+
+    # Posição de cada data de corte (inventários com a mesma data ficam na primeira)
+    posicao_corte = {}
+    for posicao, inventario in enumerate(inventarios):
+        posicao_corte.setdefault(inventario.data_fim_contagem, posicao)
+    total_periodos = len(inventarios)
+    periodos = np.arange(total_periodos)
+
+    posicao_inventario = {inventario.id: posicao for posicao, inventario in enumerate(inventarios)}
+    contado_por_produto = {}
+    for contagem in contagens:
+        posicao = posicao_inventario.get(contagem.inventario_id)
+        if posicao is None:
+            continue
+        contado = contado_por_produto.setdefault(contagem.produto_id, np.zeros(total_periodos))
+        contado[posicao] = contagem.quantidade_inventario or 0.0
+
+    produto = np.fromiter((e.produto_id for e in entradas), dtype=np.int64, count=len(entradas))
+    quantidade = np.fromiter((e.quantidade_unidades for e in entradas), dtype=np.float64, count=len(entradas))
+    valor = np.fromiter((e.valor_unitario for e in entradas), dtype=np.float64, count=len(entradas))
+    periodo = np.fromiter((posicao_corte[e.periodo_corte] for e in entradas), dtype=np.int64, count=len(entradas))
+
+    inicios = np.flatnonzero(np.r_[True, produto[1:] != produto[:-1]])
+    fins = np.r_[inicios[1:], len(produto)]
+
+    resultado = []
+    for inicio, fim in zip(inicios, fins):
+        produto_id = int(produto[inicio])
+        quantidade_lotes = quantidade[inicio:fim]
+        valor_lotes = valor[inicio:fim]
+
+        # Curvas acumuladas de quantidade e custo (com zero à esquerda)
+        acumulada = np.r_[0.0, np.cumsum(quantidade_lotes)]
+        custo_acumulado = np.r_[0.0, np.cumsum(quantidade_lotes * valor_lotes)]
+
+        # Lotes incluídos até cada inventário (periodo não decresce dentro do produto)
+        incluidos = np.searchsorted(periodo[inicio:fim], periodos, side='right')
+        entrada_total = acumulada[incluidos]
+        custo_entradas = custo_acumulado[incluidos]
+
+        contado = contado_por_produto.get(produto_id, np.zeros(total_periodos))
+        saida = np.clip(entrada_total - contado, 0.0, entrada_total)
+
+        # Custo PEPS da saída acumulada: lote onde a saída termina + fração dele
+        lote = np.minimum(np.searchsorted(acumulada[1:], saida, side='left'), len(quantidade_lotes) - 1)
+        custo_saida = custo_acumulado[lote] + (saida - acumulada[lote]) * valor_lotes[lote]
+
+        entrada_periodo = np.diff(entrada_total, prepend=0.0)
+        consumo_periodo = np.diff(saida, prepend=0.0)
+        custo_periodo = np.diff(custo_saida, prepend=0.0)
+        saldo = entrada_total - saida
+        valor_saldo = custo_entradas - custo_saida
+
+        for posicao in np.flatnonzero(entrada_total > 0):
+            inventario = inventarios[posicao]
+            resultado.append({
+                'produto_id': produto_id,
+                'nome': entradas[inicio].nome,
+                'inventario_id': inventario.id,
+                'referencia': inventario.referencia,
+                'data_corte_inventario': inventario.data_fim_contagem,
+                'quantidade_entrada': float(entrada_periodo[posicao]),
+                'quantidade_consumida': float(consumo_periodo[posicao]),
+                'valor_consumido': float(custo_periodo[posicao]),
+                'saldo_remanescente': float(saldo[posicao]),
+                'valor_saldo_remanescente': float(valor_saldo[posicao]),
+            })
+
+    return resultado
@@ -1,15 +1,18 @@
 # services/produto_fornecedor_associacao_service.py
 from repositories.produto_fornecedor_associacao_repository import ProdutoFornecedorAssociacaoRepository
 from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao 
-from services.nota_entrada_service import NotaEntradaService
-from services.fornecedor_service import FornecedorService
+from services.camada_peps_service import CamadaPepsService
+from services.fila_associacao_service import FilaAssociacaoService
+from services.item_nota_entrada_service import ItemNotaEntradaService
 from utils.logger import logger
 import time
 
 class ProdutoFornecedorAssociacaoService:
     def __init__(self):
         self.repository = ProdutoFornecedorAssociacaoRepository()
-        self.nota_entrada_service = NotaEntradaService()
+        self.camada_peps_service = CamadaPepsService()
+        self.fila_associacao_service = FilaAssociacaoService()
+        self.item_nota_entrada_service = ItemNotaEntradaService()
 
     def criar_associacao(self, dados: dict):
         try:
@@ -23,7 +26,15 @@ class ProdutoFornecedorAssociacaoService:
             )
             
             # Salva via repository
-            return self.repository.criar(associacao)
+            associacao = self.repository.criar(associacao)
+            self.item_nota_entrada_service.resolver_produtos_itens(
+                associacao.fornecedor_id, [associacao.codigo_produto_fornecedor]
+            )
+            self.fila_associacao_service.item_associado(
+                associacao.fornecedor_id, associacao.codigo_produto_fornecedor, associacao.descricao_produto_fornecedor
+            )
+            self.camada_peps_service.atualizar_produtos([associacao.produto_id])
+            return associacao
             
         except Exception as e:
             logger.error(f"Erro ao criar associação: {str(e)}")
@@ -37,45 +48,36 @@ class ProdutoFornecedorAssociacaoService:
 
     def atualizar_associacao(self, associacao_id: int, dados: dict):
         associacao = self.repository.buscar_por_id(associacao_id)
+        produto_original, fornecedor_original = associacao.produto_id, associacao.fornecedor_id
+        codigo_original = associacao.codigo_produto_fornecedor
         for key, value in dados.items():
             setattr(associacao, key, value)
         self.repository.atualizar(associacao)
+        # Itens do código antigo perdem (ou trocam de) produto; os do novo passam a apontar para ele
+        for fornecedor_id, codigo in {(fornecedor_original, codigo_original),
+                                      (associacao.fornecedor_id, associacao.codigo_produto_fornecedor)}:
+            self.item_nota_entrada_service.resolver_produtos_itens(fornecedor_id, [codigo])
+        # Código/descrição podem ter mudado: o item antigo volta para a fila e o novo sai
+        self.fila_associacao_service.atualizar_fornecedores({fornecedor_original, associacao.fornecedor_id})
+        self.camada_peps_service.atualizar_produtos([produto_original, associacao.produto_id])
         return associacao
 
     def deletar_associacao(self, associacao_id: int):
-        self.repository.deletar(associacao_id)        
+        associacao = self.repository.buscar_por_id(associacao_id)
+        self.repository.deletar(associacao_id)
+        if associacao:
+            self.item_nota_entrada_service.resolver_produtos_itens(
+                associacao.fornecedor_id, [associacao.codigo_produto_fornecedor]
+            )
+            self.fila_associacao_service.atualizar_fornecedores([associacao.fornecedor_id])
+            self.camada_peps_service.atualizar_produtos([associacao.produto_id])
 
     def listar_todos_itens_nao_associados(self):
         inicio = time.time()
-        todos_fornecedores = self._get_fornecedores_com_itens()
-
-        # Carrega todas as associações existentes de uma vez
-        todas_associacoes = self.repository.listar()
-
-        associacoes_index = {
-            (a.fornecedor_id, a.codigo_produto_fornecedor, a.descricao_produto_fornecedor): True
-            for a in todas_associacoes
-        }
-                
-        itens_nao_associados = []
-        
-        for fornecedor in todos_fornecedores:
-            itens_fornecedor = self.nota_entrada_service.listar_itens_unicos_por_fornecedor(fornecedor.id)
-
-            for item in itens_fornecedor:
-                chave = (fornecedor.id, item['codigo'], item['descricao'])
-                if chave not in associacoes_index:
-                    itens_nao_associados.append({
-                        "fornecedor_id": fornecedor.id,
-                        "fornecedor_nome": fornecedor.nome,
-                        "codigo_produto_fornecedor": item['codigo'],
-                        "descricao": item['descricao'],
-                        "unidade": item['unidade']
-                    })
-                
+        # Lida da fila persistida, mantida a cada nota e associação gravada
+        itens_nao_associados = self.fila_associacao_service.listar_itens()
         logger.info(f"Itens não associados encontrados: {len(itens_nao_associados)} - Duração da busca: {time.time() - inicio:.2f}s")
         return itens_nao_associados
 
-    def _get_fornecedores_com_itens(self):
-        # Implemente conforme seu modelo de dados
-        return FornecedorService().listar_fornecedores()
\ No newline at end of file
+    def reconstruir_fila_associacao(self):
+        self.fila_associacao_service.reconstruir()
@@ -13,6 +13,9 @@ from models.nota_entrada import NotaEntrada
 from models.fornecedor import Fornecedor
 from utils.logger import logger
 from config.settings import CAPTURE_DIR
+from utils.armazem_documentos import armazem_documentos
+from utils.validacoes import chave_acesso_valida, ValidationError
+from services.nota_entrada_service import chave_acesso_cadastrada
 from services.browser_service import BrowserService
 import streamlit as st
 import re
@@ -71,6 +74,7 @@ class QRCodeService:
                     encoded_url = f"https://www.dfe.ms.gov.br/nfe/consulta/?tpAmb=1&chNFe={cleaned_input}&redirect=true"
                 
                 param = cleaned_input
+                chave_acesso = cleaned_input
             else:
                 # Processamento padrão para URLs com parâmetro 'p'
                 parsed_url = urlparse(url)
@@ -82,24 +86,62 @@ class QRCodeService:
                 
                 encoded_param = quote(param, encoding='utf-8')
                 encoded_url = f"https://www.dfe.ms.gov.br/nfce/qrcode/?p={encoded_param}"
+                # O parâmetro do QR Code começa pela chave de acesso (chave|versão|ambiente|...)
+                inicio_param = re.match(r'\d{44}', param)
+                chave_acesso = inicio_param.group(0) if inicio_param else None
 
-            st.toast("Obtendo dados da NotaEntrada...")
-            html_content, modelo = self.browser_service.get_page_with_captcha_handling(encoded_url)
+            # Chave inválida ou nota já cadastrada: recusa antes de qualquer acesso
+            if chave_acesso:
+                if not chave_acesso_valida(chave_acesso):
+                    raise ValidationError("Chave de acesso inválida: o dígito verificador não confere.")
+                if chave_acesso_cadastrada(chave_acesso):
+                    raise ValidationError(f"Nota com a chave de acesso {chave_acesso} já cadastrada.")
+
+            # Nota já obtida antes: lê a cópia local em vez de acessar a SEFAZ
+            documento = armazem_documentos.obter_json('sefaz', chave_acesso) if chave_acesso else None
+            if documento:
+                st.toast("Nota já consultada: usando a cópia local.")
+                logger.info(f"Documento {chave_acesso} lido do armazém local")
+                html_content, modelo = documento['html'], documento['modelo']
+            else:
+                st.toast("Obtendo dados da NotaEntrada...")
+                html_content, modelo = self.browser_service.get_page_with_captcha_handling(encoded_url)
             
             if html_content:
                 st.toast("Extraindo dados do HTML...")
                 if modelo == 65: #nfce
-                    return self.extract_nfce_data(html_content, modelo), encoded_url
+                    dados = self.extract_nfce_data(html_content, modelo)
                 elif modelo == 55: #nfe
-                    return self.extract_nfe_data(html_content, modelo), encoded_url
+                    dados = self.extract_nfe_data(html_content, modelo)
+                else:
+                    raise Exception(f"Modelo de nota não suportado: {modelo}")
+                if not documento:
+                    self._guardar_documento(chave_acesso or dados['nota_entrada'].chave_acesso, html_content, modelo, encoded_url)
+                return dados, encoded_url
             else:
                 raise Exception("Falha ao obter conteúdo da página")
 
+        except ValidationError:
+            raise
         except Exception as e:
             st.error(f"Erro ao processar entrada: {str(e)}")
             logger.error(f"Erro no processamento: {str(e)}")
             raise
 
+    def _guardar_documento(self, chave_acesso, html_content, modelo, url):
+        """Guarda o HTML já extraído com sucesso; falhas não interrompem a leitura da nota"""
+        if not chave_acesso:
+            return
+        try:
+            armazem_documentos.guardar_json('sefaz', chave_acesso, {
+                'modelo': modelo,
+                'url': url,
+                'obtido_em': datetime.now().isoformat(timespec='seconds'),
+                'html': html_content,
+            })
+        except Exception as e:
+            logger.error(f"Erro ao guardar o documento {chave_acesso}: {str(e)}")
+
     def extract_nfce_data(self, html, modelo):
         """Extrai dados de produtos do HTML da NFC-e."""
         soup = BeautifulSoup(html, 'html.parser')
@@ -0,0 +1,44 @@
+# tests/conftest.py
+"""
+Configuração dos testes (executar a partir do diretório gestao_simples):
+    python -m pytest tests
+
+Os testes usam um banco SQLite temporário com o schema das migrações.
+"""
+import os
+import sys
+import tempfile
+
+# Antes de importar config: load_dotenv não sobrescreve variáveis já definidas
+_DIRETORIO_BANCO = tempfile.mkdtemp(prefix='gestao_simples_testes_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_NAME'] = os.path.join(_DIRETORIO_BANCO, 'testes.db')
+os.environ['AUDITORIA_ESTRATEGIA'] = 'tabela'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def banco():
+    """Engine do banco de testes com todas as migrações aplicadas"""
+    from config.database import engine
+    from migrations.migrator import aplicar_migracoes
+    # Registra todos os models (o app os importa pelas telas), para os relacionamentos
+    # declarados pelo nome da classe
+    import models.usuario, models.fornecedor, models.produto, models.nota_entrada  # noqa: F401
+    import models.item_nota_entrada, models.item_fornecedor, models.produto_fornecedor_associacao  # noqa: F401
+    import models.inventario_estoque, models.item_inventario, models.item_fila_associacao  # noqa: F401
+    import models.camada_peps, models.camada_peps_estado, models.saldo_fechamento, models.versao_dados  # noqa: F401
+
+    aplicar_migracoes()
+    return engine
+
+
+@pytest.fixture(scope='session')
+def massa(banco):
+    """Massa de tests/massa_peps.py gravada uma vez para todos os testes"""
+    from massa_peps import gravar_massa
+
+    gravar_massa(banco)
@@ -0,0 +1,98 @@
+# tests/massa_peps.py
+"""Massa de dados das auditorias PEPS nos testes: um caso de borda por produto"""
+from datetime import datetime
+from sqlalchemy import insert
+
+# Produtos da massa de testes, um por caso de borda
+CONTAGEM_ACIMA_DAS_COMPRAS = 1
+CONTAGEM_ZERO = 2
+EMPATE_NA_EMISSAO = 3
+SEM_CONTAGEM = 4
+CONTAGEM_EM_VARIAS_LINHAS = 5
+
+INVENTARIO_ID = 1
+EMISSAO_EMPATADA = datetime(2025, 2, 15, 10, 0, 0)
+
+
+def _item(item_id, nota_id, produto_id, quantidade, valor, grade=1.0):
+    return {
+        'id': item_id,
+        'nota_entrada_id': nota_id,
+        'codigo_produto_fornecedor': f"P{produto_id:03d}",
+        'descricao': f"PRODUTO {produto_id}",
+        'quantidade': quantidade,
+        'unidade_medida': 'UN',
+        'valor': valor,
+        'produto_id': produto_id,
+        'quantidade_por_grade': grade,
+    }
+
+
+def _nota(nota_id, data_emissao, total):
+    return {
+        'id': nota_id,
+        'modelo': 55,
+        'fornecedor_id': 1,
+        'data_emissao': data_emissao,
+        'numero_nota_entrada': nota_id,
+        'serie_nota_entrada': 1,
+        'total_nota_entrada': total,
+    }
+
+
+def gravar_massa(banco):
+    """Um inventário encerrado com notas antes e depois da data de corte"""
+    from models.fornecedor import Fornecedor
+    from models.produto import Produto
+    from models.nota_entrada import NotaEntrada
+    from models.item_nota_entrada import ItemNotaEntrada
+    from models.inventario_estoque import InventarioEstoque
+    from models.item_inventario import ItemInventario
+
+    notas = [
+        _nota(1, datetime(2025, 1, 10, 9, 0, 0), 100.0),
+        # Duas notas com a mesma emissão: o lote (id do item) desempata a ordem PEPS
+        _nota(2, EMISSAO_EMPATADA, 30.0),
+        _nota(3, EMISSAO_EMPATADA, 30.0),
+        # Depois da data de corte: fica fora das camadas
+        _nota(4, datetime(2025, 4, 10, 9, 0, 0), 900.0),
+    ]
+    itens = [
+        _item(1, 1, CONTAGEM_ACIMA_DAS_COMPRAS, 10.0, 2.0),
+        _item(2, 1, CONTAGEM_ZERO, 4.0, 3.0),
+        _item(3, 1, EMPATE_NA_EMISSAO, 6.0, 1.0),
+        _item(4, 1, SEM_CONTAGEM, 5.0, 7.0),
+        _item(5, 1, CONTAGEM_EM_VARIAS_LINHAS, 3.0, 4.0, grade=2.0),
+        _item(6, 2, CONTAGEM_ACIMA_DAS_COMPRAS, 5.0, 2.5),
+        _item(7, 2, EMPATE_NA_EMISSAO, 4.0, 1.5),
+        _item(8, 3, EMPATE_NA_EMISSAO, 2.0, 1.2),
+        _item(9, 3, CONTAGEM_ZERO, 6.0, 3.5),
+        _item(10, 4, CONTAGEM_ACIMA_DAS_COMPRAS, 100.0, 9.0),
+        _item(11, 4, SEM_CONTAGEM, 50.0, 8.0),
+    ]
+    contagens = [
+        (CONTAGEM_ACIMA_DAS_COMPRAS, 20.0),
+        (CONTAGEM_ZERO, 0.0),
+        (EMPATE_NA_EMISSAO, 7.0),
+        (CONTAGEM_EM_VARIAS_LINHAS, 1.0),
+        (CONTAGEM_EM_VARIAS_LINHAS, 2.5),
+    ]
+
+    with banco.begin() as conn:
+        conn.execute(insert(Fornecedor.__table__), [{'id': 1, 'nome': "Fornecedor", 'cnpj': '00000000000001'}])
+        conn.execute(insert(Produto.__table__), [
+            {'id': produto_id, 'nome': f"Produto {produto_id}", 'unidade_medida': 'UN'}
+            for produto_id in range(1, 6)
+        ])
+        conn.execute(insert(NotaEntrada.__table__), notas)
+        conn.execute(insert(ItemNotaEntrada.__table__), itens)
+        conn.execute(insert(InventarioEstoque.__table__), [{
+            'id': INVENTARIO_ID,
+            'referencia': '03/2025',
+            'data_inicio_contagem': datetime(2025, 3, 31, 8, 0, 0),
+            'data_fim_contagem': datetime(2025, 3, 31, 18, 0, 0),
+        }])
+        conn.execute(insert(ItemInventario.__table__), [
+            {'id': item_id, 'inventario_id': INVENTARIO_ID, 'produto_id': produto_id, 'quantidade_contada': quantidade}
+            for item_id, (produto_id, quantidade) in enumerate(contagens, start=1)
+        ])
@@ -0,0 +1,49 @@
+# tests/test_atualizacao_nota.py
+"""Exclusão de itens em NotaEntradaService.atualizar_nota_entrada_atomica"""
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+
+FORNECEDOR_ID = 200
+
+
+def _item(codigo, **extra):
+    return {
+        'codigo_produto_fornecedor': codigo, 'descricao': f"ITEM {codigo}",
+        'quantidade': 1.0, 'unidade_medida': 'UN', 'valor': 1.0, **extra,
+    }
+
+
+@pytest.fixture
+def nota(banco, massa):
+    from models.fornecedor import Fornecedor
+    from models.nota_entrada import NotaEntrada
+    from services.nota_entrada_service import NotaEntradaService
+
+    with banco.begin() as conn:
+        if not conn.execute(Fornecedor.__table__.select().where(Fornecedor.id == FORNECEDOR_ID)).first():
+            conn.execute(insert(Fornecedor.__table__), [{'id': FORNECEDOR_ID, 'nome': "Notas", 'cnpj': '00000000000200'}])
+    # Depois da massa (ids explícitos) e de todos os inventários dela: não altera as camadas PEPS
+    return NotaEntradaService().criar_nota_entrada_atomica(
+        NotaEntrada(fornecedor_id=FORNECEDOR_ID, data_emissao=datetime(2030, 1, 10), total_nota_entrada=2.0),
+        [_item('A'), _item('B')],
+    )
+
+
+def _reenviar_primeiro_item(nota, **kwargs):
+    from services.nota_entrada_service import NotaEntradaService
+
+    service = NotaEntradaService()
+    primeiro = service.item_service.listar_itens_por_nota_entrada(nota.id)[0]
+    service.atualizar_nota_entrada_atomica(
+        service.buscar_nota_entrada_por_id(nota.id), [_item(primeiro.codigo_produto_fornecedor, id=primeiro.id)], **kwargs
+    )
+    return [item.codigo_produto_fornecedor for item in service.item_service.listar_itens_por_nota_entrada(nota.id)]
+
+
+def test_itens_ausentes_do_payload_sao_mantidos_por_padrao(nota):
+    assert sorted(_reenviar_primeiro_item(nota)) == ['A', 'B']
+
+
+def test_itens_ausentes_sao_excluidos_quando_pedido(nota):
+    assert _reenviar_primeiro_item(nota, excluir_ausentes=True) == ['A']
@@ -0,0 +1,27 @@
+# tests/test_benchmark.py
+"""python -m benchmarks.executar --sqlite <arquivo> --gerar a partir de um diretório vazio"""
+import glob
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_gera_massa_e_grava_resultado_sem_diretorios_prontos(tmp_path):
+    # Diretório de trabalho vazio: sem tmp/, .env nem banco (como em um checkout limpo)
+    ambiente = {**os.environ, 'PYTHONPATH': RAIZ}
+    for variavel in ('DB_TYPE', 'DB_NAME', 'AUDITORIA_ESTRATEGIA'):
+        ambiente.pop(variavel, None)
+    processo = subprocess.run(
+        [
+            sys.executable, '-m', 'benchmarks.executar',
+            '--sqlite', str(tmp_path / 'novo' / 'bench.db'), '--gerar',
+            '--fornecedores', '2', '--produtos', '20', '--itens-nota', '200', '--inventarios', '2',
+            '--repeticoes', '1',
+        ],
+        cwd=tmp_path, env=ambiente, capture_output=True, text=True, timeout=600,
+    )
+
+    assert processo.returncode == 0, processo.stderr[-2000:]
+    assert glob.glob(str(tmp_path / 'tmp' / '.benchmarks' / 'benchmark_sqlite_*.json'))
@@ -0,0 +1,51 @@
+# tests/test_camadas_gravadas.py
+"""
+Gravação das camadas PEPS e do saldo de fechamento de um inventário
+(CamadaPepsService.recalcular_inventario) pelos dois motores.
+"""
+import pytest
+from massa_peps import INVENTARIO_ID
+
+COLUNAS_EXATAS = ['produto_id', 'nome', 'data_emissao', 'data_corte_inventario']
+COLUNAS_NUMERICAS = [
+    'quantidade_unidades',
+    'valor_unitario',
+    'valor_total_lote',
+    'quantidade_acumulada',
+    'quantidade_saida',
+    'quantidade_consumida',
+    'saldo_remanescente',
+    'valor_consumido',
+    'valor_saldo_remanescente',
+]
+
+
+@pytest.mark.parametrize('motor', ['sql', 'numpy'])
+def test_recalcular_grava_camadas_e_saldo_de_fechamento(massa, motor):
+    from repositories.auditoria_repository import AuditoriaRepository
+    from services.camada_peps_service import CamadaPepsService
+
+    service = CamadaPepsService(motor=motor, incremental=False)
+    inventario = AuditoriaRepository().obter_inventario_por_id(INVENTARIO_ID)
+    calculadas = service.calcular_camadas(inventario.id, inventario.data_fim_contagem)
+
+    total = service.recalcular_inventario(inventario.id, inventario.data_fim_contagem)
+
+    assert total == len(calculadas)
+    gravadas = service.repository.listar_camadas(INVENTARIO_ID)
+    assert len(gravadas) == len(calculadas)
+    for gravada, calculada in zip(gravadas, calculadas):
+        for coluna in COLUNAS_EXATAS:
+            assert gravada[coluna] == calculada[coluna], coluna
+        for coluna in COLUNAS_NUMERICAS:
+            assert gravada[coluna] == pytest.approx(calculada[coluna]), coluna
+
+    # Marca de atualizado com a data de corte usada: a próxima leitura não recalcula
+    estado = service.repository.buscar_estado(INVENTARIO_ID)
+    assert estado.data_corte == inventario.data_fim_contagem
+
+    saldos = service.saldo_repository.listar_como_entradas(INVENTARIO_ID)
+    assert [(saldo.item_nota_entrada_id, saldo.quantidade_unidades) for saldo in saldos] == [
+        (camada['item_nota_entrada_id'], pytest.approx(camada['saldo_remanescente']))
+        for camada in calculadas if camada['saldo_remanescente']
+    ]
@@ -0,0 +1,25 @@
+# tests/test_chaves_cadastradas.py
+"""Conjunto de chaves de acesso em memória como indicação, confirmada pelo banco"""
+
+
+def test_chave_no_conjunto_e_confirmada_no_banco():
+    from services.nota_entrada_service import ChavesCadastradas
+
+    no_banco = {'11112222333344445555666677778888999900001111'}
+    carregadas = []
+
+    def carregar():
+        carregadas.append(True)
+        return ['1111 2222 3333 4444 5555 6666 7777 8888 9999 0000 1111', '2' * 44]
+
+    chaves = ChavesCadastradas(carregar, lambda chave: chave in no_banco)
+
+    assert chaves.contem('11112222333344445555666677778888999900001111')
+    # Excluída por outro processo: o conjunto desatualizado não recusa a nota
+    assert not chaves.contem('2' * 44)
+    assert not chaves.contem('3' * 44)
+    assert len(carregadas) == 1
+
+    chaves.invalidar()
+    chaves.contem('3' * 44)
+    assert len(carregadas) == 2
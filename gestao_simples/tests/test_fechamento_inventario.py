@@ -0,0 +1,85 @@
+# tests/test_fechamento_inventario.py
+"""
+Encerramento de um inventário pelo serviço: fechar_inventario grava as camadas e o
+saldo de fechamento, e a auditoria passa a ler as camadas gravadas.
+"""
+from datetime import datetime
+import pytest
+from massa_peps import CONTAGEM_ACIMA_DAS_COMPRAS, SEM_CONTAGEM
+
+FIM_CONTAGEM = datetime(2025, 4, 30, 18, 0, 0)
+
+
+@pytest.fixture(scope='module')
+def inventario_encerrado(massa):
+    from models.inventario_estoque import InventarioEstoque
+    from services.inventario_estoque_service import InventarioEstoqueService
+
+    service = InventarioEstoqueService()
+    inventario = service.criar_inventario(InventarioEstoque(
+        referencia='04/2025', data_inicio_contagem=datetime(2025, 4, 30, 8, 0, 0)
+    ))
+    service.adicionar_item(inventario.id, CONTAGEM_ACIMA_DAS_COMPRAS, 30.0)
+    service.adicionar_item(inventario.id, SEM_CONTAGEM, 12.0)
+    service.encerrar_contagem(inventario.id, FIM_CONTAGEM)
+    return inventario.id
+
+
+def test_encerrar_contagem_grava_camadas_e_marca_de_atualizado(inventario_encerrado):
+    from services.camada_peps_service import CamadaPepsService
+
+    service = CamadaPepsService()
+    estado = service.repository.buscar_estado(inventario_encerrado)
+    assert estado is not None
+    assert estado.data_corte == FIM_CONTAGEM
+
+    gravadas = service.repository.listar_camadas(inventario_encerrado)
+    calculadas = service.auditoria_repository.calcular_camadas(inventario_encerrado)
+    assert len(gravadas) == len(calculadas) > 0
+    for gravada, calculada in zip(gravadas, calculadas):
+        assert gravada['produto_id'] == calculada['produto_id']
+        assert gravada['data_emissao'] == calculada['data_emissao']
+        assert gravada['data_corte_inventario'] == FIM_CONTAGEM
+        for coluna in ('quantidade_consumida', 'saldo_remanescente', 'valor_saldo_remanescente'):
+            assert gravada[coluna] == pytest.approx(calculada[coluna]), coluna
+
+    saldos = service.saldo_repository.listar_como_entradas(inventario_encerrado)
+    assert sum(saldo.quantidade_unidades for saldo in saldos) == pytest.approx(
+        sum(camada['saldo_remanescente'] for camada in calculadas)
+    )
+
+
+def test_auditoria_le_as_camadas_gravadas_sem_recalcular(inventario_encerrado, monkeypatch):
+    from repositories.auditoria_repository import AuditoriaRepository
+    from services.camada_peps_service import CamadaPepsService
+
+    service = CamadaPepsService()
+
+    def _nao_recalcula(*args, **kwargs):
+        raise AssertionError("Inventário atualizado não deve ser recalculado na leitura")
+
+    monkeypatch.setattr(service, 'recalcular_inventario', _nao_recalcula)
+    inventario = AuditoriaRepository().obter_inventario('04/2025')
+    camadas = service.obter_camadas(inventario, produto_id=SEM_CONTAGEM)
+
+    # 5 unidades até março e 50 em abril; 12 contadas consomem o lote de março e 43 do de abril
+    assert [camada['saldo_remanescente'] for camada in camadas] == pytest.approx([0.0, 12.0])
+
+
+@pytest.mark.parametrize('produto_ids', [None, [CONTAGEM_ACIMA_DAS_COMPRAS], [SEM_CONTAGEM]])
+def test_incremental_coincide_com_o_calculo_completo(inventario_encerrado, produto_ids):
+    from repositories.auditoria_repository import AuditoriaRepository
+    from services.camada_peps_service import CamadaPepsService
+
+    repository = AuditoriaRepository()
+    inventario = repository.obter_inventario_por_id(inventario_encerrado)
+    anterior = repository.obter_inventario_anterior(inventario_encerrado)
+    service = CamadaPepsService(motor='numpy')
+    service.recalcular_inventario(anterior.id, anterior.data_fim_contagem)
+
+    incrementais = service.calcular_camadas_incrementais(inventario.id, inventario.data_fim_contagem, produto_ids)
+    completas = service.calcular_camadas(inventario.id, inventario.data_fim_contagem, produto_ids)
+
+    # Inclui os lotes consumidos antes do inventário anterior e a contagem acima das compras
+    assert incrementais is not None
+    assert incrementais == completas
@@ -0,0 +1,48 @@
+# tests/test_itens_fornecedor.py
+"""Resolução da associação dos itens do catálogo de fornecedor (atualizacao_associacoes_itens)"""
+import pytest
+from sqlalchemy import insert, select
+
+FORNECEDOR_ID = 100
+
+
+@pytest.fixture(scope='module')
+def catalogo(banco):
+    from models.fornecedor import Fornecedor
+    from models.produto import Produto
+    from models.produto_fornecedor_associacao import ProdutoFornecedorAssociacao
+    from models.item_fornecedor import ItemFornecedor
+
+    with banco.begin() as conn:
+        conn.execute(insert(Fornecedor.__table__), [{'id': FORNECEDOR_ID, 'nome': "Catálogo", 'cnpj': '00000000000100'}])
+        conn.execute(insert(Produto.__table__), [
+            {'id': produto_id, 'nome': f"Produto {produto_id}", 'unidade_medida': 'UN'} for produto_id in (101, 102, 103)
+        ])
+        conn.execute(insert(ProdutoFornecedorAssociacao.__table__), [
+            # Código com duas associações: a de mesma descrição vence a mais antiga
+            {'id': 101, 'produto_id': 101, 'fornecedor_id': FORNECEDOR_ID, 'quantidade_por_grade': 1.0,
+             'codigo_produto_fornecedor': 'A', 'descricao_produto_fornecedor': 'ANTIGA'},
+            {'id': 102, 'produto_id': 102, 'fornecedor_id': FORNECEDOR_ID, 'quantidade_por_grade': 6.0,
+             'codigo_produto_fornecedor': 'A', 'descricao_produto_fornecedor': 'CAIXA'},
+            {'id': 103, 'produto_id': 103, 'fornecedor_id': FORNECEDOR_ID, 'quantidade_por_grade': 1.0,
+             'codigo_produto_fornecedor': 'B', 'descricao_produto_fornecedor': 'OUTRA'},
+        ])
+        conn.execute(insert(ItemFornecedor.__table__), [
+            {'id': 101, 'fornecedor_id': FORNECEDOR_ID, 'codigo_produto_fornecedor': 'A', 'descricao': 'CAIXA', 'unidade_medida': 'CX'},
+            {'id': 102, 'fornecedor_id': FORNECEDOR_ID, 'codigo_produto_fornecedor': 'A', 'descricao': 'SEM PAR', 'unidade_medida': 'UN'},
+            {'id': 103, 'fornecedor_id': FORNECEDOR_ID, 'codigo_produto_fornecedor': 'B', 'descricao': 'DIFERENTE', 'unidade_medida': 'UN'},
+            {'id': 104, 'fornecedor_id': FORNECEDOR_ID, 'codigo_produto_fornecedor': 'C', 'descricao': 'NOVO', 'unidade_medida': 'UN'},
+        ])
+
+
+def test_associacao_prefere_mesma_descricao_e_depois_a_mais_antiga(banco, catalogo):
+    from models.item_fornecedor import ItemFornecedor
+    from repositories.item_fornecedor_repository import ItemFornecedorRepository
+
+    ItemFornecedorRepository().resolver_associacoes(fornecedor_id=FORNECEDOR_ID)
+
+    with banco.connect() as conn:
+        associacoes = dict(conn.execute(
+            select(ItemFornecedor.id, ItemFornecedor.associacao_id).where(ItemFornecedor.fornecedor_id == FORNECEDOR_ID)
+        ).all())
+    assert associacoes == {101: 102, 102: 101, 103: 103, 104: None}
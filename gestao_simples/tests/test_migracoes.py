@@ -0,0 +1,16 @@
+# tests/test_migracoes.py
+"""O schema criado pelas migrações congeladas contém tudo o que os models declaram"""
+from sqlalchemy import inspect
+
+
+def test_schema_das_migracoes_cobre_os_models(banco):
+    from models.base import Base  # todos os models já registrados pelo fixture banco
+
+    inspetor = inspect(banco)
+    tabelas = set(inspetor.get_table_names())
+    for tabela in Base.metadata.sorted_tables:
+        assert tabela.name in tabelas, tabela.name
+        colunas = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+        assert {coluna.name for coluna in tabela.columns} <= colunas, tabela.name
+        indices = {indice['name'] for indice in inspetor.get_indexes(tabela.name)}
+        assert {indice.name for indice in tabela.indexes} <= indices, tabela.name
@@ -0,0 +1,139 @@
+# tests/test_peps_motores.py
+"""
+Confere o motor NumPy (services/peps_numpy.py) contra a CTE PEPS do banco
+(AuditoriaRepository.calcular_camadas) sobre a mesma massa de dados.
+"""
+import pytest
+from massa_peps import (
+    CONTAGEM_ACIMA_DAS_COMPRAS,
+    CONTAGEM_ZERO,
+    EMPATE_NA_EMISSAO,
+    SEM_CONTAGEM,
+    CONTAGEM_EM_VARIAS_LINHAS,
+    INVENTARIO_ID,
+)
+
+COLUNAS_NUMERICAS = [
+    'quantidade_unidades',
+    'valor_unitario',
+    'valor_total_lote',
+    'quantidade_acumulada',
+    'quantidade_saida',
+    'quantidade_consumida',
+    'saldo_remanescente',
+    'valor_consumido',
+    'valor_saldo_remanescente',
+]
+
+
+def _calcular(produto_ids=None):
+    """Camadas do inventário pelos dois motores: (sql, numpy)"""
+    from repositories.auditoria_repository import AuditoriaRepository
+    from services.peps_numpy import calcular_camadas_numpy
+
+    repository = AuditoriaRepository()
+    inventario = repository.obter_inventario_por_id(INVENTARIO_ID)
+    sql = repository.calcular_camadas(INVENTARIO_ID, produto_ids)
+    numpy = calcular_camadas_numpy(
+        repository.listar_entradas(INVENTARIO_ID, produto_ids),
+        repository.listar_contagens(INVENTARIO_ID, produto_ids),
+        inventario.data_fim_contagem,
+    )
+    return sql, numpy
+
+
+def _por_lote(camadas, produto_id=None):
+    return {
+        camada['item_nota_entrada_id']: camada
+        for camada in camadas
+        if produto_id is None or camada['produto_id'] == produto_id
+    }
+
+
+def _conferir(sql, numpy):
+    assert [camada['item_nota_entrada_id'] for camada in numpy] == [camada['item_nota_entrada_id'] for camada in sql]
+    for lote, referencia in _por_lote(sql).items():
+        camada = _por_lote(numpy)[lote]
+        assert camada['produto_id'] == referencia['produto_id']
+        assert camada['nome'] == referencia['nome']
+        assert camada['data_emissao'] == referencia['data_emissao']
+        assert camada['data_corte_inventario'] == referencia['data_corte_inventario']
+        for coluna in COLUNAS_NUMERICAS:
+            assert camada[coluna] == pytest.approx(referencia[coluna]), f"lote {lote}, coluna {coluna}"
+
+
+def test_motores_coincidem_no_inventario_inteiro(massa):
+    sql, numpy = _calcular()
+
+    # Notas emitidas depois da data de corte não entram
+    assert sorted(_por_lote(sql)) == list(range(1, 10))
+    _conferir(sql, numpy)
+
+
+@pytest.mark.parametrize('produto_id', [
+    CONTAGEM_ACIMA_DAS_COMPRAS,
+    CONTAGEM_ZERO,
+    EMPATE_NA_EMISSAO,
+    SEM_CONTAGEM,
+    CONTAGEM_EM_VARIAS_LINHAS,
+])
+def test_motores_coincidem_por_produto(massa, produto_id):
+    sql, numpy = _calcular([produto_id])
+
+    assert sql
+    assert {camada['produto_id'] for camada in sql} == {produto_id}
+    _conferir(sql, numpy)
+
+
+def test_contagem_acima_das_compras_nao_consome(massa):
+    sql, numpy = _calcular()
+
+    for camadas in (sql, numpy):
+        lotes = _por_lote(camadas, CONTAGEM_ACIMA_DAS_COMPRAS)
+        assert sorted(lotes) == [1, 6]
+        for camada in lotes.values():
+            assert camada['quantidade_saida'] == pytest.approx(-5.0)
+            assert camada['quantidade_consumida'] == pytest.approx(0.0)
+            assert camada['saldo_remanescente'] == pytest.approx(camada['quantidade_unidades'])
+
+
+@pytest.mark.parametrize('produto_id', [CONTAGEM_ZERO, SEM_CONTAGEM])
+def test_sem_estoque_contado_consome_todas_as_camadas(massa, produto_id):
+    sql, numpy = _calcular()
+
+    for camadas in (sql, numpy):
+        lotes = _por_lote(camadas, produto_id)
+        assert lotes
+        for camada in lotes.values():
+            assert camada['quantidade_consumida'] == pytest.approx(camada['quantidade_unidades'])
+            assert camada['saldo_remanescente'] == pytest.approx(0.0)
+            assert camada['valor_saldo_remanescente'] == pytest.approx(0.0)
+
+
+def test_empate_na_emissao_consome_pela_ordem_do_lote(massa):
+    sql, numpy = _calcular()
+
+    # Compras 6 + 4 + 2 = 12 e contagem 7: saída de 5 consome só parte do primeiro lote
+    esperado = {
+        3: (6.0, 5.0, 1.0),
+        7: (10.0, 0.0, 4.0),
+        8: (12.0, 0.0, 2.0),
+    }
+    for camadas in (sql, numpy):
+        lotes = _por_lote(camadas, EMPATE_NA_EMISSAO)
+        assert list(lotes) == [3, 7, 8]
+        for lote, (acumulada, consumida, saldo) in esperado.items():
+            assert lotes[lote]['quantidade_acumulada'] == pytest.approx(acumulada)
+            assert lotes[lote]['quantidade_consumida'] == pytest.approx(consumida)
+            assert lotes[lote]['saldo_remanescente'] == pytest.approx(saldo)
+
+
+def test_contagem_em_varias_linhas_e_somada(massa):
+    sql, numpy = _calcular([CONTAGEM_EM_VARIAS_LINHAS])
+
+    for camadas in (sql, numpy):
+        # 3 caixas de 2 unidades, 3,5 unidades contadas
+        camada, = camadas
+        assert camada['quantidade_unidades'] == pytest.approx(6.0)
+        assert camada['quantidade_consumida'] == pytest.approx(2.5)
+        assert camada['valor_saldo_remanescente'] == pytest.approx(3.5 * 4.0)
@@ -0,0 +1,42 @@
+# tests/test_unidade_de_trabalho.py
+"""Unidade de trabalho (config/database.py): uma sessão e um checkout de conexão por bloco"""
+from sqlalchemy import select
+
+
+def test_chamadas_de_repositorio_usam_um_unico_checkout(banco):
+    from config.database import estatisticas_pool, unit_of_work
+    from models.produto import Produto
+    from repositories.produto_repository import ProdutoRepository
+
+    repository = ProdutoRepository()
+    antes = estatisticas_pool.checkouts
+    with unit_of_work(ativo=True):
+        produto = repository.criar(Produto(nome="Unidade de trabalho", unidade_medida='UN'))
+        repository.buscar_por_id(produto.id)
+        repository.listar()
+
+        # A escrita já está confirmada antes do fim do bloco (sobrevive a um st.rerun())
+        with banco.connect() as conn:
+            gravado = conn.execute(select(Produto.nome).where(Produto.id == produto.id)).scalar()
+        assert gravado == "Unidade de trabalho"
+
+    # Um checkout da unidade de trabalho e um da conferência acima
+    assert estatisticas_pool.checkouts - antes == 2
+    assert banco.pool.checkedout() == 0
+
+
+def test_erro_em_uma_chamada_nao_contamina_as_seguintes(banco):
+    from config.database import unit_of_work
+    from models.produto import Produto
+    from repositories.produto_repository import ProdutoRepository
+
+    repository = ProdutoRepository()
+    with unit_of_work(ativo=True):
+        produto = repository.criar(Produto(nome="Duplicado", unidade_medida='UN'))
+        try:
+            repository.criar(Produto(id=produto.id, nome="Duplicado", unidade_medida='UN'))
+        except Exception:
+            pass
+        else:
+            raise AssertionError("Chave primária repetida deveria falhar")
+        assert repository.buscar_por_id(produto.id).nome == "Duplicado"
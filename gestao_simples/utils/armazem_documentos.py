@@ -0,0 +1,74 @@
+# utils/armazem_documentos.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from config.settings import DOCUMENTOS_DIR
+from utils.logger import logger
+
+_CHAVE_VALIDA = re.compile(r'^[0-9A-Za-z]+$')
+
+
+def hash_conteudo(conteudo: bytes) -> str:
+    """SHA-256 hexadecimal do conteúdo (endereço de documentos sem chave de acesso)"""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class ArmazemDocumentos:
+    """
+    Documentos fiscais gravados em disco comprimidos (gzip), endereçados pela chave de
+    acesso ou pelo hash do conteúdo de origem: <diretorio>/<tipo>/<2 primeiros>/<chave>.gz.
+
+    Consultado antes de qualquer acesso à SEFAZ ou à API do Gemini; reabrir um documento
+    já obtido vira uma leitura local. A gravação é atômica (arquivo temporário + rename).
+    """
+    def __init__(self, diretorio: str = DOCUMENTOS_DIR):
+        self.diretorio = diretorio
+
+    def _caminho(self, tipo: str, chave: str):
+        if not chave or not _CHAVE_VALIDA.match(chave) or not _CHAVE_VALIDA.match(tipo):
+            raise ValueError(f"Chave de documento inválida: {tipo}/{chave}")
+        return os.path.join(self.diretorio, tipo, chave[:2], f"{chave}.gz")
+
+    def obter(self, tipo: str, chave: str):
+        """Conteúdo gravado (bytes) ou None quando não existe ou está corrompido"""
+        caminho = self._caminho(tipo, chave)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with gzip.open(caminho, 'rb') as arquivo:
+                return arquivo.read()
+        except (OSError, EOFError) as e:
+            logger.warning(f"Documento {tipo}/{chave} ilegível, será obtido de novo: {str(e)}")
+            return None
+
+    def guardar(self, tipo: str, chave: str, conteudo: bytes):
+        caminho = self._caminho(tipo, chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(gzip.compress(conteudo))
+            os.replace(temporario, caminho)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return caminho
+
+    def obter_json(self, tipo: str, chave: str):
+        conteudo = self.obter(tipo, chave)
+        return json.loads(conteudo.decode('utf-8')) if conteudo is not None else None
+
+    def guardar_json(self, tipo: str, chave: str, dados):
+        return self.guardar(tipo, chave, json.dumps(dados, ensure_ascii=False).encode('utf-8'))
+
+    def remover(self, tipo: str, chave: str):
+        caminho = self._caminho(tipo, chave)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+armazem_documentos = ArmazemDocumentos()
@@ -0,0 +1,41 @@
+# utils/cache.py
+import threading
+from collections import OrderedDict
+
+class CacheLRU:
+    """
+    Cache em memória com descarte do item menos usado, compartilhado entre as
+    sessões do Streamlit (thread-safe). As chaves devem incluir a versão dos dados
+    para que alterações no banco gerem novas entradas em vez de valores antigos, ou
+    a entrada deve ser removida por quem altera os dados.
+    """
+    def __init__(self, tamanho_maximo: int = 32):
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._itens:
+                return padrao
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+        return valor
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
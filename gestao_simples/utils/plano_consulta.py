@@ -0,0 +1,19 @@
+# utils/plano_consulta.py
+from sqlalchemy import text
+
+# Prefixo do EXPLAIN por dialeto (o formato do plano varia entre os bancos)
+_PREFIXO_EXPLAIN = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+def explicar_consulta(conn, sql, params=None):
+    """Retorna o plano de execução da consulta como texto, uma linha por passo do plano"""
+    prefixo = _PREFIXO_EXPLAIN.get(conn.dialect.name)
+    if prefixo is None:
+        return f"EXPLAIN não suportado para o dialeto {conn.dialect.name}"
+
+    linhas = conn.execute(text(prefixo + sql), params or {}).fetchall()
+    return "\n".join(" | ".join(str(coluna) for coluna in linha) for linha in linhas)
@@ -69,6 +69,22 @@ def validar_nota_entrada(nota_entrada):
     if errors:
         raise ValidationError("Erro na validação da Nota de entrada", errors)
 
+def digito_verificador_chave_acesso(chave: str) -> int:
+    """
+    Dígito verificador (módulo 11) dos 43 primeiros dígitos da chave de acesso:
+    pesos de 2 a 9 da direita para a esquerda; resto 0 ou 1 resulta em dígito 0.
+    """
+    soma = sum(int(digito) * (2 + posicao % 8) for posicao, digito in enumerate(reversed(chave[:43])))
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+def chave_acesso_valida(chave: str) -> bool:
+    """True quando a chave tem 44 dígitos e o último confere com o módulo 11"""
+    return (
+        bool(chave) and len(chave) == 44 and chave.isdigit()
+        and digito_verificador_chave_acesso(chave) == int(chave[43])
+    )
+
 def validar_item_nota_entrada(item):
     """
     Valida os dados de um item da Nota de entrada.
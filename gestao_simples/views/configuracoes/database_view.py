@@ -2,8 +2,9 @@
 import streamlit as st
 import os
 from config.settings import DB_CONFIG
+from config.database import POOL_CONFIG, POOL_PRESETS, obter_estatisticas_pool
 from utils.logger import logger
-from dotenv import load_dotenv, find_dotenv, set_key
+from dotenv import load_dotenv, find_dotenv, set_key, unset_key
 
 
 class DatabaseConfigView:
@@ -15,6 +16,7 @@ class DatabaseConfigView:
         self.db_host = DB_CONFIG.get('host', 'localhost')
         self.db_name = DB_CONFIG.get('database', '')
         self.db_port = DB_CONFIG.get('port', '')
+        self.is_authenticated = is_authenticated
         self.render()
 
     def _render_form(self):
@@ -51,6 +53,30 @@ class DatabaseConfigView:
                 help="porta padrão (MySQL: 3306, PostgreSQL: 5432)"
             )
 
+            # Pool de conexões (valores atuais = preset do dialeto ou o que estiver no .env)
+            with st.expander("Pool de Conexões"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    new_pool_size = st.number_input("Conexões no pool", min_value=1, value=POOL_CONFIG['pool_size'])
+                    new_pool_timeout = st.number_input(
+                        "Espera por conexão (s)", min_value=1, value=POOL_CONFIG['pool_timeout'],
+                        help="Tempo máximo aguardando uma conexão livre antes de falhar"
+                    )
+                with col2:
+                    new_max_overflow = st.number_input(
+                        "Conexões extras (overflow)", min_value=0, value=POOL_CONFIG['max_overflow'],
+                        help="Conexões abertas além do pool nos momentos de pico"
+                    )
+                    new_pool_recycle = st.number_input(
+                        "Reciclar conexões após (s)", min_value=-1, value=POOL_CONFIG['pool_recycle'],
+                        help="-1 nunca recicla (preset do SQLite)"
+                    )
+                with col3:
+                    new_connect_timeout = st.number_input(
+                        "Timeout de conexão (s)", min_value=1, value=POOL_CONFIG['connect_timeout'],
+                        help="Tempo máximo para abrir uma nova conexão com o servidor"
+                    )
+
             st.warning("""
             **⚠️ Atenção!** Modificar estas configurações requer reinicialização da aplicação para ter efeito.
             Certifique-se de que o banco de dados está configurado e acessível antes de salvar.
@@ -63,7 +89,12 @@ class DatabaseConfigView:
                 'password': new_db_password,
                 'host': new_db_host,
                 'database': new_db_name,
-                'port': new_db_port
+                'port': new_db_port,
+                'pool_size': new_pool_size,
+                'max_overflow': new_max_overflow,
+                'pool_timeout': new_pool_timeout,
+                'pool_recycle': new_pool_recycle,
+                'connect_timeout': new_connect_timeout,
             }
 
     def _save_config(self, config):
@@ -86,6 +117,16 @@ class DatabaseConfigView:
             if config['port']:
                 set_key(dotenv_path, "DB_PORT", config['port'])
 
+            # Pool: só grava o que difere do preset do dialeto, para os presets continuarem valendo
+            preset = POOL_PRESETS.get(config['type'], POOL_PRESETS['mysql'])
+            for chave, valor in preset.items():
+                variavel = f"DB_{chave.upper()}"
+                if config[chave] != valor:
+                    set_key(dotenv_path, variavel, str(config[chave]))
+                elif os.getenv(variavel) not in (None, ''):
+                    unset_key(dotenv_path, variavel)
+                    os.environ.pop(variavel, None)
+
             st.success("Configurações salvas com sucesso. Reinicie a aplicação para aplicar as mudanças.")
             logger.info(
                 f"Database configuration updated. Type: {config['type']}, "
@@ -99,6 +140,25 @@ class DatabaseConfigView:
             logger.error(f"Error saving database config: {str(e)}")
             return False
 
+    def _render_pool_stats(self):
+        """Exibe a situação atual do pool de conexões"""
+        st.subheader("Pool de Conexões")
+        stats = obter_estatisticas_pool()
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Em uso", f"{stats['em_uso']} / {stats['tamanho'] + stats['max_overflow']}")
+        col2.metric("Livres no pool", stats['livres'])
+        col3.metric("Overflow", f"{stats['overflow']} / {stats['max_overflow']}")
+        col4.metric("Timeouts", stats['timeouts'])
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Checkouts", stats['checkouts'])
+        col2.metric("Espera média", f"{stats['espera_media_ms']:.1f} ms")
+        col3.metric("Espera máxima", f"{stats['espera_maxima_ms']:.1f} ms")
+        col4.metric("Invalidações", stats['invalidacoes'])
+
+        if st.button("🔄 Atualizar Estatísticas"):
+            st.rerun()
 
     def render(self):
         """Renderiza a view completa de configuração do banco de dados"""
@@ -107,4 +167,7 @@ class DatabaseConfigView:
         # Renderizar formulário e processar submissão
         submit, config = self._render_form()
         if submit:
-            self._save_config(config)
\ No newline at end of file
+            self._save_config(config)
+
+        if self.is_authenticated:
+            self._render_pool_stats()
\ No newline at end of file
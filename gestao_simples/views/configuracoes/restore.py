@@ -4,6 +4,8 @@ import streamlit as st
 from config.database import restore_database
 from utils.message_handler import message_handler, MessageType
 from services.restore_service import save_last_restore
+from services.nota_entrada_service import invalidar_chaves_cadastradas
+from services.auditoria_service import invalidar_cache_auditoria
 from utils.logger import logger
 
 
@@ -14,6 +16,8 @@ def confirm_restore_dialog(backup_path):
         with progress_container:
             try:
                 restore_database(backup_path)
+                invalidar_chaves_cadastradas()
+                invalidar_cache_auditoria()
                 # Salva a última restauração no arquivo JSON
                 save_last_restore(backup_path)
                 
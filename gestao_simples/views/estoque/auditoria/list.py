@@ -1,6 +1,7 @@
 # views/estoque/auditoria/list.py
 import streamlit as st
 import pandas as pd
+import os
 from services.auditoria_service import AuditoriaService
 from services.inventario_estoque_service import InventarioEstoqueService
 from utils.format import format_datetime, format_brl, format_value_brl
@@ -13,65 +14,159 @@ class AuditoriaListView:
 
     def render(self):
         st.title("📊 Auditoria de Estoques - Método PEPS")
+
+        if st.session_state.usuario.get("is_admin"):
+            self._renderizar_reconstrucao()
         
+        # Versão dos dados (uma consulta barata): chave do cache dos resultados
+        versao = self.auditoria_service.obter_versao_dados()
+
         # Carrega dados para filtros
         inventarios = self._carregar_inventarios()
-        produtos = self._carregar_produtos()
-
-        # Filtros
-        referencia_selecionada, produto_selecionado = self._construir_filtros(inventarios, produtos)
+        produtos = self._carregar_produtos(versao)
+
+        aba_inventario, aba_comparativo = st.tabs(["Por inventário", "Comparativo entre períodos"])
+
+        with aba_inventario:
+            # Filtros
+            referencia_selecionada, produto_selecionado = self._construir_filtros(inventarios, produtos)
+
+            # Botão de pesquisa
+            if referencia_selecionada:
+                self._renderizar_resultado(
+                    referencia_selecionada if referencia_selecionada != "Último Inventário" else None,
+                    produto_selecionado,
+                    versao
+                )
+
+        with aba_comparativo:
+            self._renderizar_comparativo(produtos, versao)
+
+    def _renderizar_comparativo(self, produtos, versao):
+        metricas = {
+            "Consumo (UN)": 'quantidade_consumida',
+            "Custo Consumido": 'valor_consumido',
+            "Entradas (UN)": 'quantidade_entrada',
+            "Saldo (UN)": 'saldo_remanescente',
+            "Saldo Financeiro": 'valor_saldo_remanescente',
+        }
 
-        # Botão de pesquisa
-        if referencia_selecionada and produto_selecionado:
-            dados = self.auditoria_service.obter_dados_auditoria(
-                referencia_inventario=referencia_selecionada if referencia_selecionada != "Último Inventário" else None
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            metrica = st.selectbox("Indicador:", options=list(metricas), key="comparativo_metrica")
+        with col2:
+            produto_id = st.selectbox(
+                "Filtrar por Produto:",
+                options=list(produtos),
+                format_func=lambda produto_id: produtos[produto_id],
+                key="comparativo_produto"
             )
-            
-            if dados:
-                df = self._format_dataframe(dados, produto_selecionado)
-
-                on = st.toggle("Mostrar tudo", value=False, help="Ative para mostrar todos os itens, incluindo os zerados.")
-
-                if not on:
-                    # Filtra saldos diferentes de zero, se a opção não estiver ativada
-                    df = df[df['Saldo (UN)'] != 0]
-
-                df['ID'] = df['ID'].astype(str)
-                df['Data Entrada (Lote)'] = df['Data Entrada (Lote)'].apply(format_datetime)
-                df['Custo Unitário'] = df['Custo Unitário'].apply(format_brl)
-
-                values_un=['Quantidade (UN)', 'Consumo (UN)', 'Saldo (UN)']
-                values_brl=['Custo Total', 'Custo Consumido', 'Saldo Financeiro']
 
-                df = df.pivot_table(
-                    index=['ID', 'Produto', 'Data Entrada (Lote)', 'Custo Unitário'],
-                    values=values_un + values_brl,
-                    aggfunc='sum', margins=True, margins_name='Total'
-                ).reset_index()
-
-                for value in values_un:
-                    df[value] = df[value].apply(format_value_brl, decimals=3)
-
-                for value in values_brl:
-                    df[value] = df[value].apply(format_brl)
-
-                self._exibir_tabela(df)
-                st.markdown("---")
-                self._export_to_csv(df)
-            else:
-                st.warning("Nenhum dado encontrado para os filtros selecionados.")
+        dados = self.auditoria_service.obter_comparativo(produto_id, versao)
+        if not dados:
+            st.warning("Nenhum inventário encerrado com entradas para comparar.")
+            return
+
+        df = pd.DataFrame(dados)
+        # Produto x período (colunas na ordem das datas de corte)
+        referencias = list(dict.fromkeys(df.sort_values('data_corte_inventario')['referencia']))
+        matriz = df.pivot_table(
+            index=['produto_id', 'nome'],
+            columns='referencia',
+            values=metricas[metrica],
+            aggfunc='sum',
+            fill_value=0
+        )[referencias].reset_index()
+        matriz = matriz.rename(columns={'produto_id': 'ID', 'nome': 'Produto'})
+        matriz['ID'] = matriz['ID'].astype(str)
+
+        formatar = format_brl if metrica in ("Custo Consumido", "Saldo Financeiro") else (
+            lambda valor: format_value_brl(valor, decimals=3)
+        )
+        for referencia in referencias:
+            matriz[referencia] = matriz[referencia].apply(formatar)
+
+        st.caption("Consumo, custo e entradas referem-se ao período desde o inventário anterior; saldos são na data de corte.")
+        self._exibir_tabela(matriz)
+
+    @st.fragment
+    def _renderizar_resultado(self, referencia, produto_id, versao):
+        # Fragmento: o toggle reexecuta apenas esta parte, e os dados vêm do cache
+        on = st.toggle("Mostrar tudo", value=False, help="Ative para mostrar todos os itens, incluindo os zerados.")
+
+        # Produto e saldo são filtrados no banco: só as camadas exibidas são lidas
+        dados = self.auditoria_service.obter_dados_auditoria(
+            referencia_inventario=referencia,
+            produto_id=produto_id,
+            somente_com_saldo=not on,
+            versao=versao
+        )
+        
+        if dados:
+            df = self._format_dataframe(dados)
+
+            df['ID'] = df['ID'].astype(str)
+            df['Data Entrada (Lote)'] = df['Data Entrada (Lote)'].apply(format_datetime)
+            df['Custo Unitário'] = df['Custo Unitário'].apply(format_brl)
+
+            values_un=['Quantidade (UN)', 'Consumo (UN)', 'Saldo (UN)']
+            values_brl=['Custo Total', 'Custo Consumido', 'Saldo Financeiro']
+
+            df = df.pivot_table(
+                index=['ID', 'Produto', 'Data Entrada (Lote)', 'Custo Unitário'],
+                values=values_un + values_brl,
+                aggfunc='sum', margins=True, margins_name='Total'
+            ).reset_index()
+
+            for value in values_un:
+                df[value] = df[value].apply(format_value_brl, decimals=3)
+
+            for value in values_brl:
+                df[value] = df[value].apply(format_brl)
+
+            self._exibir_tabela(df)
+            st.markdown("---")
+            self._export_to_csv(referencia, produto_id, not on)
+        else:
+            st.warning("Nenhum dado encontrado para os filtros selecionados.")
+
+    def _renderizar_reconstrucao(self):
+        with st.expander("Manutenção das camadas PEPS", icon=":material/build:"):
+            st.caption(
+                "As camadas PEPS ficam gravadas e são atualizadas a cada nota, associação ou contagem. "
+                "Use a reconstrução completa apenas para reparar divergências."
+            )
+            if st.button("Reconstruir camadas", icon=":material/refresh:"):
+                with st.spinner("Recalculando camadas de todos os inventários encerrados..."):
+                    total = self.auditoria_service.reconstruir_camadas()
+                st.success(f"Camadas de {total} inventário(s) reconstruídas.")
+
+            if st.button("Conferir motores SQL x NumPy", icon=":material/compare_arrows:"):
+                with st.spinner("Calculando o último inventário pelos dois motores..."):
+                    conferencia = self.auditoria_service.conferir_motores()
+                if conferencia is None:
+                    st.warning("Nenhum inventário encerrado para conferir.")
+                elif conferencia['divergencias']:
+                    st.error(
+                        f"{conferencia['divergencias']} camada(s) divergentes "
+                        f"(diferença máxima {conferencia['diferenca_maxima']:.6f})."
+                    )
+                else:
+                    st.success(
+                        f"{conferencia['camadas']} camadas idênticas. "
+                        f"SQL: {conferencia['tempo_sql']:.2f}s | NumPy: {conferencia['tempo_numpy']:.2f}s"
+                    )
 
     def _carregar_inventarios(self):
         inventarios = [inv.referencia for inv in self.inventario_service.listar_inventarios()]
         inventarios.insert(0, "Último Inventário")
         return inventarios
 
-    def _carregar_produtos(self):
-        dados = self.auditoria_service.obter_dados_auditoria()
-        produtos = list({d['nome'] for d in dados})
-        produtos.sort()
-        produtos.insert(0, "Todos")
-        return produtos
+    def _carregar_produtos(self, versao):
+        # Consulta dedicada aos produtos: não calcula camadas só para montar o filtro
+        produtos = self.auditoria_service.listar_produtos(versao)
+        # {produto_id: nome}; None representa "Todos"
+        return {None: "Todos", **produtos}
 
     def _construir_filtros(self, inventarios, produtos):
         col1, col2 = st.columns([1, 2])
@@ -85,13 +180,14 @@ class AuditoriaListView:
         with col2:
             produto = st.selectbox(
                 "Filtrar por Produto:",
-                options=produtos,
+                options=list(produtos),
+                format_func=lambda produto_id: produtos[produto_id],
                 index=0,
                 help="Filtre os resultados por produto específico"
             )
         return referencia, produto
 
-    def _format_dataframe(self, dados, filtro_produto):
+    def _format_dataframe(self, dados):
         df = pd.DataFrame([{
             "ID": item['produto_id'],
             "Produto": item['nome'],
@@ -103,7 +199,7 @@ class AuditoriaListView:
             "Saldo (UN)": item['saldo_remanescente'],
             "Custo Consumido": item['valor_consumido'],
             "Saldo Financeiro": item['valor_saldo_remanescente']
-        } for item in dados if filtro_produto == "Todos" or item['nome'] == filtro_produto])
+        } for item in dados])
 
         return df  
 
@@ -115,14 +211,24 @@ class AuditoriaListView:
         )
 
 
-    def _export_to_csv(self, df):
-
-        csv_data = df.to_csv(index=False, sep=';').encode('utf-8-sig')
-        
-        st.download_button(
-            label="⬇️ Exportar para CSV",
-            data=csv_data,
-            file_name='auditoria_estoque.csv',
-            mime='text/csv',
-            help="Download dos dados filtrados em formato CSV"
-        )
+    def _export_to_csv(self, referencia, produto_id, somente_com_saldo):
+        # O CSV é gerado em streaming direto para arquivo (sem montar DataFrame do histórico)
+        filtros = (referencia, produto_id, somente_com_saldo)
+        exportacao = st.session_state.get("auditoria_exportacao")
+
+        if st.button("Gerar CSV", icon=":material/description:", help="Gera o arquivo com os dados filtrados"):
+            if exportacao and os.path.exists(exportacao['caminho']):
+                os.remove(exportacao['caminho'])
+            with st.spinner("Gerando arquivo..."):
+                caminho = self.auditoria_service.exportar_csv(referencia, produto_id, somente_com_saldo)
+            exportacao = st.session_state.auditoria_exportacao = {'filtros': filtros, 'caminho': caminho}
+
+        if exportacao and exportacao['filtros'] == filtros and os.path.exists(exportacao['caminho']):
+            with open(exportacao['caminho'], 'rb') as arquivo:
+                st.download_button(
+                    label="⬇️ Exportar para CSV",
+                    data=arquivo,
+                    file_name='auditoria_estoque.csv',
+                    mime='text/csv',
+                    help="Download dos dados filtrados em formato CSV"
+                )
@@ -9,7 +9,7 @@ produto_service = ProdutoService()
 
 @st.dialog("📥 Fila de Associação de Produtos", width="large")
 def show_create_associacao():
-    # Recarrega a lista ao iniciar/recarregar a página
+    # Carrega a fila persistida ao abrir o diálogo
     if 'itens_fila' not in st.session_state:
         st.session_state.itens_fila = service.listar_todos_itens_nao_associados()
 
@@ -83,11 +83,10 @@ def _salvar_associacao(item, produto_id, quantidade):
         'descricao_produto_fornecedor': item['descricao']
     }
 
+    # A associação tira o item da fila persistida; aqui basta removê-lo da lista carregada
     service.criar_associacao(dados)
     st.session_state.itens_fila.pop(st.session_state.indice_atual)
-
-    # Atualiza a lista e reinicia o processo
-    st.session_state.itens_fila = service.listar_todos_itens_nao_associados()
+    st.session_state.indice_atual = min(st.session_state.indice_atual, max(len(st.session_state.itens_fila) - 1, 0))
     st.session_state.form_id += 1
     st.rerun(scope="fragment")
 
@@ -33,10 +33,15 @@ class AssociacoesListView:
 
         with columns[0]:
             if st.button("🔄 Atualizar Lista", use_container_width=True):
+                # Recalcula a fila a partir das notas e associações (reparo)
+                with st.spinner("🔍 Recalculando itens não associados..."):
+                    self.service.reconstruir_fila_associacao()
                 st.rerun()        
         
         with columns[1]:
             if st.button("🔗 Associar Produtos", use_container_width=True, disabled=disabled):
+                st.session_state.pop('itens_fila', None)
+                st.session_state.indice_atual = 0
                 show_create_associacao()        
 
         with st.spinner("📦 Carregando associações existentes..."):
@@ -7,6 +7,7 @@ from services.fornecedor_service import FornecedorService
 from services.nota_entrada_service import NotaEntradaService
 from services.item_nota_entrada_service import ItemNotaEntradaService
 from utils.message_handler import message_handler, MessageType
+from utils.validacoes import ValidationError
 from utils.format import format_brl, format_cnpj, format_datetime, format_chave_acesso
 
 class QRCodeView:
@@ -109,6 +110,8 @@ class QRCodeView:
             else:
                 st.error("Não foi possível extrair dados da NotaEntrada desta URL.")
 
+        except ValidationError as e:
+            st.warning(str(e))
         except Exception as e:
             st.error(f"Falha ao processar URL: {str(e)}")
             st.exception(e)
@@ -141,6 +144,8 @@ class QRCodeView:
                     self._display_nota_entrada_data(nota_entrada_data, url)
             else:
                 st.error("Nenhum QR Code detectado na imagem.")
+        except ValidationError as e:
+            st.warning(str(e))
         except Exception as e:
             st.error(f"Erro ao processar QR Code: {str(e)}")
 